@@ -0,0 +1,190 @@
+''' Pairwise association matrix of mixed-type columns.
+
+One matrix for every pair of columns, whatever their types:
+
+- numeric / numeric: Pearson (or Spearman, Pearson of the ranks) over the rows where
+  both values are present, in [-1, 1]
+- categorical / categorical: Cramér's V, in [0, 1]
+- numeric / categorical: correlation ratio η, in [0, 1]
+
+With X the centered numeric values (0 where missing), M their presence mask and O
+the sparse one-hot matrix of the categorical columns, the numeric statistics come
+from matrix products: X'X, X'M, (X²)'M and M'M give all pairwise-complete Pearson
+coefficients at once (BLAS, float32 by default), and O'X, O'X² and O'M the group
+sums of every numeric column per level. The contingency table of a categorical pair
+is one bincount of the combined level codes, built one pair at a time so memory
+stays at the size of one table however many columns there are.
+
+The full matrix of a dataset is cached per dataset version; heatmaps and the
+correlation-preservation metric take the pairs they need from it.
+'''
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import categorical_encoding
+import lazy_imports
+import performance
+
+scipy_sparse = lazy_imports.lazy_module("scipy.sparse")
+
+MAX_LEVELS = 1_000  # categorical columns keep their most frequent levels, the others count as missing
+METHODS = ("pearson", "spearman")
+
+
+def column_kinds(df):
+    """Split columns into numeric ones (datetimes as numbers) and categorical ones (the rest)."""
+    numeric, categorical = [], []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype) or (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)):
+            numeric.append(col)
+        else:
+            categorical.append(col)
+    return numeric, categorical
+
+
+def _numeric_values(df, columns, method, dtype):
+    frame = df[columns].copy(deep=False)
+    for col in columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[col]):
+            frame[col] = frame[col].astype("int64").where(frame[col].notna())
+    if method == "spearman":
+        frame = frame.rank()
+    values = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    # Standardized in float64 before the cast: datetimes in nanoseconds would overflow the
+    # float32 products, and both coefficients are unchanged by a per-column scale
+    if len(values):
+        scale = np.nanstd(values, axis=0)
+        values = (values - np.nanmean(values, axis=0)) / np.where(scale > 0, scale, 1.0)
+    standardized = np.where(present, values, 0.0)
+    return standardized.astype(dtype), present.astype(dtype)
+
+
+def pairwise_correlation(X, M):
+    """Pearson coefficients of all column pairs over the rows where both are present."""
+    count = M.T @ M
+    sums = X.T @ M  # sum of column i over the rows where column j is present
+    squares = (X * X).T @ M
+    products = X.T @ X
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = products - sums * sums.T / count
+        variance_i = squares - sums * sums / count
+        variance_j = variance_i.T
+        correlation = covariance / np.sqrt(variance_i * variance_j)
+    return np.clip(np.nan_to_num(correlation.astype(np.float64), nan=0.0), -1.0, 1.0)
+
+
+def _encoder(df, columns):
+    vocabularies = {col: df[col].value_counts().index[:MAX_LEVELS].tolist() for col in columns}
+    return categorical_encoding.CategoricalEncoder(vocabularies)
+
+
+def contingency_table(codes_a, codes_b, levels_a, levels_b):
+    """Counts of every level pair of two coded columns, over the rows where both are coded."""
+    both = (codes_a >= 0) & (codes_b >= 0)
+    cells = np.bincount(codes_a[both] * levels_b + codes_b[both], minlength=levels_a * levels_b)
+    return cells.reshape(levels_a, levels_b).astype(np.float64)
+
+
+def cramers_v(contingency):
+    """Cramér's V of a contingency table (rows and columns with no count are ignored)."""
+    contingency = contingency[contingency.sum(axis=1) > 0][:, contingency.sum(axis=0) > 0]
+    total = contingency.sum()
+    if total == 0 or min(contingency.shape) < 2:
+        return 0.0
+    expected = np.outer(contingency.sum(axis=1), contingency.sum(axis=0)) / total
+    chi2 = ((contingency - expected) ** 2 / expected).sum()
+    return float(np.sqrt(chi2 / total / (min(contingency.shape) - 1)))
+
+
+def correlation_ratios(counts, sums, squares):
+    """
+    η of one categorical column with every numeric column, from per-level statistics.
+
+    Args:
+        counts, sums, squares: (levels x numeric columns) counts, sums and sums of
+            squares of the numeric values present, per level
+
+    Returns:
+        np.ndarray: η per numeric column
+    """
+    total_count = counts.sum(axis=0)
+    total_sum = sums.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grand = total_sum ** 2 / total_count
+        between = np.where(counts > 0, sums ** 2 / counts, 0.0).sum(axis=0) - grand
+        total = squares.sum(axis=0) - grand
+        ratio = np.sqrt(np.clip(between / total, 0.0, 1.0))
+    return np.nan_to_num(ratio, nan=0.0)
+
+
+@performance.timed()
+def association_matrix(df, method="pearson", dtype=np.float32):
+    """
+    Compute the association of every pair of columns of `df`.
+
+    Args:
+        df: Data to analyze
+        method: "pearson" or "spearman" for the numeric pairs
+        dtype: Float type of the numeric products, np.float64 for exact digits
+
+    Returns:
+        DataFrame: Symmetric matrix in the column order of `df`, 1 on the diagonal
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    numeric, categorical = column_kinds(df)
+    position = {col: i for i, col in enumerate(df.columns)}
+    num_index = np.array([position[col] for col in numeric], dtype=np.intp)
+    cat_index = np.array([position[col] for col in categorical], dtype=np.intp)
+    matrix = np.zeros((len(df.columns), len(df.columns)))
+
+    X = M = None
+    if numeric:
+        X, M = _numeric_values(df, numeric, method, dtype)
+        matrix[np.ix_(num_index, num_index)] = pairwise_correlation(X, M)
+
+    if categorical:
+        encoder = _encoder(df, categorical)
+        codes = encoder.codes(df, categorical)
+        levels = [len(encoder.vocabularies_[col]) for col in categorical]
+        for a in range(len(categorical)):
+            for b in range(a + 1, len(categorical)):
+                # Only one pair's contingency table exists at a time
+                table = contingency_table(codes[categorical[a]], codes[categorical[b]], levels[a], levels[b])
+                matrix[cat_index[a], cat_index[b]] = matrix[cat_index[b], cat_index[a]] = cramers_v(table)
+        if numeric:
+            Xd, Md = X.astype(np.float64), M.astype(np.float64)
+            squares = Xd * Xd
+            for a, col in enumerate(categorical):
+                rows = np.flatnonzero(codes[col] >= 0)
+                one_hot_t = scipy_sparse.csr_matrix((np.ones(len(rows)), (codes[col][rows], rows)), shape=(levels[a], len(df)))
+                eta = correlation_ratios(one_hot_t @ Md, one_hot_t @ Xd, one_hot_t @ squares)
+                matrix[cat_index[a], num_index] = matrix[num_index, cat_index[a]] = eta
+
+    np.fill_diagonal(matrix, 1.0)
+    return pd.DataFrame(matrix, index=df.columns, columns=df.columns)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _cached_matrix(_df, version, method):
+    return association_matrix(_df, method)
+
+
+# Function to get the association matrix of a dataset, computed once per dataset version
+def cached_association_matrix(df, version=None, method="pearson"):
+    if version is None:
+        return association_matrix(df, method)
+    return _cached_matrix(df, version, method)
+
+
+def matrix_difference(original, synthetic):
+    """Mean absolute difference of two association matrices over the pairs both have."""
+    columns = original.columns.intersection(synthetic.columns)
+    if len(columns) < 2:
+        return np.nan
+    diff = (original.loc[columns, columns] - synthetic.loc[columns, columns]).abs().to_numpy()
+    return float(diff[~np.eye(len(columns), dtype=bool)].mean())
@@ -0,0 +1,113 @@
+''' Cold-start benchmark for the Streamlit app.
+
+Every measurement runs in a fresh interpreter so nothing is served from an already
+populated sys.modules. It reports the import time of each project module, the time
+to render the Home route with Streamlit's AppTest, and which heavy dependencies the
+Home route ended up importing (ideally none).
+
+Usage:
+    python benchmarks/import_time.py [--repeat 3] [--json results.json] [--max-home-seconds 5]
+'''
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "data_analysis_functions",
+    "data_preprocessing_function",
+    "synthetic_data_generator",
+]
+
+HEAVY_DEPENDENCIES = ["plotly.express", "seaborn", "matplotlib.pyplot", "sklearn", "scipy.stats", "sdv", "torch"]
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+HOME_SNIPPET = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file("main.py", default_timeout=120)
+app.run()
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "exceptions": len(app.exception), "heavy_loaded": heavy}}))
+"""
+
+
+def run_snippet(code):
+    env = dict(os.environ, HITL_EDA_PREWARM="0")
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure(repeat):
+    results = {"python": sys.version.split()[0], "modules": {}, "home": None}
+
+    for module in MODULES:
+        try:
+            timings = [float(run_snippet(IMPORT_SNIPPET.format(module=module))) for _ in range(repeat)]
+            results["modules"][module] = {"median_seconds": statistics.median(timings), "runs": timings}
+        except subprocess.CalledProcessError as e:
+            results["modules"][module] = {"error": e.stderr.strip().splitlines()[-1] if e.stderr else str(e)}
+
+    try:
+        runs = [json.loads(run_snippet(HOME_SNIPPET.format(heavy=HEAVY_DEPENDENCIES))) for _ in range(repeat)]
+        results["home"] = {
+            "median_seconds": statistics.median(run["seconds"] for run in runs),
+            "exceptions": max(run["exceptions"] for run in runs),
+            "heavy_loaded": sorted({name for run in runs for name in run["heavy_loaded"]}),
+        }
+    except subprocess.CalledProcessError as e:
+        results["home"] = {"error": e.stderr.strip().splitlines()[-1] if e.stderr else str(e)}
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import latency of the app")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-home-seconds", type=float, help="exit non-zero if the Home route is slower")
+    args = parser.parse_args()
+
+    results = measure(args.repeat)
+
+    print(f"Python {results['python']}")
+    for module, stats in results["modules"].items():
+        value = f"{stats['median_seconds']:.3f} s" if "median_seconds" in stats else f"error: {stats['error']}"
+        print(f"  import {module:<30} {value}")
+    home = results["home"]
+    if "median_seconds" in home:
+        print(f"  Home route cold start              {home['median_seconds']:.3f} s")
+        print(f"  Heavy modules loaded by Home       {', '.join(home['heavy_loaded']) or 'none'}")
+    else:
+        print(f"  Home route cold start              error: {home['error']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_home_seconds is not None and home.get("median_seconds", float("inf")) > args.max_home_seconds:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
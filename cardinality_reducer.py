@@ -0,0 +1,208 @@
+''' Pre-synthesis handling of categorical columns with thousands of levels.
+
+CTGAN and the other neural synthesizers one-hot encode every category, so a single
+column with 20,000 customer names makes the model 20,000 units wider. Columns above
+a level limit are reduced before synthesizer.fit() and restored after sampling:
+
+- collapse:  the most frequent levels are kept, the rest share one "other" bucket
+- frequency: levels are replaced by their frequency rank, a single numerical column
+- hashing:   levels are hashed into a fixed number of buckets
+
+inverse_transform() maps sampled buckets and ranks back to real labels, drawing the
+labels of a bucket in proportion to their frequency in the original data, so the
+synthetic table keeps the original vocabulary and its long tail.
+'''
+
+import copy
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import performance
+
+OTHER_LABEL = "__other__"
+DEFAULT_MAX_LEVELS = 100
+
+# UI label -> strategy
+STRATEGIES = {
+    "Collapse rare levels": "collapse",
+    "Frequency encoding": "frequency",
+    "Hashing": "hashing",
+    "Off": None,
+}
+
+
+def _hash_buckets(values, buckets):
+    hashed = pd.util.hash_array(np.asarray(values, dtype=object).astype(str))
+    return (hashed % np.uint64(buckets)).astype(np.int64)
+
+
+class CardinalityReducer:
+    """
+    Reduce categorical columns with more than `max_levels` levels for synthesis.
+
+    Args:
+        strategy: "collapse", "frequency" or "hashing"
+        max_levels: Level limit; also the number of kept levels (collapse, including
+            the other bucket) and hash buckets (hashing)
+        seed: Seed of the label draws in inverse_transform()
+    """
+
+    def __init__(self, strategy="collapse", max_levels=DEFAULT_MAX_LEVELS, seed=0):
+        if strategy not in ("collapse", "frequency", "hashing"):
+            raise ValueError(f"Unknown strategy '{strategy}'")
+        self.strategy = strategy
+        self.max_levels = max(2, int(max_levels))
+        self.seed = seed
+        self.columns_ = {}  # column -> fitted state of that column
+
+    @property
+    def config(self):
+        return (self.strategy, self.max_levels, self.seed)
+
+    @performance.timed("cardinality_reducer.fit")
+    def fit(self, df, metadata=None):
+        """
+        Learn the level frequencies of the high-cardinality columns.
+
+        Only columns with the categorical sdtype in `metadata` are considered (ids and
+        numbers are not one-hot encoded); without metadata all non-numeric columns are.
+        """
+        if metadata is not None:
+            candidates = [col for col, column_metadata in metadata['columns'].items()
+                          if column_metadata['sdtype'] == 'categorical']
+        else:
+            candidates = df.select_dtypes(exclude=['number', 'bool']).columns
+
+        self.columns_ = {}
+        for col in candidates:
+            counts = df[col].value_counts()
+            if len(counts) <= self.max_levels:
+                continue
+            state = {'dtype': df[col].dtype, 'levels': len(counts)}
+            if self.strategy == "collapse":
+                kept = counts.iloc[:self.max_levels - 1]
+                rare = counts.iloc[self.max_levels - 1:]
+                state['kept'] = kept.index
+                state['pools'] = {OTHER_LABEL: (rare.index.to_numpy(), (rare / rare.sum()).to_numpy())}
+            elif self.strategy == "frequency":
+                state['ranks'] = pd.Series(np.arange(len(counts)), index=counts.index)
+                state['labels'] = counts.index.to_numpy()
+            else:
+                buckets = _hash_buckets(counts.index, self.max_levels)
+                state['pools'] = {
+                    bucket: (counts.index[buckets == bucket].to_numpy(),
+                             (counts[buckets == bucket] / counts[buckets == bucket].sum()).to_numpy())
+                    for bucket in np.unique(buckets)
+                }
+            self.columns_[col] = state
+        return self
+
+    @performance.timed("cardinality_reducer.transform")
+    def transform(self, df):
+        """Return a copy of `df` with the fitted columns reduced; other columns are shared views."""
+        reduced = df.copy(deep=False)
+        for col, state in self.columns_.items():
+            values = df[col]
+            if self.strategy == "collapse":
+                reduced[col] = values.astype(object).where(values.isin(state['kept']) | values.isna(), OTHER_LABEL)
+            elif self.strategy == "frequency":
+                reduced[col] = values.map(state['ranks']).astype("Int64")
+            else:
+                buckets = pd.Series(_hash_buckets(values, self.max_levels), index=values.index)
+                reduced[col] = buckets.where(values.notna()).astype("Int64")
+        return reduced
+
+    @performance.timed("cardinality_reducer.inverse_transform")
+    def inverse_transform(self, df, seed=None):
+        """
+        Map reduced columns of sampled data back to real labels.
+
+        `seed` overrides the reducer's seed for the label draws, so separately sampled
+        blocks of one dataset do not repeat the same draws.
+        """
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        restored = df.copy(deep=False)
+        for col, state in self.columns_.items():
+            if col not in df.columns:
+                continue
+            values = df[col]
+            labels = values.astype(object).to_numpy(copy=True)
+            if self.strategy == "frequency":
+                present = values.notna().to_numpy()
+                ranks = np.clip(np.rint(values[present].astype(float).to_numpy()), 0, len(state['labels']) - 1).astype(np.int64)
+                labels[present] = state['labels'][ranks]
+            else:
+                for bucket, (pool, probabilities) in state['pools'].items():
+                    mask = (values == bucket).fillna(False).to_numpy(dtype=bool)
+                    if mask.any():
+                        labels[mask] = rng.choice(pool, size=int(mask.sum()), p=probabilities)
+            restored[col] = pd.Series(labels, index=values.index)
+            try:
+                restored[col] = restored[col].astype(state['dtype'])
+            except (TypeError, ValueError):
+                pass
+        return restored
+
+    def transform_metadata(self, metadata):
+        """Return the SDV metadata dict describing the reduced columns."""
+        metadata = copy.deepcopy(metadata)
+        for col in self.columns_:
+            if self.strategy == "frequency":
+                metadata['columns'][col] = {'sdtype': 'numerical', 'computer_representation': 'Int64'}
+            else:
+                metadata['columns'][col] = {'sdtype': 'categorical'}
+        return metadata
+
+    def summary(self):
+        rows = []
+        for col, state in self.columns_.items():
+            if self.strategy == "collapse":
+                encoded = f"{len(state['kept'])} levels + other"
+            elif self.strategy == "frequency":
+                encoded = f"rank 0-{state['levels'] - 1}"
+            else:
+                encoded = f"{len(state['pools'])} hash buckets"
+            rows.append({'column': col, 'levels': state['levels'], 'encoded as': encoded})
+        return pd.DataFrame(rows, columns=['column', 'levels', 'encoded as'])
+
+
+def reducer_settings(df, metadata):
+    """
+    Render the high-cardinality settings and return a reducer fitted on `df`.
+
+    Returns:
+        CardinalityReducer or None: None when switched off or no column exceeds the limit
+    """
+    with st.expander("🗜️ High-Cardinality Columns", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            strategy_label = st.selectbox(
+                "Handling",
+                list(STRATEGIES),
+                key="synthetic_cardinality_strategy",
+                help="How categorical columns with more levels than the limit are presented to the synthesizer"
+            )
+        with col2:
+            max_levels = st.number_input(
+                "Level Limit",
+                min_value=2,
+                max_value=10_000,
+                value=DEFAULT_MAX_LEVELS,
+                step=10,
+                key="synthetic_cardinality_limit"
+            )
+
+        strategy = STRATEGIES[strategy_label]
+        if strategy is None:
+            st.caption("All categorical levels are passed to the synthesizer unchanged.")
+            return None
+
+        reducer = CardinalityReducer(strategy, max_levels).fit(df, metadata)
+        if not reducer.columns_:
+            st.caption(f"No categorical column has more than {max_levels} levels.")
+            return None
+        st.dataframe(reducer.summary(), use_container_width=True, hide_index=True)
+        st.caption("Sampled buckets and ranks are mapped back to real labels after generation.")
+    return reducer
@@ -0,0 +1,188 @@
+''' Vectorized label and one-hot encoding with reusable vocabularies.
+
+Every selected column is factorized once with pandas' hash table (sorted, so codes
+match scikit-learn's LabelEncoder), and the learned vocabularies are kept on the
+encoder. Applying the encoder to a new chunk, an extract of next month or the
+output of the synthesizer is one hash lookup per column against the saved
+vocabulary, so the same label always gets the same code and the same indicator
+column. Vocabularies are plain JSON (to_json / from_json).
+
+One-hot output of a column with more than SPARSE_MIN_LEVELS levels is built as
+pandas sparse columns from a CSR matrix: one stored value per row instead of one
+byte per row and level, i.e. megabytes instead of gigabytes for a 5,000-level
+column. Arrow (st.dataframe, Parquet, Feather) cannot hold sparse columns, use
+preview_frame() and densify() at those boundaries.
+'''
+
+import json
+
+import numpy as np
+import pandas as pd
+
+import lazy_imports
+import performance
+
+scipy_sparse = lazy_imports.lazy_module("scipy.sparse")
+
+SPARSE_MIN_LEVELS = 100  # one-hot columns of wider vocabularies are sparse when sparse=None
+PREVIEW_ROWS = 1_000  # rows shown of frames with sparse columns
+
+
+class CategoricalEncoder:
+    """
+    Label and one-hot encoder of several columns sharing one set of vocabularies.
+
+    Codes are positions in the sorted vocabulary of a column; missing values and
+    labels absent from the vocabulary get -1 (and no indicator in one-hot output).
+
+    Args:
+        vocabularies: Optional dict of column -> list of labels, e.g. from to_dict()
+    """
+
+    def __init__(self, vocabularies=None):
+        self.vocabularies_ = {col: pd.Index(labels) for col, labels in (vocabularies or {}).items()}
+
+    @performance.timed("categorical_encoder.fit")
+    def fit(self, df, columns, refit=False):
+        """Learn the vocabulary of every column in `columns` that has none yet (all of them with refit=True)."""
+        for col in columns:
+            if refit or col not in self.vocabularies_:
+                try:
+                    uniques = pd.factorize(df[col], sort=True)[1]
+                except TypeError:
+                    # Mixed label types (e.g. str and int) cannot be sorted
+                    uniques = pd.factorize(df[col])[1]
+                self.vocabularies_[col] = pd.Index(uniques)
+        return self
+
+    def codes(self, df, columns=None):
+        """
+        Return the codes of the encoded columns in `df`.
+
+        Returns:
+            dict: column -> np.ndarray of int64 codes (-1 for missing or unseen labels)
+        """
+        columns = list(self.vocabularies_) if columns is None else columns
+        return {col: self.vocabularies_[col].get_indexer(df[col]).astype(np.int64) for col in columns}
+
+    def unseen(self, df, columns=None):
+        """Number of non-missing values per column that are not in the vocabulary."""
+        return {col: int(((codes == -1) & df[col].notna().to_numpy()).sum())
+                for col, codes in self.codes(df, columns).items()}
+
+    @performance.timed("categorical_encoder.label_encode")
+    def label_encode(self, df, columns=None):
+        """Return a copy of `df` with the columns replaced by their codes."""
+        result_df = df.copy(deep=False)
+        for col, codes in self.codes(df, columns).items():
+            result_df[col] = codes
+        return result_df
+
+    def label_decode(self, df, columns=None):
+        """Map codes back to labels, e.g. for label-encoded synthetic output; -1 becomes missing."""
+        columns = [col for col in (self.vocabularies_ if columns is None else columns) if col in df.columns]
+        result_df = df.copy(deep=False)
+        for col in columns:
+            codes = df[col].to_numpy()
+            labels = self.vocabularies_[col].take(np.clip(codes, 0, None).astype(np.int64)).to_numpy(dtype=object, copy=True)
+            labels[codes < 0] = None
+            result_df[col] = labels
+        return result_df
+
+    def feature_names(self, col):
+        return [f"{col}_{label}" for label in self.vocabularies_[col]]
+
+    def csr(self, df, col):
+        """One-hot matrix of one column as scipy.sparse CSR, one stored value per non-missing row."""
+        codes = self.codes(df, [col])[col]
+        rows = np.flatnonzero(codes >= 0)
+        return scipy_sparse.csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, codes[rows])),
+            shape=(len(df), len(self.vocabularies_[col]))
+        )
+
+    def to_csr(self, df, columns=None):
+        """
+        One-hot encode columns into a single sparse matrix for estimators that accept one.
+
+        Returns:
+            tuple: (scipy.sparse.csr_matrix, list of feature names)
+        """
+        columns = list(self.vocabularies_) if columns is None else columns
+        matrix = scipy_sparse.hstack([self.csr(df, col) for col in columns], format="csr")
+        return matrix, [name for col in columns for name in self.feature_names(col)]
+
+    @performance.timed("categorical_encoder.one_hot")
+    def one_hot(self, df, columns=None, sparse=None):
+        """
+        Replace columns with indicator columns named like pd.get_dummies (`<column>_<label>`).
+
+        Args:
+            df: Data to encode
+            columns: Encoded columns, defaults to every column with a vocabulary
+            sparse: True/False to force the output type, None for sparse columns only
+                where the vocabulary has more than SPARSE_MIN_LEVELS labels
+
+        Returns:
+            DataFrame: Other columns first, then the indicators of each encoded column
+        """
+        columns = list(self.vocabularies_) if columns is None else columns
+        return pd.concat([df.drop(columns=columns)] + [self.indicators(df, col, sparse) for col in columns], axis=1)
+
+    def indicators(self, df, col, sparse=None):
+        """Indicator columns of one encoded column, see one_hot()."""
+        names = self.feature_names(col)
+        if sparse or (sparse is None and len(names) > SPARSE_MIN_LEVELS):
+            return pd.DataFrame.sparse.from_spmatrix(self.csr(df, col), index=df.index, columns=names)
+        codes = self.codes(df, [col])[col]
+        dense = np.zeros((len(df), len(names)), dtype=bool)
+        present = np.flatnonzero(codes >= 0)
+        dense[present, codes[present]] = True
+        return pd.DataFrame(dense, index=df.index, columns=names)
+
+    def to_dict(self):
+        return {col: [_json_label(label) for label in labels] for col, labels in self.vocabularies_.items()}
+
+    def to_json(self):
+        return json.dumps({'vocabularies': self.to_dict()}, indent=2)
+
+    @classmethod
+    def from_json(cls, content):
+        return cls(json.loads(content)['vocabularies'])
+
+
+def _json_label(label):
+    if isinstance(label, np.generic):
+        return label.item()
+    return label if isinstance(label, (str, int, float, bool)) else str(label)
+
+
+def has_sparse(df):
+    return any(isinstance(dtype, pd.SparseDtype) for dtype in df.dtypes)
+
+
+def missing_counts(df):
+    """df.isnull().sum(), which pandas cannot reduce over a mix of sparse and dense columns."""
+    if not has_sparse(df):
+        return df.isnull().sum()
+    sparse = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+    counts = df.drop(columns=sparse).isnull().sum()
+    for col in sparse:
+        counts[col] = int(df[col].isna().sum())
+    return counts.reindex(df.columns)
+
+
+def densify(df):
+    """Return `df` with sparse columns converted to dense ones (a shallow view when there are none)."""
+    if not has_sparse(df):
+        return df
+    result_df = df.copy(deep=False)
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.SparseDtype):
+            result_df[col] = df[col].sparse.to_dense()
+    return result_df
+
+
+def preview_frame(df, rows=PREVIEW_ROWS):
+    """Frame safe to hand to st.dataframe: the first `rows` rows densified if `df` has sparse columns."""
+    return densify(df.head(rows)) if has_sparse(df) else df
@@ -0,0 +1,154 @@
+''' On-disk columnar working store for parsed datasets.
+
+A parsed upload is written once, uncompressed, as an Arrow IPC (Feather v2) file named
+after its content hash and is then opened through a read-only memory map. Numeric
+columns become NumPy arrays pointing straight at the mapped pages and Arrow-backed
+string columns wrap the mapped buffers, so every session and view of the dataset
+reads the same OS page cache instead of holding a private heap copy. Mapped pages
+are clean file pages that the kernel can drop under memory pressure and fault back
+in on the next access; pandas Copy-on-Write gives a session that modifies a column
+its own copy of that column only.
+'''
+
+import os
+import tempfile
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import performance
+
+STORE_DIR = os.environ.get("HITL_EDA_STORE_DIR", os.path.join(tempfile.gettempdir(), "hitl_eda_store"))
+DEFAULT_MAX_MB = int(os.environ.get("HITL_EDA_STORE_MAX_MB", "4096"))
+FILE_SUFFIX = ".arrow"
+
+
+def _to_arrow(series):
+    # Float columns keep NaN as a value instead of a null so they map back without a copy
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iuf":
+        return pa.array(series.to_numpy(), from_pandas=False)
+    return pa.Array.from_pandas(series)
+
+
+def _from_arrow(column):
+    """
+    Convert one mapped Arrow column to pandas.
+
+    Returns:
+        tuple: (values, mapped) where mapped tells whether the values still point
+            at the memory map rather than at a heap copy
+    """
+    if (column.num_chunks == 1 and column.null_count == 0
+            and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type))):
+        return column.chunk(0).to_numpy(zero_copy_only=True), True
+    series = column.to_pandas()
+    return series, isinstance(series.array, pd.arrays.ArrowStringArray)
+
+
+# Function to tell whether a DataFrame can be stored and mapped back unchanged
+def is_storable(df):
+    return (
+        isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+        and all(isinstance(col, str) for col in df.columns)
+        and not df.columns.duplicated().any()
+    )
+
+
+class ColumnarStore:
+    """
+    Directory of memory-mappable Arrow IPC files keyed by dataset id.
+
+    Files are written to a temporary name and renamed into place, so concurrent
+    writers of the same dataset never expose a partial file. The least recently
+    opened files are deleted once the directory grows past `max_bytes`; frames that
+    still map a deleted file keep working until they are released.
+    """
+
+    def __init__(self, directory=STORE_DIR, max_bytes=DEFAULT_MAX_MB * 1024**2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, dataset_id):
+        return os.path.join(self.directory, dataset_id + FILE_SUFFIX)
+
+    def __contains__(self, dataset_id):
+        return os.path.exists(self.path_for(dataset_id))
+
+    @performance.timed("store.write")
+    def write(self, dataset_id, df):
+        """
+        Persist `df` under `dataset_id` unless it is already stored.
+
+        Returns:
+            str: Path of the stored file
+        """
+        path = self.path_for(dataset_id)
+        if os.path.exists(path):
+            return path
+
+        table = pa.table([_to_arrow(df[col]) for col in df.columns], names=list(df.columns))
+        partial = f"{path}.{uuid.uuid4().hex}.partial"
+        try:
+            with pa.OSFile(partial, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self._prune(keep=path)
+        return path
+
+    @performance.timed("store.open")
+    def open(self, dataset_id):
+        """
+        Memory-map a stored dataset.
+
+        Returns:
+            tuple: (DataFrame, resident_bytes) where resident_bytes is the heap memory
+                of the columns that could not be mapped without a copy (columns
+                with nulls, booleans, Python-object strings)
+        """
+        path = self.path_for(dataset_id)
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+        os.utime(path)  # recency for pruning
+
+        columns, resident_bytes = {}, 0
+        for name, column in zip(table.column_names, table.columns):
+            values, mapped = _from_arrow(column)
+            columns[name] = values
+            if not mapped:
+                resident_bytes += int(values.memory_usage(deep=True, index=False))
+        return pd.DataFrame(columns, copy=False), resident_bytes
+
+    def size_bytes(self):
+        return sum(os.path.getsize(path) for path in self._files())
+
+    def _files(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names if name.endswith(FILE_SUFFIX)]
+
+    def _prune(self, keep):
+        with self._lock:
+            files = sorted(self._files(), key=os.path.getmtime)
+            total = sum(os.path.getsize(path) for path in files)
+            for path in files:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                size = os.path.getsize(path)
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Windows refuses to delete a file that is still mapped
+                    continue
+                total -= size
@@ -5,20 +5,40 @@ This is so as to reduce the clutter in the main file and isolate the core functi
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from collections import Counter
-import plotly.express as px
+import lazy_imports
+import associations
+import duplicate_detection
+import execution_backend
+import performance
+
+# Plotting libraries are imported on first use so the Home page loads without them
+plt = lazy_imports.lazy_module("matplotlib.pyplot")
+sns = lazy_imports.lazy_module("seaborn")
+px = lazy_imports.lazy_module("plotly.express")
 
 # Function to load the csv data to a dataframe
+@performance.timed()
 def load_data(file):
     return pd.read_csv(file)
 
+# Function to pick the rows a chart is drawn from: the whole frame in pandas, a sample for out-of-core engines
+def plot_frame(data):
+    if isinstance(data, execution_backend.PandasBackend):
+        return data.df
+    with performance.track("sample_for_plot"):
+        return data.sample()
+
 # Function to find categorical and numerical columns/variables in dataset
+# (accepts a DataFrame or an execution backend, like the display functions below)
+@performance.timed()
 def categorical_numerical(df):
+    data = execution_backend.as_backend(df)
+    unique_counts = data.nunique()
+    object_columns = set(data.object_columns())
     num_columns,cat_columns = [],[]
-    for col in df.columns:
-        if len(df[col].unique()) <= 30 or df[col].dtype== np.object_:
+    for col in data.columns:
+        if unique_counts[col] <= 30 or col in object_columns:
             cat_columns.append(col.strip())
 
         else:
@@ -27,17 +47,42 @@ def categorical_numerical(df):
     return num_columns,cat_columns
 
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_duplicate_summary(_df, version):
+    with performance.track("find_duplicates", _df):
+        return duplicate_detection.find_duplicates(_df)
+
+# Function to find duplicate rows, cached per dataset version so reruns do not rescan the table
+def duplicate_summary(df, version=None):
+    if version is None:
+        return duplicate_detection.find_duplicates(df)
+    return _cached_duplicate_summary(df, version)
+
+
 # Function to display dataset overview
-def display_dataset_overview(df,cat_columns,num_columns):
-    
-    display_rows = st.slider("Display Rows", 1, len(df), len(df) if len(df) < 20 else 20)
+def display_dataset_overview(df,cat_columns,num_columns,version=None):
+    data = execution_backend.as_backend(df)
+    n_rows = data.shape[0]
+
+    display_rows = st.slider("Display Rows", 1, n_rows, n_rows if n_rows < 20 else 20)
 
-    st.write(df.head(display_rows))
+    st.write(data.head(display_rows))
 
     st.subheader("2. Dataset Overview")
-    st.write(f"**Rows:** {df.shape[0]}")
-    st.write(f"**Columns:** {df.shape[1]}")
-    st.write(f"**Duplicates:** {df.shape[0] - df.drop_duplicates().shape[0]}")
+    st.write(f"**Rows:** {data.shape[0]}")
+    st.write(f"**Columns:** {data.shape[1]}")
+    if not isinstance(data, execution_backend.PandasBackend):
+        # Pushed down to the engine; duplicate groups need the rows in memory
+        st.write(f"**Duplicates:** {data.duplicate_count()}")
+        duplicates = {'duplicate_count': 0}
+    else:
+        duplicates = duplicate_summary(df, version)
+        st.write(f"**Duplicates:** {duplicates['duplicate_count']}")
+    if duplicates['duplicate_count'] > 0:
+        with st.expander(f"Duplicate Groups ({len(duplicates['groups'])})"):
+            groups = duplicates['groups']
+            duplicate_rows = df.iloc[groups['first_row']].reset_index(drop=True)
+            st.write(pd.concat([groups[['count']].rename(columns={'count': 'Occurrences'}), duplicate_rows], axis=1))
     st.write(f"**Categorical Columns:** {len(cat_columns)}")
     st.write(cat_columns)
     st.write(f"**Numerical Columns:** {len(num_columns)}")
@@ -46,8 +91,10 @@ def display_dataset_overview(df,cat_columns,num_columns):
 
 # Function to find the missing values in the dataset
 def display_missing_values(df):
-    missing_count = df.isnull().sum()
-    missing_percentage = (missing_count / len(df)) * 100
+    data = execution_backend.as_backend(df)
+    with performance.track("null_counts"):
+        missing_count = data.null_counts()
+    missing_percentage = (missing_count / data.shape[0]) * 100
     missing_data = pd.DataFrame({'Missing Count': missing_count, 'Missing Percentage': missing_percentage})
     missing_data = missing_data[missing_data['Missing Count'] > 0].sort_values(by='Missing Count', ascending=False)
     if not missing_data.empty:
@@ -61,9 +108,11 @@ def display_missing_values(df):
 def display_statistics_visualization(df,cat_columns,num_columns):
     st.write("Summary Statistics for Numerical Columns")
 
+    data = execution_backend.as_backend(df)
     if len(num_columns)!=0:
-        num_df = df[num_columns]
-        st.write(num_df.describe())
+        with performance.track("describe"):
+            num_description = data.describe(num_columns)
+        st.write(num_description)
 
     else:
         st.info("The dataset does not have any numerical columns")
@@ -76,12 +125,13 @@ def display_statistics_visualization(df,cat_columns,num_columns):
 
         for column in selected_cat_columns:
             st.write(f"**{column}**")
-            value_counts = df[column].value_counts()
+            with performance.track("value_counts"):
+                value_counts = data.value_counts(column)
             st.bar_chart(value_counts)
 
             # display the value count in tabular format
             st.write(f"Value Count for {column}")
-            value_counts_table = df[column].value_counts().reset_index()
+            value_counts_table = value_counts.reset_index()
             value_counts_table.columns = ['Value','Count']
             st.write(value_counts_table)
 
@@ -91,13 +141,24 @@ def display_statistics_visualization(df,cat_columns,num_columns):
 # Funciton to display the datatypes
 def display_data_types(df):
 
-    data_types_df = pd.DataFrame({'Data Type':df.dtypes})
+    data_types_df = pd.DataFrame({'Data Type':execution_backend.as_backend(df).dtypes()})
     st.write(data_types_df)
 
 # Function to search for a particular column or particular datatype in the dataset
 def search_column(df):
     search_query = st.text_input("Search for a column:")
 
+    data = execution_backend.as_backend(df)
+    if not isinstance(data, execution_backend.PandasBackend):
+        # Out-of-core engines: filter on the schema and preview the first rows only
+        dtypes = data.dtypes()
+        selected_data_type = st.selectbox("Filter by Data Type:", ['All'] + dtypes.unique().tolist())
+        columns = [col for col in data.columns
+                   if (not search_query or search_query.lower() in str(col).lower())
+                   and (selected_data_type == 'All' or dtypes[col] == selected_data_type)]
+        st.write(data.head(1000)[columns])
+        return
+
     selected_data_type = st.selectbox("Filter by Data Type:", ['All'] + df.dtypes.unique().tolist())
 
     # Apply filters to the DataFrame
@@ -128,10 +189,12 @@ def display_individual_feature_distribution(df,num_columns):
 
     st.write("#### Understanding Numerical Features")
     feature = st.selectbox(label="Select Numerical Feature", options=num_columns, index=0)
-    df_description = df.describe()
+    data = execution_backend.as_backend(df)
+    with performance.track("describe"):
+        df_description = data.describe([feature])
 
     # Display summary statistics
-    null_count = df[feature].isnull().sum()
+    null_count = data.shape[0] - int(df_description[feature]['count'])
     st.write("Count: ", df_description[feature]['count'])
     st.write("Missing Count: ", null_count)
     st.write("Mean: ", df_description[feature]['mean'])
@@ -142,6 +205,7 @@ def display_individual_feature_distribution(df,num_columns):
     # create plots for distribution
     st.subheader("Distribution Plots")
     plot_type = st.selectbox(label="Select Plot Type",options=['Histogram','Scatter Plot','Density Plot','Box Plot'])
+    df = plot_frame(data)
 
     if plot_type=='Histogram':
         fig=px.histogram(df,x=feature,title=f'Histogram of {feature}')
@@ -155,7 +219,8 @@ def display_individual_feature_distribution(df,num_columns):
     elif plot_type=='Box Plot':
         fig = px.box(df,y=feature,title=f'Box plot of {feature}')
 
-    st.plotly_chart(fig,use_container_width=True)
+    with performance.track("render_figure"):
+        st.plotly_chart(fig,use_container_width=True)
 
 
 def display_scatter_plot_of_two_numeric_features(df,num_columns):
@@ -167,6 +232,7 @@ def display_scatter_plot_of_two_numeric_features(df,num_columns):
     if len(num_columns)!=0:
         x_feature = st.selectbox(label="Select X-Axis Feature", options=num_columns, index=0)
         y_feature = st.selectbox(label="Select Y-Axis Feature", options=num_columns, index=1)
+        df = plot_frame(execution_backend.as_backend(df))
 
         scatter_fig = px.scatter(df, x=x_feature, y=y_feature, title=f'Scatter Plot: {x_feature} vs {y_feature}')
         st.plotly_chart(scatter_fig, use_container_width=True)
@@ -177,6 +243,9 @@ def categorical_variable_analysis(df,cat_columns):
 
     categorical_feature = st.selectbox(label="Select Categorical Feature",options=cat_columns)
     categorical_plot_type = st.selectbox(label="Select Plot Type",options=["Bar Chart","Pie Chart","Stacked Bar Chart","Frequency Count"])
+    data = execution_backend.as_backend(df)
+    if categorical_plot_type != "Frequency Count":
+        df = plot_frame(data)
     
     if categorical_plot_type =="Bar Chart":
         fig = px.bar(df,x=categorical_feature,title=f"Bar Chart of {categorical_feature}")
@@ -191,7 +260,8 @@ def categorical_variable_analysis(df,cat_columns):
         fig = px.bar(df,x=categorical_feature,color=second_categorical_feature,title=f"Stacked Bar Chart of {categorical_feature} by {second_categorical_feature}")
 
     elif categorical_plot_type == "Frequency Count":
-        cat_value_counts = df[categorical_feature].value_counts()
+        with performance.track("value_counts"):
+            cat_value_counts = data.value_counts(categorical_feature)
         st.write(f"Frequency Count for {categorical_feature}: ")
         st.write(cat_value_counts)
 
@@ -199,8 +269,9 @@ def categorical_variable_analysis(df,cat_columns):
         st.plotly_chart(fig,use_container_width=True) 
 
 
-def feature_exploration_numerical_variables(df,num_columns):
+def feature_exploration_numerical_variables(df,num_columns,version=None):
     selected_features = st.multiselect("Select Features for Exploration:", num_columns, default=num_columns[:2], key="feature_exploration")
+    data = execution_backend.as_backend(df)
 
     if len(selected_features) < 2:
         st.warning("Please select at least two numerical features for exploration.")
@@ -209,17 +280,21 @@ def feature_exploration_numerical_variables(df,num_columns):
 
         # Scatter Plot Matrix
         if st.button("Generate Scatter Plot Matrix"):
+            df = plot_frame(data)
             scatter_matrix_fig = px.scatter_matrix(df, dimensions=selected_features, title="Scatter Plot Matrix")
             st.plotly_chart(scatter_matrix_fig, use_container_width=True)
 
         # Pair Plot
         if st.button("Generate Pair Plot"):
-            pair_plot_fig = sns.pairplot(df[selected_features])
-            st.pyplot(pair_plot_fig)
+            df = plot_frame(data)
+            with performance.track("render_figure", df[selected_features]):
+                pair_plot_fig = sns.pairplot(df[selected_features])
+                st.pyplot(pair_plot_fig)
 
         # Correlation Heatmap
         if st.button("Generate Correlation Heatmap"):
-            correlation_matrix = df[selected_features].corr()
+            # Sliced from the association matrix of the whole dataset, computed once per version
+            correlation_matrix = associations.cached_association_matrix(plot_frame(data), version).loc[selected_features, selected_features]
             plt.figure(figsize=(10, 6))
             sns.heatmap(correlation_matrix, annot=True, cmap="coolwarm", linewidths=0.5)
             plt.title("Correlation Heatmap")
@@ -231,7 +306,8 @@ def categorical_numerical_variable_analysis(df,cat_columns,num_columns):
     numerical_feature_1 = st.selectbox(label="Numerical Feature", options=num_columns)
 
 # Group by the selected categorical column and calculate the mean of the numerical column
-    group_data = df.groupby(categorical_feature_1)[numerical_feature_1].mean().reset_index()
+    with performance.track("groupby_mean"):
+        group_data = execution_backend.as_backend(df).group_mean(categorical_feature_1, numerical_feature_1)
 
     st.subheader("Relationship between Categorical and Numerical Variables")
     st.write(f"Mean {numerical_feature_1} by {categorical_feature_1}")
@@ -0,0 +1,137 @@
+''' Export subsystem for processed and synthetic datasets.
+
+Files are serialized lazily: the download buttons hand Streamlit a callable, so nothing
+is written until the user actually clicks. Exports go to a temporary file on disk
+and Streamlit receives the open file handle instead of a CSV string or a base64 data URI.
+'''
+
+import functools
+import importlib.util
+import os
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+import categorical_encoding
+
+# Supported export formats: file extension, mime type and the optional package they need
+EXPORT_FORMATS = {
+    "CSV": {"extension": "csv", "mime": "text/csv", "requires": None},
+    "CSV (gzip)": {"extension": "csv.gz", "mime": "application/gzip", "requires": None},
+    "CSV (zstd)": {"extension": "csv.zst", "mime": "application/zstd", "requires": "zstandard"},
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet", "requires": "pyarrow"},
+    "Feather": {"extension": "feather", "mime": "application/vnd.apache.arrow.file", "requires": "pyarrow"},
+}
+
+
+# Function to list the export formats whose optional dependencies are installed
+def available_export_formats():
+    return [name for name, spec in EXPORT_FORMATS.items()
+            if spec["requires"] is None or importlib.util.find_spec(spec["requires"]) is not None]
+
+
+def write_export(df, target, export_format):
+    """
+    Serialize a DataFrame in one of the EXPORT_FORMATS.
+
+    Args:
+        df: The DataFrame to export
+        target: A file path or a binary file handle opened for writing
+        export_format: Key of EXPORT_FORMATS
+    """
+    if export_format == "CSV":
+        df.to_csv(target, index=False)
+    elif export_format == "CSV (gzip)":
+        df.to_csv(target, index=False, compression={"method": "gzip", "compresslevel": 6})
+    elif export_format == "CSV (zstd)":
+        df.to_csv(target, index=False, compression={"method": "zstd", "level": 3})
+    elif export_format == "Parquet":
+        categorical_encoding.densify(df).to_parquet(target, index=False, compression="zstd")
+    elif export_format == "Feather":
+        df = categorical_encoding.densify(df)  # Arrow has no sparse columns
+        # Feather only stores a default RangeIndex
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            df = df.reset_index(drop=True)
+        df.to_feather(target, compression="zstd")
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def _open_written_tempfile(extension, write):
+    # Streamlit accepts a reader opened with open(path, "rb"), not a TemporaryFile handle
+    directory = tempfile.mkdtemp(prefix="hitl_eda_export_")
+    path = os.path.join(directory, f"export.{extension}")
+    try:
+        write(path)
+        return open(path, "rb")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+
+
+def export_to_tempfile(df, export_format):
+    """
+    Write a DataFrame to a temporary file and return it opened for reading.
+
+    The file lives on disk rather than in memory; it is unlinked right after opening,
+    so it disappears when the handle is closed or garbage collected.
+    """
+    return _open_written_tempfile(EXPORT_FORMATS[export_format]["extension"],
+                                  lambda path: write_export(df, path, export_format))
+
+
+def download_dataframe_button(df, file_stem, label="📥 Download", key=None, button_type="secondary"):
+    """
+    Render one download button per available format, each serializing the data on click.
+
+    Buttons use on_click="ignore", so downloading neither reruns the script nor
+    clears results that were rendered behind another button.
+
+    Args:
+        df: The DataFrame to offer for download
+        file_stem: File name without extension
+        label: Download button label, suffixed with the format name
+        key: Unique widget key prefix, required when several exports share a page
+        button_type: Streamlit button type ("primary" or "secondary")
+    """
+    for export_format in available_export_formats():
+        spec = EXPORT_FORMATS[export_format]
+        st.download_button(
+            label=f"{label} ({export_format})",
+            data=functools.partial(export_to_tempfile, df, export_format),
+            file_name=f"{file_stem}.{spec['extension']}",
+            mime=spec["mime"],
+            key=f"{key}_{spec['extension']}" if key else None,
+            type=button_type,
+            on_click="ignore"
+        )
+
+
+# Formats an execution backend writes itself, straight from the engine to disk
+BACKEND_FORMATS = {"Parquet": "parquet", "CSV": "csv"}
+
+
+def export_backend_to_tempfile(backend, file_format):
+    """
+    Have a backend write its data to a temporary file and return the open handle.
+
+    The rows go from the engine to disk without passing through pandas; the file is
+    unlinked right after opening, so it disappears when the handle is closed.
+    """
+    return _open_written_tempfile(file_format, lambda path: backend.write(path, file_format))
+
+
+def download_backend_button(backend, file_stem, label="📥 Download", key=None):
+    """Render one download button per BACKEND_FORMATS entry, each exporting the backend on click."""
+    for export_format, file_format in BACKEND_FORMATS.items():
+        spec = EXPORT_FORMATS[export_format]
+        st.download_button(
+            label=f"{label} ({export_format})",
+            data=functools.partial(export_backend_to_tempfile, backend, file_format),
+            file_name=f"{file_stem}.{spec['extension']}",
+            mime=spec["mime"],
+            key=f"{key}_{spec['extension']}" if key else None,
+            on_click="ignore"
+        )
@@ -1,69 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from scipy import stats
+import categorical_encoding
+import duplicate_detection
+import execution_backend
+import lazy_imports
+import model_imputation
+import performance
+import resource_manager
+import streaming_transforms
+
+# SciPy is imported on first use so the Home page loads without it
+stats = lazy_imports.lazy_module("scipy.stats")
+
+# Column-parallel execution pays off above these sizes (rows x selected columns)
+PARALLEL_MIN_CELLS = 2_000_000
+
+
+# Function to pick the number of column workers, bounded by the threads of a job
+def column_workers(df, columns, min_cells=PARALLEL_MIN_CELLS):
+    if len(columns) < 2 or len(df) * len(columns) < min_cells:
+        return 1
+    return max(1, min(len(columns), resource_manager.get_manager().threads))
+
+
+def map_columns(func, columns, workers=1):
+    """
+    Run func(column) for every column, in a thread pool when workers > 1.
+
+    For work that releases the GIL (NumPy reductions and sorts, pandas hashing and
+    factorize), which is most of the per-column work of this module.
+
+    Returns:
+        dict: column -> result, in the order of `columns`
+    """
+    if workers <= 1:
+        return {col: func(col) for col in columns}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(columns, pool.map(func, columns)))
+
+
+def assign_columns(df, results):
+    """Shallow copy of `df` with the columns in `results` replaced; other columns are not copied."""
+    result_df = df.copy(deep=False)
+    for col, values in results.items():
+        result_df[col] = values
+    return result_df
+
+
+def fit_columns(transform, df, columns):
+    """Fit a streaming transform column by column in parallel."""
+    map_columns(lambda col: transform.partial_fit_column(df, col), columns, column_workers(df, columns))
+    return transform
 
 
+def transform_columns(transform, df, columns):
+    transform.params  # computed once, before the threads read it
+    return assign_columns(df, map_columns(lambda col: transform.transform_column(df, col), columns, column_workers(df, columns)))
+
+
+@performance.timed()
 def remove_selected_columns(df, columns_remove):
+    if isinstance(df, execution_backend.Backend):
+        return df.drop_columns(columns_remove)
     # Create a copy to avoid modifying the original
     result_df = df.copy()
     return result_df.drop(columns=columns_remove)
 
 # Create a function to remove rows with missing values in specific columns
+@performance.timed()
 def remove_rows_with_missing_data(df, columns):
+    if isinstance(df, execution_backend.Backend):
+        return df.drop_null_rows(columns)
     # Create a copy to avoid modifying the original
     result_df = df.copy()
     if columns:
         result_df = result_df.dropna(subset=columns)
     return result_df
 
-# Create a function to fill missing data with mean, median, or mode (for numerical columns)
-def fill_missing_data(df, columns, method):
-    # Create a copy to avoid modifying the original
-    result_df = df.copy()
-    for column in columns:
-        if method == 'mean':
-            result_df[column] = result_df[column].fillna(result_df[column].mean())
-        elif method == 'median':
-            result_df[column] = result_df[column].fillna(result_df[column].median())
-        elif method == 'mode':
-            mode_val = result_df[column].mode().iloc[0]
-            result_df[column] = result_df[column].fillna(mode_val)
-    return result_df
-
-
-def one_hot_encode(df, columns):
-    # Create one-hot encoded dataframe
-    result_df = pd.get_dummies(df, columns=columns, prefix=columns, drop_first=False)
-    return result_df
-
-
-def label_encode(df, columns):
-    # Create a copy to avoid modifying the original
-    result_df = df.copy()
-    label_encoder = LabelEncoder()
-    for col in columns:
-        result_df[col] = label_encoder.fit_transform(result_df[col])
-    return result_df
-
-
-
-def standard_scale(df, columns):
-    # Create a copy to avoid modifying the original
-    result_df = df.copy()
-    scaler = StandardScaler()
-    result_df[columns] = scaler.fit_transform(result_df[columns])
-    return result_df
-
-def min_max_scale(df, columns, feature_range=(0, 1)):
-    # Create a copy to avoid modifying the original
-    result_df = df.copy()
-    scaler = MinMaxScaler(feature_range=feature_range)
-    result_df[columns] = scaler.fit_transform(result_df[columns])
-    return result_df
-
+# Create a function to fill missing data with mean, median, mode, KNN or iterative imputation (for numerical columns)
+@performance.timed()
+def fill_missing_data(df, columns, method, imputer=None, **options):
+    if method in model_imputation.METHODS:
+        # Model-based imputation needs the rows in memory, whatever the backend
+        if isinstance(df, execution_backend.Backend):
+            return execution_backend.PandasBackend(model_imputation.impute(df.to_pandas(), columns, method, **options))
+        return model_imputation.impute(df, columns, method, **options)
+    if isinstance(df, execution_backend.Backend):
+        return df.fill_nulls(columns, method)
+    # Fitted state is kept on the imputer so the same fill values can be reused
+    imputer = imputer or streaming_transforms.StreamingImputer(columns, method)
+    fit_columns(imputer, df, columns)
+    return transform_columns(imputer, df, columns)
+
+
+@performance.timed()
+def one_hot_encode(df, columns, sparse=None, encoder=None):
+    # One factorize per column; wide vocabularies become sparse indicator columns
+    encoder = encoder or categorical_encoding.CategoricalEncoder()
+    workers = column_workers(df, columns)
+    map_columns(lambda col: encoder.fit(df, [col]), columns, workers)
+    indicators = map_columns(lambda col: encoder.indicators(df, col, sparse), columns, workers)
+    return pd.concat([df.drop(columns=columns)] + list(indicators.values()), axis=1)
+
+
+@performance.timed()
+def label_encode(df, columns, encoder=None):
+    # Codes follow the sorted vocabulary like LabelEncoder; missing values become -1
+    encoder = encoder or categorical_encoding.CategoricalEncoder()
+    workers = column_workers(df, columns)
+    map_columns(lambda col: encoder.fit(df, [col]), columns, workers)
+    return assign_columns(df, map_columns(lambda col: encoder.codes(df, [col])[col], columns, workers))
+
+
+@performance.timed()
+def standard_scale(df, columns, scaler=None):
+    if isinstance(df, execution_backend.Backend):
+        return df.standard_scale(columns)
+    scaler = scaler or streaming_transforms.StreamingStandardScaler(columns)
+    fit_columns(scaler, df, columns)
+    return transform_columns(scaler, df, columns)
+
+@performance.timed()
+def min_max_scale(df, columns, feature_range=(0, 1), scaler=None):
+    if isinstance(df, execution_backend.Backend):
+        return df.min_max_scale(columns, feature_range)
+    scaler = scaler or streaming_transforms.StreamingMinMaxScaler(columns, feature_range)
+    fit_columns(scaler, df, columns)
+    return transform_columns(scaler, df, columns)
+
+@performance.timed()
 def detect_outliers_iqr(df, column_name):
     data = df[column_name]
     q25, q50, q75 = np.percentile(data, [25, 50, 75])
@@ -76,6 +144,7 @@ def detect_outliers_iqr(df, column_name):
 
 
 # Function to detect outliers using z-score
+@performance.timed()
 def detect_outliers_zscore(df, column_name):
     data = df[column_name]
     z_scores = np.abs(stats.zscore(data))
@@ -84,9 +153,11 @@ def detect_outliers_zscore(df, column_name):
     return outlier_indices
 
 
+@performance.timed()
 def remove_outliers(df, column_name, outlier_indices):
     return df.drop(index=df.index[outlier_indices]).reset_index(drop=True)
 
+@performance.timed()
 def transform_outliers(df, column_name, outlier_indices):
     # Create a copy to avoid modifying the original
     result_df = df.copy()
@@ -97,3 +168,12 @@ def transform_outliers(df, column_name, outlier_indices):
         # Replace outliers with median
         result_df.iloc[outlier_indices, result_df.columns.get_loc(column_name)] = median_value
     return result_df
+
+# Function to drop exact duplicate rows, keeping the first occurrence of every record
+@performance.timed()
+def drop_duplicate_rows(df, duplicate_mask=None):
+    if isinstance(df, execution_backend.Backend):
+        return df.drop_duplicates()
+    if duplicate_mask is None:
+        duplicate_mask = duplicate_detection.find_duplicates(df)['duplicate_mask']
+    return df.loc[~duplicate_mask].reset_index(drop=True)
@@ -0,0 +1,155 @@
+''' Process-wide cache of parsed datasets shared by all browser sessions.
+
+Uploads are content-addressed by a hash of the file bytes, so N sessions opening the
+same extract trigger one parse and hold one copy. The parsed frame is persisted to the
+columnar store and served memory-mapped, so that copy lives in the OS page cache
+rather than on the heap, and a restarted server maps it again without re-parsing.
+Sessions receive shallow views and pandas Copy-on-Write makes sure a session that
+starts preprocessing copies only the columns it modifies, never the shared frame.
+Entries are evicted least recently used first once the configured ceiling on heap
+memory is exceeded.
+'''
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+import columnar_store
+import data_analysis_functions as function
+import performance
+
+# Copy-on-Write is always on from pandas 3.0; earlier 2.x releases need the opt-in
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+DEFAULT_MAX_MB = int(os.environ.get("DATASET_CACHE_MAX_MB", "1024"))
+
+
+# Function to build the content key of an uploaded file
+def fingerprint_bytes(content):
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class SharedDatasetCache:
+    """
+    Thread-safe LRU cache of DataFrames bounded by the heap memory they hold.
+
+    Concurrent requests for a key that is still being parsed wait for the first
+    parse instead of starting their own.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (DataFrame, heap size in bytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock held while the key is being parsed
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached frame for `key`, calling `loader` on a miss.
+
+        `loader` returns a (DataFrame, size in bytes) tuple; memory-mapped columns
+        are left out of the size since their pages belong to the OS page cache.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another session may have finished parsing while we waited
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+
+            try:
+                df, size = loader()
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+
+            with self._lock:
+                self.misses += 1
+                self._loading.pop(key, None)
+                self._entries[key] = (df, size)
+                self._total_bytes += size
+                self._evict()
+            return df
+
+    def _evict(self):
+        # Keep at least the newest entry even when it alone exceeds the ceiling
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_mb": self._total_bytes / 1024**2,
+                "max_mb": self.max_bytes / 1024**2,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@st.cache_resource
+def get_shared_cache(max_mb=DEFAULT_MAX_MB):
+    return SharedDatasetCache(max_bytes=max_mb * 1024**2)
+
+
+@st.cache_resource
+def get_store():
+    return columnar_store.ColumnarStore()
+
+
+# Function to parse an upload into the columnar store (unless already stored) and map it
+def _load_mapped(content, dataset_id):
+    store = get_store()
+    if dataset_id not in store:
+        df = function.load_data(io.BytesIO(content))
+        if not columnar_store.is_storable(df):
+            return df, int(df.memory_usage(deep=True).sum())
+        try:
+            store.write(dataset_id, df)
+        except pa.ArrowException:
+            # Object columns mixing types (e.g. ints and strings) have no Arrow type; serve them from the heap
+            return df, int(df.memory_usage(deep=True).sum())
+    return store.open(dataset_id)
+
+
+@performance.timed()
+def load_shared_dataset(uploaded_file):
+    """
+    Parse an uploaded file once per process and return a read-only view of it.
+
+    Args:
+        uploaded_file: The uploaded file object from Streamlit
+
+    Returns:
+        tuple: (dataset_id, DataFrame) where dataset_id is the content hash and the
+            DataFrame is a shallow Copy-on-Write view of the shared memory-mapped frame
+    """
+    content = uploaded_file.getvalue()
+    dataset_id = fingerprint_bytes(content)
+    df = get_shared_cache().get_or_load(dataset_id, lambda: _load_mapped(content, dataset_id))
+    return dataset_id, df.copy(deep=False)
@@ -0,0 +1,100 @@
+''' Duplicate row detection based on vectorized 64-bit row hashing.
+
+Every row is reduced to a single uint64 with pd.util.hash_pandas_object, so finding
+candidate duplicates is a hash lookup instead of a full drop_duplicates() copy of the
+table. Candidates are then verified against the real values so hash collisions are
+never reported as duplicates.
+'''
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+# Function to split a dataframe into row chunks so hashing never materialises more than one chunk at a time
+def iter_row_chunks(df, chunk_size=DEFAULT_CHUNK_SIZE):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def hash_rows(chunks):
+    """
+    Hash every row of an iterable of DataFrame chunks into one uint64 array.
+
+    Args:
+        chunks: A DataFrame or an iterable of DataFrames sharing the same columns,
+            e.g. pd.read_csv(path, chunksize=...) for files that do not fit in memory
+
+    Returns:
+        np.ndarray: One uint64 hash per row, in row order
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = iter_row_chunks(chunks)
+
+    hashes = [pd.util.hash_pandas_object(chunk, index=False).to_numpy() for chunk in chunks]
+    if not hashes:
+        return np.empty(0, dtype=np.uint64)
+    return np.concatenate(hashes)
+
+
+def count_duplicate_hashes(chunks):
+    """
+    Count duplicate rows of a chunked source from row hashes alone.
+
+    Only 8 bytes per row are kept in memory, which makes this usable on files larger
+    than RAM. The result is an upper bound that equals the exact count unless two
+    distinct rows collide on their 64-bit hash.
+    """
+    hashes = hash_rows(chunks)
+    return int(len(hashes) - len(np.unique(hashes)))
+
+
+def find_duplicates(df, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Find exact duplicate rows in a DataFrame.
+
+    Rows are hashed chunk by chunk, rows whose hash occurs more than once become
+    candidates, and only the candidates are compared value by value.
+
+    Args:
+        df: The DataFrame to analyse
+        chunk_size: Number of rows hashed at a time
+
+    Returns:
+        dict: duplicate_count (rows that repeat an earlier row, same as
+            len(df) - len(df.drop_duplicates())), duplicate_mask (bool array marking
+            the repeated rows, first occurrences excluded) and groups (DataFrame with
+            one row per duplicated record: group, first_row, count)
+    """
+    duplicate_mask = np.zeros(len(df), dtype=bool)
+    empty_groups = pd.DataFrame({'group': pd.Series(dtype='int64'),
+                                 'first_row': pd.Series(dtype='int64'),
+                                 'count': pd.Series(dtype='int64')})
+    if df.empty:
+        return {'duplicate_count': 0, 'duplicate_mask': duplicate_mask, 'groups': empty_groups}
+
+    hashes = pd.Series(hash_rows(iter_row_chunks(df, chunk_size)))
+    candidate_positions = np.flatnonzero(hashes.duplicated(keep=False).to_numpy())
+    if len(candidate_positions) == 0:
+        return {'duplicate_count': 0, 'duplicate_mask': duplicate_mask, 'groups': empty_groups}
+
+    # Verify the candidates on their real values so a hash collision is never counted
+    candidates = df.iloc[candidate_positions].reset_index(drop=True)
+    candidates.columns = range(candidates.shape[1])
+    group_ids = candidates.groupby(list(candidates.columns), dropna=False, sort=False).ngroup().to_numpy()
+
+    group_sizes = np.bincount(group_ids)
+    is_repeated = group_sizes[group_ids] > 1
+    repeated_positions = candidate_positions[is_repeated]
+    repeated_groups = group_ids[is_repeated]
+
+    first_seen = pd.Series(repeated_groups).duplicated(keep='first').to_numpy()
+    duplicate_mask[repeated_positions[first_seen]] = True
+
+    groups = pd.DataFrame({'group': repeated_groups, 'first_row': repeated_positions})
+    groups = groups.groupby('group', sort=False).agg(first_row=('first_row', 'min'), count=('first_row', 'size'))
+    groups = groups.reset_index().sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+    groups['group'] = np.arange(len(groups))
+
+    return {'duplicate_count': int(duplicate_mask.sum()), 'duplicate_mask': duplicate_mask, 'groups': groups}
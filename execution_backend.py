@@ -0,0 +1,691 @@
+''' Pluggable execution backends for exploration and preprocessing.
+
+The analysis and preprocessing functions talk to the data through a small Backend
+interface instead of a pandas DataFrame. PandasBackend wraps an in-memory frame and
+keeps the original behaviour. DuckDBBackend keeps the data in a disk-backed DuckDB
+table and PolarsBackend in a Polars LazyFrame, so aggregations run as pushed-down,
+multithreaded queries and only small results (summaries, counts, previews, plot
+samples) come back as pandas objects. Both can scan a file directly, which makes
+files larger than memory usable.
+
+Preprocessing operations return a new backend and never modify the one they are
+called on, like the pandas functions in data_preprocessing_function.
+'''
+
+import importlib.util
+import itertools
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import duplicate_detection
+
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+# Rows pulled into pandas when a chart needs raw values instead of an aggregate
+PLOT_SAMPLE_ROWS = 50_000
+
+# Server-side files the engines may open in place; sessions can only pick files directly inside it
+DATA_DIR = os.environ.get("HITL_EDA_DATA_DIR", "data_files")
+
+
+class Backend:
+    """
+    Interface shared by all execution backends.
+
+    Results are always small pandas objects shaped like their pandas equivalents:
+    describe() matches DataFrame.describe(), value_counts() Series.value_counts(),
+    group_mean() df.groupby(by)[column].mean().reset_index().
+    """
+
+    engine = None
+
+    @property
+    def shape(self):
+        raise NotImplementedError
+
+    @property
+    def columns(self):
+        raise NotImplementedError
+
+    def numeric_columns(self):
+        raise NotImplementedError
+
+    def object_columns(self):
+        raise NotImplementedError
+
+    def dtypes(self):
+        raise NotImplementedError
+
+    def head(self, n=5):
+        raise NotImplementedError
+
+    def sample(self, n=PLOT_SAMPLE_ROWS, seed=0):
+        raise NotImplementedError
+
+    def describe(self, columns=None):
+        raise NotImplementedError
+
+    def value_counts(self, column, limit=None):
+        raise NotImplementedError
+
+    def group_mean(self, by, column):
+        raise NotImplementedError
+
+    def null_counts(self):
+        raise NotImplementedError
+
+    def nunique(self, columns=None):
+        raise NotImplementedError
+
+    def duplicate_count(self):
+        raise NotImplementedError
+
+    def to_pandas(self, limit=None):
+        raise NotImplementedError
+
+    # Preprocessing operations, each returning a new backend
+    def drop_columns(self, columns):
+        raise NotImplementedError
+
+    def drop_null_rows(self, columns):
+        raise NotImplementedError
+
+    def fill_nulls(self, columns, method):
+        raise NotImplementedError
+
+    def standard_scale(self, columns):
+        raise NotImplementedError
+
+    def min_max_scale(self, columns, feature_range=(0, 1)):
+        raise NotImplementedError
+
+    def drop_duplicates(self):
+        raise NotImplementedError
+
+    def write(self, path, file_format="parquet"):
+        raise NotImplementedError
+
+    # Temporary files and directories (spooled uploads, DuckDB databases) live as long as the backend
+    def own_paths(self, *paths):
+        """Delete `paths` on close(), or when the backend is garbage collected."""
+        self._finalizers = getattr(self, "_finalizers", []) + [weakref.finalize(self, _remove_path, path) for path in paths]
+        return self
+
+    def close(self):
+        """Release a backend returned by open_backend() and delete the paths it owns; backends derived from it stop working too."""
+        for finalizer in getattr(self, "_finalizers", []):
+            finalizer()
+
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class PandasBackend(Backend):
+    """In-memory pandas DataFrame; the default and the reference behaviour."""
+
+    engine = "pandas"
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def shape(self):
+        return self.df.shape
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def numeric_columns(self):
+        return list(self.df.select_dtypes(include=["number"]).columns)
+
+    def object_columns(self):
+        return [col for col in self.df.columns if self.df[col].dtype == np.object_]
+
+    def dtypes(self):
+        return self.df.dtypes
+
+    def head(self, n=5):
+        return self.df.head(n)
+
+    def sample(self, n=PLOT_SAMPLE_ROWS, seed=0):
+        return self.df if len(self.df) <= n else self.df.sample(n, random_state=seed)
+
+    def describe(self, columns=None):
+        return (self.df[columns] if columns is not None else self.df).describe()
+
+    def value_counts(self, column, limit=None):
+        counts = self.df[column].value_counts()
+        return counts if limit is None else counts.head(limit)
+
+    def group_mean(self, by, column):
+        return self.df.groupby(by)[column].mean().reset_index()
+
+    def null_counts(self):
+        return self.df.isnull().sum()
+
+    def nunique(self, columns=None):
+        columns = self.columns if columns is None else columns
+        return pd.Series({col: len(self.df[col].unique()) for col in columns})
+
+    def duplicate_count(self):
+        return duplicate_detection.find_duplicates(self.df)['duplicate_count']
+
+    def to_pandas(self, limit=None):
+        return self.df if limit is None else self.df.head(limit)
+
+    def drop_columns(self, columns):
+        return PandasBackend(self.df.drop(columns=columns))
+
+    def drop_null_rows(self, columns):
+        return PandasBackend(self.df.dropna(subset=columns) if columns else self.df.copy())
+
+    def fill_nulls(self, columns, method):
+        result_df = self.df.copy()
+        for column in columns:
+            result_df[column] = result_df[column].fillna(_pandas_fill_value(result_df[column], method))
+        return PandasBackend(result_df)
+
+    def standard_scale(self, columns):
+        result_df = self.df.copy()
+        values = result_df[columns].astype(float)
+        std = values.std(ddof=0).replace(0, 1)
+        result_df[columns] = (values - values.mean()) / std
+        return PandasBackend(result_df)
+
+    def min_max_scale(self, columns, feature_range=(0, 1)):
+        result_df = self.df.copy()
+        values = result_df[columns].astype(float)
+        span = (values.max() - values.min()).replace(0, 1)
+        low, high = feature_range
+        result_df[columns] = (values - values.min()) / span * (high - low) + low
+        return PandasBackend(result_df)
+
+    def drop_duplicates(self):
+        return PandasBackend(self.df.drop_duplicates().reset_index(drop=True))
+
+    def write(self, path, file_format="parquet"):
+        if file_format == "parquet":
+            self.df.to_parquet(path, index=False)
+        else:
+            self.df.to_csv(path, index=False)
+
+
+def _pandas_fill_value(series, method):
+    if method == "mean":
+        return series.mean()
+    if method == "median":
+        return series.median()
+    if method == "mode":
+        return series.mode().iloc[0]
+    raise ValueError(f"Unknown fill method: {method}")
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class DuckDBBackend(Backend):
+    """
+    Table in a disk-backed DuckDB database.
+
+    Every preprocessing step materializes a new table in the same database, so the
+    original stays available for resets and DuckDB can spill to disk when a step does
+    not fit in memory.
+    """
+
+    engine = "DuckDB"
+    _NUMERIC_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT",
+                      "UINTEGER", "UBIGINT", "FLOAT", "REAL", "DOUBLE", "DECIMAL")
+    _table_ids = itertools.count()
+
+    def __init__(self, connection, table, owner=None):
+        self.connection = connection
+        self.table = table
+        self._owner = owner  # backend owning the database files, kept alive by the ones derived from it
+        self._schema = None
+        self._rows = None
+
+    @classmethod
+    def open(cls, source, threads=None, memory_limit=None):
+        """
+        Load a CSV/Parquet file path or a pandas DataFrame into a new DuckDB database.
+        """
+        import duckdb
+
+        directory = tempfile.mkdtemp(prefix="hitl_eda_duckdb_")
+        connection = duckdb.connect(os.path.join(directory, "data.duckdb"))
+        if threads:
+            connection.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            connection.execute(f"SET memory_limit = '{memory_limit}'")
+
+        table = cls._new_table_name()
+        backend = cls(connection, table).own_paths(directory)
+        try:
+            if isinstance(source, pd.DataFrame):
+                connection.register("source_df", source)
+                connection.execute(f"CREATE TABLE {table} AS SELECT * FROM source_df")
+                connection.unregister("source_df")
+            elif str(source).endswith(".parquet"):
+                connection.execute(f"CREATE TABLE {table} AS SELECT * FROM read_parquet(?)", [str(source)])
+            else:
+                connection.execute(f"CREATE TABLE {table} AS SELECT * FROM read_csv_auto(?)", [str(source)])
+        except Exception:
+            backend.close()
+            raise
+        return backend
+
+    @classmethod
+    def _new_table_name(cls):
+        return f"data_{next(cls._table_ids)}"
+
+    def _query(self, sql, params=None):
+        return self.connection.execute(sql, params or []).df()
+
+    def _derive(self, select_sql):
+        table = self._new_table_name()
+        self.connection.execute(f"CREATE TABLE {table} AS {select_sql}")
+        return DuckDBBackend(self.connection, table, self._owner or self)
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            info = self._query(f"DESCRIBE {self.table}")
+            self._schema = dict(zip(info["column_name"], info["column_type"]))
+        return self._schema
+
+    @property
+    def shape(self):
+        if self._rows is None:
+            self._rows = self.connection.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+        return (self._rows, len(self.schema))
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    def numeric_columns(self):
+        return [col for col, dtype in self.schema.items() if dtype.startswith(self._NUMERIC_TYPES)]
+
+    def object_columns(self):
+        return [col for col, dtype in self.schema.items() if dtype == "VARCHAR"]
+
+    def dtypes(self):
+        return pd.Series(self.schema, dtype="object")
+
+    def head(self, n=5):
+        return self._query(f"SELECT * FROM {self.table} LIMIT {int(n)}")
+
+    def sample(self, n=PLOT_SAMPLE_ROWS, seed=0):
+        if self.shape[0] <= n:
+            return self.to_pandas()
+        return self._query(f"SELECT * FROM {self.table} USING SAMPLE reservoir({int(n)} ROWS) REPEATABLE ({int(seed)})")
+
+    def describe(self, columns=None):
+        columns = self.numeric_columns() if columns is None else columns
+        if not columns:
+            return pd.DataFrame(index=DESCRIBE_INDEX)
+        selects = []
+        for col in columns:
+            q = _quote(col)
+            selects += [f"count({q})", f"avg({q})", f"stddev_samp({q})", f"min({q})",
+                        f"quantile_cont({q}, 0.25)", f"quantile_cont({q}, 0.5)",
+                        f"quantile_cont({q}, 0.75)", f"max({q})"]
+        row = self.connection.execute(f"SELECT {', '.join(selects)} FROM {self.table}").fetchone()
+        values = np.array(row, dtype=float).reshape(len(columns), len(DESCRIBE_INDEX)).T
+        return pd.DataFrame(values, index=DESCRIBE_INDEX, columns=columns)
+
+    def value_counts(self, column, limit=None):
+        q = _quote(column)
+        limit_sql = f" LIMIT {int(limit)}" if limit else ""
+        result = self._query(f"SELECT {q}, count(*) AS count FROM {self.table} WHERE {q} IS NOT NULL "
+                             f"GROUP BY {q} ORDER BY count DESC{limit_sql}")
+        return result.set_index(column)["count"]
+
+    def group_mean(self, by, column):
+        b, c = _quote(by), _quote(column)
+        return self._query(f"SELECT {b}, avg({c}) AS {c} FROM {self.table} WHERE {b} IS NOT NULL "
+                           f"GROUP BY {b} ORDER BY {b}")
+
+    def null_counts(self):
+        selects = ", ".join(f"count(*) - count({_quote(col)})" for col in self.columns)
+        row = self.connection.execute(f"SELECT {selects} FROM {self.table}").fetchone()
+        return pd.Series(row, index=self.columns, dtype="int64")
+
+    def nunique(self, columns=None):
+        columns = self.columns if columns is None else columns
+        # Count NULL as a value like len(Series.unique())
+        selects = ", ".join(f"count(DISTINCT {_quote(col)}) + (count(*) > count({_quote(col)}))::INTEGER"
+                            for col in columns)
+        row = self.connection.execute(f"SELECT {selects} FROM {self.table}").fetchone()
+        return pd.Series(row, index=columns, dtype="int64")
+
+    def duplicate_count(self):
+        distinct = self.connection.execute(f"SELECT count(*) FROM (SELECT DISTINCT * FROM {self.table})").fetchone()[0]
+        return self.shape[0] - distinct
+
+    def to_pandas(self, limit=None):
+        limit_sql = f" LIMIT {int(limit)}" if limit else ""
+        return self._query(f"SELECT * FROM {self.table}{limit_sql}")
+
+    def drop_columns(self, columns):
+        return self._derive(f"SELECT * EXCLUDE ({', '.join(_quote(col) for col in columns)}) FROM {self.table}")
+
+    def drop_null_rows(self, columns):
+        if not columns:
+            return self._derive(f"SELECT * FROM {self.table}")
+        condition = " AND ".join(f"{_quote(col)} IS NOT NULL" for col in columns)
+        return self._derive(f"SELECT * FROM {self.table} WHERE {condition}")
+
+    def _fill_value(self, column, method):
+        q = _quote(column)
+        if method == "mean":
+            sql = f"SELECT avg({q}) FROM {self.table}"
+        elif method == "median":
+            sql = f"SELECT quantile_cont({q}, 0.5) FROM {self.table}"
+        elif method == "mode":
+            # Ties resolve to the smallest value, like Series.mode().iloc[0]
+            sql = f"SELECT {q} FROM {self.table} WHERE {q} IS NOT NULL GROUP BY {q} ORDER BY count(*) DESC, {q} LIMIT 1"
+        else:
+            raise ValueError(f"Unknown fill method: {method}")
+        return self.connection.execute(sql).fetchone()[0]
+
+    def _replace_columns(self, expressions):
+        replacements = ", ".join(f"{sql} AS {_quote(col)}" for col, sql in expressions.items())
+        return self._derive(f"SELECT * REPLACE ({replacements}) FROM {self.table}")
+
+    def fill_nulls(self, columns, method):
+        expressions = {}
+        for col in columns:
+            value = self._fill_value(col, method)
+            if value is not None:
+                expressions[col] = f"coalesce({_quote(col)}, {_sql_literal(value)})"
+        return self._replace_columns(expressions) if expressions else self._derive(f"SELECT * FROM {self.table}")
+
+    def standard_scale(self, columns):
+        stats = self.connection.execute(
+            "SELECT " + ", ".join(f"avg({_quote(c)}), stddev_pop({_quote(c)})" for c in columns) + f" FROM {self.table}"
+        ).fetchone()
+        expressions = {}
+        for i, col in enumerate(columns):
+            mean, std = stats[2 * i], stats[2 * i + 1] or 1.0
+            expressions[col] = f"({_quote(col)} - {float(mean)}) / {float(std)}"
+        return self._replace_columns(expressions)
+
+    def min_max_scale(self, columns, feature_range=(0, 1)):
+        stats = self.connection.execute(
+            "SELECT " + ", ".join(f"min({_quote(c)}), max({_quote(c)})" for c in columns) + f" FROM {self.table}"
+        ).fetchone()
+        low, high = feature_range
+        expressions = {}
+        for i, col in enumerate(columns):
+            col_min, col_max = float(stats[2 * i]), float(stats[2 * i + 1])
+            span = (col_max - col_min) or 1.0
+            expressions[col] = f"({_quote(col)} - {col_min}) / {span} * {float(high - low)} + {float(low)}"
+        return self._replace_columns(expressions)
+
+    def drop_duplicates(self):
+        partition = ", ".join(_quote(col) for col in self.columns)
+        return self._derive(
+            f"SELECT * EXCLUDE (_row_id, _row_rank) FROM ("
+            f"SELECT *, rowid AS _row_id, row_number() OVER (PARTITION BY {partition} ORDER BY rowid) AS _row_rank "
+            f"FROM {self.table}) WHERE _row_rank = 1 ORDER BY _row_id"
+        )
+
+    def write(self, path, file_format="parquet"):
+        options = "FORMAT PARQUET" if file_format == "parquet" else "FORMAT CSV, HEADER"
+        self.connection.execute(f"COPY (SELECT * FROM {self.table}) TO '{path}' ({options})")
+
+    def close(self):
+        self.connection.close()
+        super().close()
+
+
+def _sql_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PolarsBackend(Backend):
+    """
+    Polars LazyFrame; every query is optimized and executed by the streaming engine.
+    """
+
+    engine = "Polars"
+
+    def __init__(self, lazy_frame, owner=None):
+        self.lf = lazy_frame
+        self._owner = owner  # backend owning the scanned temporary file, kept alive by the ones derived from it
+        self._schema = None
+        self._rows = None
+
+    def _derive(self, lazy_frame):
+        return PolarsBackend(lazy_frame, self._owner or self)
+
+    @classmethod
+    def open(cls, source):
+        import polars as pl
+
+        if isinstance(source, pd.DataFrame):
+            return cls(pl.from_pandas(source).lazy())
+        if str(source).endswith(".parquet"):
+            return cls(pl.scan_parquet(str(source)))
+        return cls(pl.scan_csv(str(source), infer_schema_length=10_000))
+
+    def _collect(self, lf):
+        try:
+            return lf.collect(engine="streaming")
+        except TypeError:
+            # Polars releases before the engine argument
+            return lf.collect(streaming=True)
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            self._schema = dict(self.lf.collect_schema())
+        return self._schema
+
+    @property
+    def shape(self):
+        import polars as pl
+
+        if self._rows is None:
+            self._rows = self._collect(self.lf.select(pl.len())).item()
+        return (self._rows, len(self.schema))
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    def numeric_columns(self):
+        return [col for col, dtype in self.schema.items() if dtype.is_numeric()]
+
+    def object_columns(self):
+        import polars as pl
+
+        return [col for col, dtype in self.schema.items() if dtype in (pl.String, pl.Categorical)]
+
+    def dtypes(self):
+        return pd.Series({col: str(dtype) for col, dtype in self.schema.items()}, dtype="object")
+
+    def head(self, n=5):
+        return self._collect(self.lf.head(n)).to_pandas()
+
+    def sample(self, n=PLOT_SAMPLE_ROWS, seed=0):
+        import polars as pl
+
+        rows = self.shape[0]
+        if rows <= n:
+            return self.to_pandas()
+        # Bottom-k on a seeded hash of the row index, evaluated lazily: the filter keeps
+        # about n + 4 sqrt(n) rows (n at least, barring a 4-sigma event), so only those
+        # are ever collected, and the n smallest hashes among them are a uniform sample
+        keep = min(1.0, (n + 4 * np.sqrt(n) + 16) / rows)
+        key = pl.int_range(pl.len(), dtype=pl.UInt64).hash(seed)
+        threshold = int(keep * (2 ** 64 - 1))
+        sampled = (self.lf.with_columns(key.alias("__sample_key"))
+                   .filter(pl.col("__sample_key") <= threshold)
+                   .sort("__sample_key").head(n).drop("__sample_key"))
+        return self._collect(sampled).to_pandas()
+
+    def describe(self, columns=None):
+        import polars as pl
+
+        columns = self.numeric_columns() if columns is None else columns
+        if not columns:
+            return pd.DataFrame(index=DESCRIBE_INDEX)
+        exprs = []
+        for i, col in enumerate(columns):
+            c = pl.col(col).cast(pl.Float64)
+            exprs += [pl.col(col).count().cast(pl.Float64).alias(f"{i}_count"), c.mean().alias(f"{i}_mean"),
+                      c.std().alias(f"{i}_std"), c.min().alias(f"{i}_min"),
+                      c.quantile(0.25, interpolation="linear").alias(f"{i}_25"),
+                      c.quantile(0.5, interpolation="linear").alias(f"{i}_50"),
+                      c.quantile(0.75, interpolation="linear").alias(f"{i}_75"), c.max().alias(f"{i}_max")]
+        row = self._collect(self.lf.select(exprs)).row(0)
+        values = np.array(row, dtype=float).reshape(len(columns), len(DESCRIBE_INDEX)).T
+        return pd.DataFrame(values, index=DESCRIBE_INDEX, columns=columns)
+
+    def value_counts(self, column, limit=None):
+        import polars as pl
+
+        lf = (self.lf.filter(pl.col(column).is_not_null()).group_by(column)
+              .agg(pl.len().alias("count")).sort("count", descending=True))
+        if limit:
+            lf = lf.head(limit)
+        return self._collect(lf).to_pandas().set_index(column)["count"]
+
+    def group_mean(self, by, column):
+        import polars as pl
+
+        lf = self.lf.filter(pl.col(by).is_not_null()).group_by(by).agg(pl.col(column).mean()).sort(by)
+        return self._collect(lf).to_pandas()
+
+    def null_counts(self):
+        import polars as pl
+
+        row = self._collect(self.lf.select(pl.all().null_count())).row(0)
+        return pd.Series(row, index=self.columns, dtype="int64")
+
+    def nunique(self, columns=None):
+        import polars as pl
+
+        columns = self.columns if columns is None else columns
+        row = self._collect(self.lf.select([pl.col(col).n_unique() for col in columns])).row(0)
+        return pd.Series(row, index=columns, dtype="int64")
+
+    def duplicate_count(self):
+        import polars as pl
+
+        return self.shape[0] - self._collect(self.lf.unique().select(pl.len())).item()
+
+    def to_pandas(self, limit=None):
+        lf = self.lf if limit is None else self.lf.head(limit)
+        return self._collect(lf).to_pandas()
+
+    def drop_columns(self, columns):
+        return self._derive(self.lf.drop(columns))
+
+    def drop_null_rows(self, columns):
+        return self._derive(self.lf.drop_nulls(subset=columns) if columns else self.lf)
+
+    def _fill_value(self, column, method):
+        import polars as pl
+
+        c = pl.col(column)
+        if method == "mean":
+            expr = c.mean()
+        elif method == "median":
+            expr = c.median()
+        elif method == "mode":
+            # Ties resolve to the smallest value, like Series.mode().iloc[0]
+            expr = c.drop_nulls().mode().sort().first()
+        else:
+            raise ValueError(f"Unknown fill method: {method}")
+        return self._collect(self.lf.select(expr)).item()
+
+    def fill_nulls(self, columns, method):
+        import polars as pl
+
+        fills = [pl.col(col).fill_null(self._fill_value(col, method)) for col in columns]
+        return self._derive(self.lf.with_columns(fills))
+
+    def standard_scale(self, columns):
+        import polars as pl
+
+        stats = self._collect(self.lf.select(
+            [pl.col(c).mean().alias(f"{i}_mean") for i, c in enumerate(columns)]
+            + [pl.col(c).std(ddof=0).alias(f"{i}_std") for i, c in enumerate(columns)]
+        )).row(0)
+        n = len(columns)
+        exprs = [((pl.col(c) - stats[i]) / (stats[n + i] or 1.0)).alias(c) for i, c in enumerate(columns)]
+        return self._derive(self.lf.with_columns(exprs))
+
+    def min_max_scale(self, columns, feature_range=(0, 1)):
+        import polars as pl
+
+        stats = self._collect(self.lf.select(
+            [pl.col(c).min().alias(f"{i}_min") for i, c in enumerate(columns)]
+            + [pl.col(c).max().alias(f"{i}_max") for i, c in enumerate(columns)]
+        )).row(0)
+        n = len(columns)
+        low, high = feature_range
+        exprs = [((pl.col(c) - stats[i]) / ((stats[n + i] - stats[i]) or 1.0) * (high - low) + low).alias(c)
+                 for i, c in enumerate(columns)]
+        return self._derive(self.lf.with_columns(exprs))
+
+    def drop_duplicates(self):
+        return self._derive(self.lf.unique(keep="first", maintain_order=True))
+
+    def write(self, path, file_format="parquet"):
+        if file_format == "parquet":
+            self.lf.sink_parquet(path)
+        else:
+            self.lf.sink_csv(path)
+
+
+# Registered engines and the optional package each one needs
+ENGINES = {
+    "pandas": (PandasBackend, None),
+    "DuckDB": (DuckDBBackend, "duckdb"),
+    "Polars": (PolarsBackend, "polars"),
+}
+
+
+# Function to list the engines whose optional dependency is installed
+def available_engines():
+    return [name for name, (_, package) in ENGINES.items()
+            if package is None or importlib.util.find_spec(package) is not None]
+
+
+def open_backend(source, engine="pandas"):
+    """
+    Open a file path or DataFrame with the selected engine.
+
+    Args:
+        source: Path to a CSV/Parquet file, or a pandas DataFrame
+        engine: Key of ENGINES
+
+    Returns:
+        Backend
+    """
+    if engine == "pandas":
+        return PandasBackend(source if isinstance(source, pd.DataFrame) else pd.read_csv(source))
+    backend_class, _ = ENGINES[engine]
+    return backend_class.open(source)
+
+
+# Function to wrap plain DataFrames so callers can pass either a DataFrame or a backend
+def as_backend(data):
+    return data if isinstance(data, Backend) else PandasBackend(data)
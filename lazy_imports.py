@@ -0,0 +1,96 @@
+''' Deferred imports for the heavy plotting and ML dependencies.
+
+lazy_module() returns a stand-in that imports the real module on first attribute
+access, so `px.histogram(...)` keeps working unchanged while the Home page never pays
+for plotly, seaborn, scikit-learn, SciPy or the SDV/torch stack. prewarm() imports
+those modules on a background thread after the first page has been sent.
+'''
+
+import importlib
+import os
+import threading
+import time
+
+# Modules imported by prewarm(), roughly in the order the routes need them
+PREWARM_MODULES = [
+    "plotly.express",
+    "matplotlib.pyplot",
+    "seaborn",
+    "scipy.stats",
+    "sklearn.preprocessing",
+    "synthetic_data_generator",
+]
+
+_prewarm_lock = threading.Lock()
+_prewarm_started = False
+prewarm_timings = {}  # module name -> seconds spent importing it in the background
+
+
+class LazyModule:
+    """
+    Placeholder for a module that is imported the first time one of its attributes is used.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def _import_all(modules):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # Pre-warming is best effort; the route importing it will surface the error
+            continue
+        prewarm_timings[name] = time.perf_counter() - start
+
+
+def prewarm(modules=None):
+    """
+    Import the heavy dependencies on a daemon thread, once per process.
+
+    Set HITL_EDA_PREWARM=0 to disable, e.g. on memory constrained servers where the
+    synthesis stack should only be loaded if somebody actually visits that page.
+    """
+    global _prewarm_started
+    if os.environ.get("HITL_EDA_PREWARM", "1") == "0":
+        return False
+    with _prewarm_lock:
+        if _prewarm_started:
+            return False
+        _prewarm_started = True
+
+    thread = threading.Thread(
+        target=_import_all,
+        args=(modules or PREWARM_MODULES,),
+        name="hitl-eda-prewarm",
+        daemon=True
+    )
+    thread.start()
+    return True
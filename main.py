@@ -1,17 +1,32 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import base64
+import uuid
+import os
+import tempfile
 from streamlit_option_menu import option_menu
 import data_analysis_functions as function
 import data_preprocessing_function as preprocessing_function
-from synthetic_data_generator import generate_synthetic_data
+import categorical_encoding
+import data_export
+import dataset_cache
+import execution_backend
+import performance
+import profiling
+import lazy_imports
+import model_imputation
+import resource_manager
+import streaming_transforms
+
+# Heavy dependencies load on the first route that needs them; synthetic_data_generator
+# (SDV, torch) is imported inside the Synthetic Data Generation route
+plt = lazy_imports.lazy_module("matplotlib.pyplot")
+sns = lazy_imports.lazy_module("seaborn")
 
 # =========================================================
 # Page Config
 # =========================================================
 st.set_page_config(page_icon="✨", page_title="HITL-EDA", layout="wide")
+profiling.begin_run()  # No-op unless a profiler capture is armed from the sidebar
 
 # =========================================================
 # Router helpers (simulate routes via query params)
@@ -22,6 +37,30 @@ def set_route(route: str):
     st.session_state.current_route = route
     st.query_params.from_dict({"page": route})
 
+def update_working_df(result_df):
+    st.session_state.new_df = result_df
+    st.session_state.preprocessing_done = True  # Mark preprocessing as done
+    st.session_state.working_version = uuid.uuid4().hex  # New version key for cached analyses
+
+def record_fitted_transform(transform):
+    # Kept in order so the fills and scalers of this session can be saved and replayed
+    st.session_state.fitted_transforms = st.session_state.get('fitted_transforms', []) + [transform.to_dict()]
+    # ...and it is already in the working data, so 'Apply' does not replay it
+    st.session_state.applied_transforms = set(st.session_state.get('applied_transforms', ())) | {len(st.session_state.fitted_transforms) - 1}
+
+def reset_applied_transforms():
+    # The working data went back to the loaded data: no fitted step is applied any more
+    for key in ['applied_transforms', 'applied_transforms_file']:
+        st.session_state.pop(key, None)
+
+def close_backend():
+    # Deletes the engine's temporary database or spooled upload along with the session's references
+    backend = st.session_state.pop('backend', None)
+    st.session_state.pop('working_backend', None)
+    if backend is not None:
+        backend.close()
+    return backend
+
 def get_initial_route():
     qp = st.query_params
     page = qp.get("page", ["Home"])
@@ -419,16 +458,34 @@ st.sidebar.markdown(
 with st.sidebar:
     # Enhanced file upload section
     st.markdown('<div class="glass-card" style="margin-bottom:16px;">', unsafe_allow_html=True)
+    execution_engine = st.selectbox(
+        "⚙️ Execution Engine",
+        execution_backend.available_engines(),
+        key="execution_engine",
+        help="pandas keeps the data in memory. DuckDB and Polars keep it on disk and run the exploration as pushed-down queries, for files larger than memory."
+    )
     uploaded_file = st.file_uploader(
         "📂 Upload Dataset", 
         type=["csv", "xlsx", "xls"], 
         key="file",
         help="Supported formats: CSV, Excel (.xlsx, .xls)"
     )
+    local_dataset_path = None
+    if execution_engine != "pandas":
+        server_files = streaming_transforms.directory_files(execution_backend.DATA_DIR)
+        if server_files:
+            local_dataset_path = st.selectbox(
+                "…or open a CSV/Parquet file on the server",
+                [None] + server_files,
+                format_func=lambda name: "—" if name is None else name,
+                key="local_dataset_path",
+                help=f"Files in {os.path.abspath(execution_backend.DATA_DIR)} (HITL_EDA_DATA_DIR), scanned in place by the engine without uploading or loading them into memory"
+            )
     
     if st.button("🔄 Clear Data", help="Clear all data and reset"):
         # Clear both original and working dataframes
-        for key in ['new_df', 'original_df', 'preprocessing_done', 'uploaded_file_name']:
+        close_backend()
+        for key in ['new_df', 'original_df', 'preprocessing_done', 'uploaded_file_name', 'dataset_id', 'working_version', 'backend', 'backend_source', 'working_backend', 'encoding_vocabularies', 'fitted_transforms', 'applied_transforms', 'applied_transforms_file']:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
@@ -441,15 +498,183 @@ with st.sidebar:
         st.markdown(f'✅ Dataset loaded: **{st.session_state.new_df.shape[0]}** rows, **{st.session_state.new_df.shape[1]}** cols')
         memory_usage = st.session_state.new_df.memory_usage(deep=True).sum() / 1024**2
         st.markdown(f'💾 Memory: **{memory_usage:.2f} MB**')
+        cache_stats = dataset_cache.get_shared_cache().stats()
+        st.markdown(f'🗄️ Shared cache: **{cache_stats["entries"]}** datasets, **{cache_stats["total_mb"]:.1f}** / {cache_stats["max_mb"]:.0f} MB heap')
+        st.markdown(f'📼 Mapped store: **{dataset_cache.get_store().size_bytes() / 1024**2:.1f} MB** on disk')
+    elif st.session_state.get('backend') is not None:
+        backend_rows, backend_cols = st.session_state.backend.shape
+        st.markdown(f'✅ Dataset opened with **{st.session_state.backend.engine}**: **{backend_rows}** rows, **{backend_cols}** cols')
     else:
         st.markdown('⏳ No data loaded')
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # Optional timing/memory instrumentation of the hot paths
+    st.markdown('<div class="glass-card" style="margin-top:16px;">', unsafe_allow_html=True)
+    perf_enabled = st.toggle("⏱️ Performance panel", key="perf_panel", help="Record wall time, CPU time and peak memory of loading, analysis, preprocessing and synthesis")
+    perf_container = st.container()
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Server-wide job slots and thread caps shared by all sessions
+    with st.expander("🧵 Resources", expanded=False):
+        resource_manager.display_resource_controls()
+
+    # Opt-in sampling profiler capture (debugging slow reruns)
+    with st.expander("🔬 Debug", expanded=False):
+        profiling.display_profiler_controls()
+
+perf_recorder = performance.begin_run(perf_enabled)
+
 # =========================================================
 # Enhanced Data Loading + Session sync + Progress
 # =========================================================
+def open_with_engine(uploaded_file, local_path, engine):
+    """
+    Open the dataset with an out-of-core engine.
+
+    `local_path` is a file name inside execution_backend.DATA_DIR; uploads are spooled
+    to disk first (Excel converted to Parquet).
+    """
+    if local_path:
+        local_path = streaming_transforms.resolve_in_directory(local_path, execution_backend.DATA_DIR)
+        stat = os.stat(local_path)
+        dataset_id = dataset_cache.fingerprint_bytes(f"{os.path.abspath(local_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return execution_backend.open_backend(local_path, engine), dataset_id
+
+    name = uploaded_file.name.lower()
+    excel = name.endswith((".xlsx", ".xls"))
+    suffix = ".parquet" if excel or name.endswith(".parquet") else ".csv"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+        spool_path = spool.name
+    try:
+        if excel:
+            # The engines cannot read Excel; a workbook fits in memory (at most ~1M rows per sheet)
+            pd.read_excel(uploaded_file).to_parquet(spool_path, index=False)
+        else:
+            with open(spool_path, "wb") as spool:
+                spool.write(uploaded_file.getbuffer())
+        backend = execution_backend.open_backend(spool_path, engine)
+    except Exception:
+        os.remove(spool_path)
+        raise
+    # DuckDB copies the rows into its own database, Polars keeps scanning the spooled file
+    if isinstance(backend, execution_backend.DuckDBBackend):
+        os.remove(spool_path)
+    else:
+        backend.own_paths(spool_path)
+    return backend, dataset_cache.fingerprint_bytes(uploaded_file.getvalue())
+
+def load_backend_into_memory(backend):
+    """Materialize the loaded backend, and the pushed-down working copy if it differs, as pandas frames."""
+    working = st.session_state.get('working_backend', backend)
+    with st.spinner(f"🔄 Loading {working.shape[0]} rows from {backend.engine} into memory..."):
+        st.session_state.original_df = backend.to_pandas()
+        st.session_state.new_df = (st.session_state.original_df.copy(deep=False) if working is backend
+                                   else working.to_pandas())
+        reset_applied_transforms()
+        st.session_state.working_version = st.session_state.get('working_version') or st.session_state.dataset_id
+    st.session_state.pop('working_backend', None)
+
+def display_backend_preprocessing(backend):
+    """Preprocessing steps pushed down to the out-of-core engine; each one derives a new backend."""
+    working = st.session_state.get('working_backend', backend)
+
+    def apply(result):
+        st.session_state.working_backend = result
+        st.session_state.preprocessing_done = True
+        st.session_state.working_version = uuid.uuid4().hex
+        st.rerun()
+
+    rows, cols = working.shape
+    st.markdown(f"#### 🔧 Data Preprocessing with {backend.engine}")
+    st.caption(f"{rows:,} rows × {cols} columns. These steps run inside {backend.engine} without loading the data into memory; "
+               "encoding, outliers and model-based fills need the in-memory toolset.")
+    col_reset, col_load = st.columns(2)
+    with col_reset:
+        if st.button("🔄 Reset to Original", key="backend_reset", disabled=working is backend):
+            st.session_state.pop('working_backend', None)
+            st.session_state.preprocessing_done = False
+            st.session_state.working_version = st.session_state.dataset_id
+            st.rerun()
+    with col_load:
+        if st.button("📥 Load into Memory for All Steps", key="backend_load",
+                     help="Materializes the working data as pandas; needs enough memory for every row"):
+            load_backend_into_memory(backend)
+            st.rerun()
+    st.dataframe(working.head(200), use_container_width=True, height=300)
+
+    st.markdown("**Step 1: Remove Columns**")
+    drop_cols = st.multiselect("Select Columns to Remove", working.columns, key="backend_drop_columns")
+    if st.button("🗑️ Remove Selected", key="backend_drop_button", disabled=not drop_cols):
+        apply(preprocessing_function.remove_selected_columns(working, drop_cols))
+
+    st.markdown("**Step 2: Missing Values**")
+    null_counts = working.null_counts()
+    missing_cols = null_counts[null_counts > 0].index.tolist()
+    if not missing_cols:
+        st.info("ℹ️ No missing values.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            drop_null_cols = st.multiselect("Remove Rows Missing", missing_cols, key="backend_dropna_columns")
+            if st.button("🧹 Remove Rows", key="backend_dropna_button", disabled=not drop_null_cols):
+                apply(preprocessing_function.remove_rows_with_missing_data(working, drop_null_cols))
+        with col2:
+            fill_cols = st.multiselect("Numeric Columns to Fill", [col for col in missing_cols if col in working.numeric_columns()],
+                                       key="backend_fill_columns")
+            fill_method = st.selectbox("Fill Method", ["mean", "median", "mode"], key="backend_fill_method")
+            if st.button("🧴 Fill Missing", key="backend_fill_button", disabled=not fill_cols):
+                apply(preprocessing_function.fill_missing_data(working, fill_cols, fill_method))
+
+    st.markdown("**Step 3: Scaling**")
+    col1, col2 = st.columns(2)
+    with col1:
+        scale_cols = st.multiselect("Columns to Scale", working.numeric_columns(), key="backend_scale_columns")
+    with col2:
+        scale_method = st.selectbox("Scaling Method", ["Standard Scaling", "Min-Max Scaling"], key="backend_scale_method")
+    if st.button("⚖️ Apply Scaling", key="backend_scale_button", disabled=not scale_cols):
+        if scale_method == "Standard Scaling":
+            apply(preprocessing_function.standard_scale(working, scale_cols))
+        else:
+            apply(preprocessing_function.min_max_scale(working, scale_cols))
+
+    st.markdown("**Step 4: Duplicates**")
+    duplicates = working.duplicate_count()
+    st.caption(f"{duplicates:,} exact duplicate rows")
+    if st.button("👯 Drop Duplicate Rows", key="backend_duplicates_button", disabled=not duplicates):
+        apply(preprocessing_function.drop_duplicate_rows(working))
+
+    st.markdown("**Export**")
+    data_export.download_backend_button(working, file_stem="processed_data", label="📥 Download Processed Data",
+                                        key="backend_processed_download")
+
 df = None
-if uploaded_file:
+backend = None  # Out-of-core engine holding the dataset when one is selected
+if execution_engine != "pandas" and (uploaded_file or local_dataset_path):
+    backend_source = (execution_engine, local_dataset_path or uploaded_file.file_id)
+    if st.session_state.get('backend_source') != backend_source:
+        with st.spinner(f"🔄 Opening your dataset with {execution_engine}..."):
+            try:
+                backend, dataset_id = open_with_engine(uploaded_file, local_dataset_path, execution_engine)
+                close_backend()
+                st.session_state.backend = backend
+                st.session_state.backend_source = backend_source
+                st.session_state.dataset_id = dataset_id
+                st.session_state.working_version = dataset_id
+                st.session_state.preprocessing_done = False
+                # The in-memory copies are only built if Preprocessing or Synthesis is visited
+                for key in ['original_df', 'new_df', 'uploaded_file_name', 'working_backend']:
+                    st.session_state.pop(key, None)
+                reset_applied_transforms()
+                st.success(f"✅ Dataset opened with {execution_engine} ({backend.shape[0]} rows, {backend.shape[1]} columns)")
+            except Exception as e:
+                st.error(f"❌ Error opening dataset with {execution_engine}: {str(e)}")
+    else:
+        backend = st.session_state.backend
+elif uploaded_file:
+    if close_backend() is not None:
+        # Switched back to pandas: reload the upload in memory
+        st.session_state.pop('backend_source', None)
+        st.session_state.pop('uploaded_file_name', None)
     # Only process the file if it's a new upload (not already in session state)
     if 'uploaded_file_name' not in st.session_state or st.session_state.uploaded_file_name != uploaded_file.name:
         with st.spinner("🔄 Processing your dataset..."):
@@ -457,14 +682,18 @@ if uploaded_file:
                 progress_bar = st.progress(0)
                 progress_bar.progress(25)
                 
-                df = function.load_data(uploaded_file)
+                # Parsed once per process and shared between sessions uploading the same file
+                dataset_id, df = dataset_cache.load_shared_dataset(uploaded_file)
                 progress_bar.progress(75)
                 
-                # Store both original and working copies
-                st.session_state.original_df = df.copy()  # Keep original for reset
-                st.session_state.new_df = df.copy()       # Working copy for preprocessing
+                # Store both original and working views (Copy-on-Write, no private copies)
+                st.session_state.original_df = df                    # Keep original for reset
+                st.session_state.new_df = df.copy(deep=False)        # Working view for preprocessing
+                reset_applied_transforms()
                 st.session_state.preprocessing_done = False  # Reset preprocessing tracking
                 st.session_state.uploaded_file_name = uploaded_file.name  # Track file name
+                st.session_state.dataset_id = dataset_id  # Content key for cached analyses
+                st.session_state.working_version = st.session_state.dataset_id
                 progress_bar.progress(100)
                 
                 # Enhanced success message with file info
@@ -534,6 +763,13 @@ if selected != st.session_state.current_route:
     set_route(selected)
     st.rerun()
 
+# With an out-of-core engine, preprocessing runs inside the engine until the user loads
+# the data into memory; synthesis always needs the rows in memory and loads them itself
+if backend is not None:
+    if st.session_state.current_route == "Synthetic Data Generation" and st.session_state.get('original_df') is None:
+        load_backend_into_memory(backend)
+    df = st.session_state.get('original_df')
+
 # =========================================================
 # Enhanced HOME (Hero + Features + Stats + CTAs + Quick Start)
 # =========================================================
@@ -691,6 +927,9 @@ if st.session_state.current_route == "Home":
 # DATA EXPLORATION (Overview + Viz)
 # =========================================================
 elif st.session_state.current_route == "Data Exploration":
+    # Exploration runs on the out-of-core engine when one is selected, pushing aggregations down
+    if backend is not None:
+        df = backend
     if df is None:
         st.markdown("#### Use the sidebar to upload a CSV file to begin data exploration.")
     else:
@@ -700,7 +939,7 @@ elif st.session_state.current_route == "Data Exploration":
             t1, t2 = st.tabs(["📋 Overview", "📈 Exploration"])
         with t1:
             st.markdown('<div class="chip">Dataset Overview</div>', unsafe_allow_html=True)
-            function.display_dataset_overview(df, cat_columns, num_columns)
+            function.display_dataset_overview(df, cat_columns, num_columns, version=st.session_state.get('dataset_id'))
 
             st.markdown('<div class="chip" style="margin-top:14px;">Missing Values</div>', unsafe_allow_html=True)
             function.display_missing_values(df)
@@ -728,7 +967,7 @@ elif st.session_state.current_route == "Data Exploration":
 
             st.subheader("Feature Exploration (Numerical)")
             if len(num_columns) != 0:
-                function.feature_exploration_numerical_variables(df, num_columns)
+                function.feature_exploration_numerical_variables(df, num_columns, version=st.session_state.get('dataset_id'))
             else:
                 st.warning("No numerical variables detected.")
 
@@ -742,8 +981,10 @@ elif st.session_state.current_route == "Data Exploration":
 # Enhanced DATA PREPROCESSING (Step-by-step pipeline UI)
 # =========================================================
 elif st.session_state.current_route == "Data Preprocessing":
+    if backend is not None and st.session_state.get('new_df') is None:
+        display_backend_preprocessing(backend)
     # Check if there's data in session state
-    if 'new_df' not in st.session_state or st.session_state.new_df is None:
+    elif 'new_df' not in st.session_state or st.session_state.new_df is None:
         st.markdown(
             """
             <div class="glass-card" style="text-align:center; padding:40px;">
@@ -757,7 +998,9 @@ elif st.session_state.current_route == "Data Preprocessing":
     else:
         # Initialize new_df if it doesn't exist but df does
         if 'new_df' not in st.session_state and df is not None:
-            st.session_state.new_df = df.copy()
+            st.session_state.new_df = df.copy(deep=False)
+            st.session_state.working_version = st.session_state.get('dataset_id')
+            reset_applied_transforms()
         
         # Initialize preprocessing tracker
         if 'preprocessing_done' not in st.session_state:
@@ -778,9 +1021,9 @@ elif st.session_state.current_route == "Data Preprocessing":
 
         # Enhanced step indicators
         with st.container():
-            steps = st.columns(4)
-            step_labels = ["1. Columns", "2. Missing Values", "3. Encoding & Scaling", "4. Outliers"]
-            step_icons = ["📋", "🪄", "🔢", "🎯"]
+            steps = st.columns(5)
+            step_labels = ["1. Columns", "2. Missing Values", "3. Encoding & Scaling", "4. Outliers", "5. Duplicates"]
+            step_icons = ["📋", "🪄", "🔢", "🎯", "👯"]
             
             for i, (step, label, icon) in enumerate(zip(steps, step_labels, step_icons)):
                 with step:
@@ -804,10 +1047,12 @@ elif st.session_state.current_route == "Data Preprocessing":
                 if st.button("🔄 Reset to Original", help="Reset working copy to the loaded dataset", type="primary"):
                     # Reset from uploaded file or use current df
                     if df is not None:
-                        st.session_state.new_df = df.copy()
+                        st.session_state.new_df = df.copy(deep=False)
                     elif 'original_df' in st.session_state:
-                        st.session_state.new_df = st.session_state.original_df.copy()
+                        st.session_state.new_df = st.session_state.original_df.copy(deep=False)
                     st.session_state.preprocessing_done = False  # Reset preprocessing tracking
+                    st.session_state.working_version = st.session_state.get('dataset_id')
+                    reset_applied_transforms()
                     st.success("✅ Dataset reset to original state!")
                     st.rerun()
 
@@ -815,7 +1060,7 @@ elif st.session_state.current_route == "Data Preprocessing":
             
             # Enhanced dataframe display with better styling
             st.markdown('<div class="glass-card" style="padding:8px;">', unsafe_allow_html=True)
-            st.dataframe(st.session_state.new_df, use_container_width=True, height=400)
+            st.dataframe(categorical_encoding.preview_frame(st.session_state.new_df), use_container_width=True, height=400)
             st.markdown('</div>', unsafe_allow_html=True)
 
         st.markdown("---")
@@ -847,14 +1092,13 @@ elif st.session_state.current_route == "Data Preprocessing":
             with col2:
                 if st.button("🗑️ Remove Selected", type="primary", disabled=not cols_to_remove):
                     if cols_to_remove:
-                        st.session_state.new_df = preprocessing_function.remove_selected_columns(st.session_state.new_df, cols_to_remove)
-                        st.session_state.preprocessing_done = True  # Mark preprocessing as done
+                        update_working_df(preprocessing_function.remove_selected_columns(st.session_state.new_df, cols_to_remove))
                         st.success(f"✅ Removed {len(cols_to_remove)} columns successfully!")
                         st.rerun()
         
         # 2) Missing values - Enhanced UI
         with st.container():
-            missing_count = st.session_state.new_df.isnull().sum()
+            missing_count = categorical_encoding.missing_counts(st.session_state.new_df)
             missing_total = missing_count.sum()
             
             st.markdown(
@@ -888,8 +1132,7 @@ elif st.session_state.current_route == "Data Preprocessing":
                             options=st.session_state.new_df.columns[missing_count > 0]
                         )
                         if st.button("🧹 Remove Rows", type="primary", disabled=not columns_to_clean):
-                            st.session_state.new_df = preprocessing_function.remove_rows_with_missing_data(st.session_state.new_df, columns_to_clean)
-                            st.session_state.preprocessing_done = True  # Mark preprocessing as done
+                            update_working_df(preprocessing_function.remove_rows_with_missing_data(st.session_state.new_df, columns_to_clean))
                             st.success("✅ Rows with missing values removed!")
                             st.rerun()
                     else:
@@ -898,11 +1141,24 @@ elif st.session_state.current_route == "Data Preprocessing":
                         
                         col_method, col_action = st.columns([1, 1])
                         with col_method:
-                            fill_method = st.selectbox("Fill Method", ["mean", "median", "mode"])
+                            fill_method = st.selectbox("Fill Method", ["mean", "median", "mode", "knn", "iterative"],
+                                                       help="knn: mean of the nearest rows over all numeric columns; "
+                                                            "iterative: round-robin regression on the other numeric columns")
+                            if fill_method == "knn":
+                                fill_neighbors = st.number_input("Neighbours", min_value=1, max_value=50,
+                                                                 value=model_imputation.DEFAULT_NEIGHBORS, key="fill_neighbors")
                         with col_action:
                             if st.button("🧴 Fill Missing", type="primary", disabled=not fill_cols):
-                                st.session_state.new_df = preprocessing_function.fill_missing_data(st.session_state.new_df, fill_cols, fill_method)
-                                st.session_state.preprocessing_done = True  # Mark preprocessing as done
+                                if fill_method in model_imputation.METHODS:
+                                    options = {'n_neighbors': int(fill_neighbors)} if fill_method == "knn" else {}
+                                    with resource_manager.get_manager().job("imputation") as ticket:
+                                        resource_manager.report_wait(ticket)
+                                        with st.spinner(f"Imputing with {fill_method}..."):
+                                            update_working_df(preprocessing_function.fill_missing_data(st.session_state.new_df, fill_cols, fill_method, **options))
+                                else:
+                                    imputer = streaming_transforms.StreamingImputer(fill_cols, fill_method)
+                                    update_working_df(preprocessing_function.fill_missing_data(st.session_state.new_df, fill_cols, fill_method, imputer))
+                                    record_fitted_transform(imputer)
                                 st.success(f"✅ Missing values filled using {fill_method}!")
                                 st.rerun()
                 
@@ -937,13 +1193,29 @@ elif st.session_state.current_route == "Data Preprocessing":
                     enc_cols = st.multiselect("Columns to Encode", cat_cols)
                 with col2:
                     enc_method = st.selectbox("Encoding Method", ["One Hot Encoding", "Label Encoding"])
+                with st.expander("📚 Vocabularies", expanded=False):
+                    saved_vocabularies = st.file_uploader("Load saved vocabularies", type=["json"], key="encoding_vocabularies_upload",
+                                                          help="Encode with the codes and indicator columns of an earlier dataset")
+                    if saved_vocabularies is not None:
+                        try:
+                            loaded = categorical_encoding.CategoricalEncoder.from_json(saved_vocabularies.getvalue()).to_dict()
+                            st.session_state.encoding_vocabularies = {**st.session_state.get('encoding_vocabularies', {}), **loaded}
+                        except Exception as e:
+                            st.error(f"❌ Could not read the vocabularies: {str(e)}")
+                    encoder = categorical_encoding.CategoricalEncoder(st.session_state.get('encoding_vocabularies'))
+                    if encoder.vocabularies_:
+                        st.caption(", ".join(f"{col}: {len(labels)} labels" for col, labels in encoder.vocabularies_.items()))
+                        st.download_button("📥 Save Vocabularies (JSON)", data=encoder.to_json(), file_name="vocabularies.json",
+                                           mime="application/json", on_click="ignore")
+                    else:
+                        st.caption("Vocabularies are learned on the first encoding of a column and reused afterwards.")
                 with col3:
                     if st.button("🔤 Apply Encoding", type="primary", disabled=not enc_cols):
                         if enc_method == "One Hot Encoding":
-                            st.session_state.new_df = preprocessing_function.one_hot_encode(st.session_state.new_df, enc_cols)
+                            update_working_df(preprocessing_function.one_hot_encode(st.session_state.new_df, enc_cols, encoder=encoder))
                         else:
-                            st.session_state.new_df = preprocessing_function.label_encode(st.session_state.new_df, enc_cols)
-                        st.session_state.preprocessing_done = True  # Mark preprocessing as done
+                            update_working_df(preprocessing_function.label_encode(st.session_state.new_df, enc_cols, encoder=encoder))
+                        st.session_state.encoding_vocabularies = encoder.to_dict()
                         st.success(f"✅ {enc_method} applied successfully!")
                         st.rerun()
             else:
@@ -976,15 +1248,24 @@ elif st.session_state.current_route == "Data Preprocessing":
                 with col3:
                     if st.button("📏 Apply Scaling", type="primary", disabled=not scale_cols):
                         if scale_method == "Standardization":
-                            st.session_state.new_df = preprocessing_function.standard_scale(st.session_state.new_df, scale_cols)
+                            scaler = streaming_transforms.StreamingStandardScaler(scale_cols)
+                            update_working_df(preprocessing_function.standard_scale(st.session_state.new_df, scale_cols, scaler))
                         else:
-                            st.session_state.new_df = preprocessing_function.min_max_scale(st.session_state.new_df, scale_cols)
-                        st.session_state.preprocessing_done = True  # Mark preprocessing as done
+                            scaler = streaming_transforms.StreamingMinMaxScaler(scale_cols)
+                            update_working_df(preprocessing_function.min_max_scale(st.session_state.new_df, scale_cols, scaler=scaler))
+                        record_fitted_transform(scaler)
                         st.success(f"✅ {scale_method} applied successfully!")
                         st.rerun()
             else:
                 st.info("ℹ️ No numerical columns available for scaling.")
 
+            # Fitted parameters of the fills and scalers above, reusable without refitting
+            transformed_df = streaming_transforms.display_pipeline_controls(st.session_state.new_df)
+            if transformed_df is not None:
+                update_working_df(transformed_df)
+                st.success("✅ Saved parameters applied!")
+                st.rerun()
+
         # 5) Outliers - Enhanced UI
         with st.container():
             num_cols_outlier = st.session_state.new_df.select_dtypes(include=['number']).columns
@@ -1043,12 +1324,11 @@ elif st.session_state.current_route == "Data Preprocessing":
                     with col_action2:
                         if st.button("🧪 Apply Treatment", type="primary"):
                             if action == "Remove Outliers":
-                                st.session_state.new_df = preprocessing_function.remove_outliers(st.session_state.new_df, selected_num, outliers)
+                                update_working_df(preprocessing_function.remove_outliers(st.session_state.new_df, selected_num, outliers))
                                 st.success(f"✅ {len(outliers)} outliers removed successfully!")
                             else:
-                                st.session_state.new_df = preprocessing_function.transform_outliers(st.session_state.new_df, selected_num, outliers)
+                                update_working_df(preprocessing_function.transform_outliers(st.session_state.new_df, selected_num, outliers))
                                 st.success(f"✅ {len(outliers)} outliers transformed successfully!")
-                            st.session_state.preprocessing_done = True  # Mark preprocessing as done
                             st.rerun()
                     
                     # Show outlier details
@@ -1059,6 +1339,42 @@ elif st.session_state.current_route == "Data Preprocessing":
                     st.success(f"🎉 No outliers detected in '{selected_num}' using {detection_method} method!")
             else:
                 st.info("ℹ️ No numerical columns available for outlier analysis.")
+
+        # 6) Duplicates - Enhanced UI
+        with st.container():
+            duplicates = function.duplicate_summary(st.session_state.new_df, st.session_state.get('working_version'))
+            duplicate_total = duplicates['duplicate_count']
+
+            st.markdown(
+                f"""
+                <div class="glass-card" style="margin:20px 0; padding:24px;">
+                    <div style="display:flex; align-items:center; gap:12px; margin-bottom:16px;">
+                        <div style="font-size:24px;">👯</div>
+                        <h3 style="margin:0; color:#667eea;">Step 6: Duplicate Rows</h3>
+                        <span class="chip" style="background: {'rgba(239,68,68,0.2)' if duplicate_total > 0 else 'rgba(16,185,129,0.2)'}; color: {'#ef4444' if duplicate_total > 0 else '#10b981'}; border-color: {'#ef4444' if duplicate_total > 0 else '#10b981'};">
+                            {duplicate_total} duplicate rows
+                        </span>
+                    </div>
+                    <p style="margin:0 0 16px 0; color:#A1A1AA;">Find exact duplicate records and keep only their first occurrence</p>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+            if duplicate_total > 0:
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    groups = duplicates['groups']
+                    with st.expander(f"🔍 View {len(groups)} Duplicate Groups", expanded=False):
+                        duplicate_rows = st.session_state.new_df.iloc[groups['first_row']].reset_index(drop=True)
+                        st.dataframe(pd.concat([groups[['count']].rename(columns={'count': 'Occurrences'}), duplicate_rows], axis=1), use_container_width=True)
+                with col2:
+                    if st.button("🧽 Drop Duplicates", type="primary"):
+                        update_working_df(preprocessing_function.drop_duplicate_rows(st.session_state.new_df, duplicates['duplicate_mask']))
+                        st.success(f"✅ {duplicate_total} duplicate rows removed successfully!")
+                        st.rerun()
+            else:
+                st.success("🎉 No duplicate rows detected!")
         
         # Final Results & Download Section - Only show if preprocessing has been done
         if st.session_state.get('preprocessing_done', False):
@@ -1079,7 +1395,7 @@ elif st.session_state.current_route == "Data Preprocessing":
             
             with col_preview:
                 st.markdown('<div class="chip" style="margin-bottom:8px;">Final Processed Dataset</div>', unsafe_allow_html=True)
-                st.dataframe(st.session_state.new_df, use_container_width=True, height=250)
+                st.dataframe(categorical_encoding.preview_frame(st.session_state.new_df), use_container_width=True, height=250)
                 
             with col_download:
                 st.markdown(
@@ -1092,16 +1408,14 @@ elif st.session_state.current_route == "Data Preprocessing":
                     unsafe_allow_html=True
                 )
                 
-                # Download button
+                # Download button (serialized only when clicked)
                 if st.session_state.new_df is not None:
-                    csv = st.session_state.new_df.to_csv(index=False)
-                    
-                    st.download_button(
-                        label="📥 Download CSV",
-                        data=csv,
-                        file_name=f"preprocessed_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv",
-                        type="primary"
+                    data_export.download_dataframe_button(
+                        st.session_state.new_df,
+                        file_stem=f"preprocessed_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+                        label="📥 Download Data",
+                        key="preprocessed_download",
+                        button_type="primary"
                     )
 
 # =========================================================
@@ -1124,7 +1438,9 @@ elif st.session_state.current_route == "Synthetic Data Generation":
         st.markdown("---")
 
         # Generate synthetic data
-        synthetic_data, success, error = generate_synthetic_data(None, df)
+        with st.spinner("Loading synthesis models..."):
+            from synthetic_data_generator import generate_synthetic_data
+        synthetic_data, success, error = generate_synthetic_data(None, df, version=st.session_state.get('dataset_id'))
         if success:
             st.success("✅ Synthetic data generated successfully!")
             st.subheader("🔍 Preview")
@@ -1144,19 +1460,34 @@ elif st.session_state.current_route == "Synthetic Data Generation":
                 numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
                 if numeric_cols:
                     picked = st.selectbox("Select column", numeric_cols, key="main_distribution_select")
-                    fig, ax = plt.subplots(1, 2, figsize=(12, 4))
-                    sns.histplot(df[picked], ax=ax[0], kde=True)
-                    ax[0].set_title(f"Original: {picked}")
-                    sns.histplot(synthetic_data[picked], ax=ax[1], kde=True)
-                    ax[1].set_title(f"Synthetic: {picked}")
-                    st.pyplot(fig, use_container_width=True)
+                    with performance.track("render_figure"):
+                        fig, ax = plt.subplots(1, 2, figsize=(12, 4))
+                        sns.histplot(df[picked], ax=ax[0], kde=True)
+                        ax[0].set_title(f"Original: {picked}")
+                        sns.histplot(synthetic_data[picked], ax=ax[1], kde=True)
+                        ax[1].set_title(f"Synthetic: {picked}")
+                        st.pyplot(fig, use_container_width=True)
                 else:
                     st.warning("No numerical columns for visualization.")
 
             # Download
-            csv = synthetic_data.to_csv(index=False)
-            b64 = base64.b64encode(csv.encode()).decode()
-            href = f'<a href="data:file/csv;base64,{b64}" download="synthetic_data.csv" class="btn">📥 Download Synthetic Data</a>'
-            st.markdown(href, unsafe_allow_html=True)
+            data_export.download_dataframe_button(
+                synthetic_data,
+                file_stem="synthetic_data",
+                label="📥 Download Synthetic Data",
+                key="main_synthetic_download"
+            )
         else:
-            st.info("💡 Ensure your dataset has valid numeric/categorical columns and no nulls.")
\ No newline at end of file
+            st.info("💡 Ensure your dataset has valid numeric/categorical columns and no nulls.")
+
+# =========================================================
+# Performance panel (rendered last so it covers this run)
+# =========================================================
+performance.end_run(perf_recorder)
+profiling.end_run()
+if perf_enabled:
+    with perf_container:
+        performance.display_performance_panel()
+
+# Import the heavy dependencies in the background once the first page has been sent
+lazy_imports.prewarm()
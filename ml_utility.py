@@ -0,0 +1,211 @@
+''' ML utility of synthetic data: train on synthetic, test on real (TSTR).
+
+A panel of fast scikit-learn models is trained twice for a chosen target column, once
+on real training rows (TRTR, the reference) and once on the synthetic rows (TSTR),
+and both are scored on the same real hold-out. The gap between the two scores says
+how much predictive signal the synthetic data lost. Features are encoded with the
+real training rows' statistics (privacy_metrics.encode_features), training sets are
+subsampled to `max_train_rows` and the hold-out to `max_test_rows`, and the 2 x
+models fits run in a thread pool of the job's threads (the scikit-learn estimators
+used release the GIL while fitting).
+
+The hold-out is drawn before the synthesizer is fitted (model_selection.holdout_mask(),
+the same rows compare mode holds out) and the synthesizer never sees it, so a model that
+memorizes its training rows gains nothing on the test.
+'''
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import lazy_imports
+import performance
+import privacy_metrics
+import resource_manager
+
+sklearn_linear = lazy_imports.lazy_module("sklearn.linear_model")
+sklearn_ensemble = lazy_imports.lazy_module("sklearn.ensemble")
+sklearn_metrics = lazy_imports.lazy_module("sklearn.metrics")
+
+DEFAULT_TRAIN_ROWS = 50_000
+DEFAULT_TEST_ROWS = 20_000
+CLASSIFICATION_MAX_LEVELS = 20  # integer targets with at most this many values are classes
+
+
+def task_type(target):
+    """'classification' for labels and small integer codes, 'regression' otherwise."""
+    if pd.api.types.is_bool_dtype(target) or not pd.api.types.is_numeric_dtype(target):
+        return "classification"
+    if pd.api.types.is_integer_dtype(target) and target.nunique() <= CLASSIFICATION_MAX_LEVELS:
+        return "classification"
+    return "regression"
+
+
+def model_panel(task, seed=0):
+    """Name -> unfitted estimator of the fast models compared for a task."""
+    if task == "classification":
+        return {
+            "Logistic Regression": sklearn_linear.LogisticRegression(max_iter=500),
+            "Random Forest": sklearn_ensemble.RandomForestClassifier(n_estimators=100, min_samples_leaf=2, random_state=seed),
+            "Gradient Boosting": sklearn_ensemble.HistGradientBoostingClassifier(random_state=seed),
+        }
+    return {
+        "Ridge": sklearn_linear.Ridge(),
+        "Random Forest": sklearn_ensemble.RandomForestRegressor(n_estimators=100, min_samples_leaf=2, random_state=seed),
+        "Gradient Boosting": sklearn_ensemble.HistGradientBoostingRegressor(random_state=seed),
+    }
+
+
+def score(task, model, X, y):
+    """
+    Hold-out scores of a fitted model.
+
+    Returns:
+        dict: 'score' (macro F1 or R², higher is better) and task specific metrics
+    """
+    predicted = model.predict(X)
+    if task == "classification":
+        return {
+            'score': float(sklearn_metrics.f1_score(y, predicted, average="macro")),
+            'accuracy': float(sklearn_metrics.accuracy_score(y, predicted)),
+        }
+    return {
+        'score': float(sklearn_metrics.r2_score(y, predicted)),
+        'mae': float(sklearn_metrics.mean_absolute_error(y, predicted)),
+    }
+
+
+def with_holdout(settings, holdout):
+    """Settings of utility_settings() completed with the hold-out mask, None without a target."""
+    return None if settings is None else {**settings, 'holdout': holdout}
+
+
+def _subsample(df, rows, seed):
+    return df.sample(n=rows, random_state=seed) if len(df) > rows else df
+
+
+def _fit_and_score(task, name, model, trained_on, X_train, y_train, X_test, y_test):
+    start = time.perf_counter()
+    try:
+        if len(np.unique(y_train)) < 2:
+            raise ValueError("the training rows have a single target value")
+        model.fit(X_train, y_train)
+        result = {**score(task, model, X_test, y_test), 'status': "ok"}
+    except Exception as e:
+        result = {'score': np.nan, 'status': f"failed: {e}"}
+    return {'model': name, 'trained_on': trained_on, **result, 'fit_seconds': time.perf_counter() - start}
+
+
+@performance.timed()
+def evaluate(real_df, synthetic_df, target, holdout, max_train_rows=DEFAULT_TRAIN_ROWS, max_test_rows=DEFAULT_TEST_ROWS,
+             seed=0):
+    """
+    Run TRTR and TSTR for `target` and measure the utility gap.
+
+    Args:
+        real_df: The real table, hold-out rows included
+        synthetic_df: Rows sampled from a synthesizer fitted without the hold-out
+        target: Column predicted
+        holdout: Boolean mask of the real rows scored on, see model_selection.holdout_mask()
+
+    Returns:
+        dict: 'task', 'target', 'results' (DataFrame, one row per model and training
+            data), 'gaps' (model -> real score - synthetic score), 'mean_gap',
+            'train_rows', 'synthetic_rows', 'test_rows' and 'wall_seconds'
+    """
+    start = time.perf_counter()
+    present = real_df[target].notna().to_numpy()
+    real = real_df[present]
+    synthetic = synthetic_df.dropna(subset=[target])
+    task = task_type(real[target])
+    train = _subsample(real_df[present & ~holdout], max_train_rows, seed)
+    synthetic = _subsample(synthetic, max_train_rows, seed)
+    holdout = _subsample(real_df[present & holdout], max_test_rows, seed)
+
+    features = [col for col in real.columns if col != target and col in synthetic.columns]
+    X_train, X_synthetic, X_test = privacy_metrics.encode_features(train[features], synthetic[features], holdout[features])
+    labels = (lambda series: series.astype(str).to_numpy()) if task == "classification" else (lambda series: series.to_numpy(dtype=np.float64))
+    y_train, y_synthetic, y_test = labels(train[target]), labels(synthetic[target]), labels(holdout[target])
+
+    jobs = [(name, model, trained_on, X, y)
+            for trained_on, X, y in (("real", X_train, y_train), ("synthetic", X_synthetic, y_synthetic))
+            for name, model in model_panel(task, seed).items()]
+    with ThreadPoolExecutor(max_workers=min(len(jobs), resource_manager.get_manager().threads)) as pool:
+        rows = list(pool.map(lambda job: _fit_and_score(task, *job, X_test, y_test), jobs))
+
+    results = pd.DataFrame(rows)
+    scores = results.pivot(index='model', columns='trained_on', values='score')
+    gaps = (scores['real'] - scores['synthetic']).to_dict()
+    return {
+        'task': task,
+        'target': target,
+        'results': results,
+        'gaps': gaps,
+        'mean_gap': float(np.nanmean(list(gaps.values()))) if gaps else np.nan,
+        'train_rows': len(train),
+        'synthetic_rows': len(synthetic),
+        'test_rows': len(holdout),
+        'wall_seconds': time.perf_counter() - start,
+    }
+
+
+def utility_settings(df):
+    """
+    Render the TSTR options shown before generation.
+
+    Returns:
+        dict: keyword arguments of evaluate() without the data, or None when no target is picked
+    """
+    with st.expander("🎯 ML Utility (Train Synthetic, Test Real)", expanded=False):
+        target = st.selectbox("Target Column", [None] + list(df.columns), key="ml_utility_target_select",
+                              format_func=lambda col: "None (skip)" if col is None else str(col),
+                              help="Models trained on synthetic and on real rows are scored on a real hold-out; "
+                                   "the synthesizer is then fitted without those rows")
+        col1, col2 = st.columns(2)
+        with col1:
+            max_train_rows = st.number_input("Max Training Rows", min_value=100, value=DEFAULT_TRAIN_ROWS, step=10_000,
+                                             key="ml_utility_train_rows")
+        with col2:
+            max_test_rows = st.number_input("Max Hold-out Rows", min_value=100, value=DEFAULT_TEST_ROWS, step=10_000,
+                                            key="ml_utility_test_rows")
+    if target is None:
+        return None
+    return {'target': target, 'max_train_rows': int(max_train_rows), 'max_test_rows': int(max_test_rows)}
+
+
+def add_to_metrics(metrics, real_df, synthetic_df, settings):
+    """
+    Store the evaluation in metrics['ml_utility'] when a target was picked; failures go to the report too.
+
+    `settings` are those of with_holdout(), the hold-out mask indexes `real_df`.
+    """
+    if settings is None:
+        return metrics
+    try:
+        with resource_manager.get_manager().job("ml_utility"):
+            metrics['ml_utility'] = evaluate(real_df, synthetic_df, **settings)
+    except Exception as e:
+        metrics['ml_utility'] = {'target': settings['target'], 'error': str(e)}
+    return metrics
+
+
+def report_lines(utility):
+    """Markdown lines of the ML utility section of the quality report."""
+    lines = [f"## ML Utility (target: {utility['target']})"]
+    if 'error' in utility:
+        return lines + [f"- Evaluation failed: {utility['error']}\n"]
+    metric = "Macro F1" if utility['task'] == "classification" else "R²"
+    scores = utility['results'].pivot(index='model', columns='trained_on', values='score')
+    lines.append(f"| Model | {metric}, trained on real | {metric}, trained on synthetic | Gap |")
+    lines.append("|---|---|---|---|")
+    for model, row in scores.iterrows():
+        lines.append(f"| {model} | {row['real']:.4f} | {row['synthetic']:.4f} | {utility['gaps'][model]:.4f} |")
+    lines.append("")
+    lines.append(f"- Mean Utility Gap: {utility['mean_gap']:.4f}")
+    lines.append(f"- Rows: {utility['train_rows']:,} real / {utility['synthetic_rows']:,} synthetic for training, "
+                 f"{utility['test_rows']:,} real hold-out")
+    lines.append(f"- Evaluation Wall Time: {utility['wall_seconds']:.2f} s\n")
+    return lines
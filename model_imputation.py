@@ -0,0 +1,266 @@
+''' Model-based imputation (KNN and iterative) that scales to millions of rows.
+
+KNN: the features are every numeric column, standardized, and the number of
+neighbour indexes is bounded whatever the number of missingness patterns. The
+MAX_PATTERN_INDEXES most frequent patterns with at least MIN_PATTERN_ROWS rows get
+an index of their own on the dimensions they observe, built from a random sample of
+at most INDEX_SAMPLE_ROWS rows that have every value the pattern needs. Rows with a
+rarer pattern share one index over every column, gaps at the column mean. Each
+index is a KD-tree over at most PROJECTION_DIMS principal components of its
+dimensions; it returns CANDIDATES x k candidates that are re-ranked on the values
+both rows observe, which keeps the tree fast on wide tables. Incomplete rows are
+queried in batches of CANDIDATE_BATCH_ROWS and get the mean of their k nearest
+neighbours, so the cost is O(m log m + q k log m) for q incomplete rows instead of
+the O(n^2) of a brute force KNN imputer, and memory is bounded by one batch.
+
+Iterative: every column with missing values is regressed (ridge, closed form) on all
+other numeric columns in turn, starting from mean fills, for a few rounds. Each
+regression is fitted on at most ITERATIVE_SAMPLE_ROWS observed rows and predicts the
+missing rows in batches.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import lazy_imports
+import performance
+import resource_manager
+
+sklearn_neighbors = lazy_imports.lazy_module("sklearn.neighbors")
+
+METHODS = ("knn", "iterative")
+DEFAULT_NEIGHBORS = 5
+INDEX_SAMPLE_ROWS = 200_000
+BATCH_ROWS = 50_000
+MAX_PATTERN_INDEXES = 16
+MIN_PATTERN_ROWS = 1_000
+PROJECTION_DIMS = 8
+PROJECTION_SAMPLE_ROWS = 20_000
+CANDIDATES = 10  # candidates fetched per neighbour, re-ranked on the observed values
+CANDIDATE_BATCH_ROWS = 5_000
+ITERATIVE_SAMPLE_ROWS = 100_000
+ITERATIVE_MAX_ROUNDS = 10
+ITERATIVE_TOLERANCE = 1e-3  # stop when imputed values move less than this many standard deviations
+RIDGE_ALPHA = 1e-3
+
+
+def _feature_columns(df, columns):
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+    missing = [col for col in columns if col not in numeric]
+    if missing:
+        raise ValueError(f"Model-based imputation needs numeric columns: {', '.join(map(str, missing))}")
+    return numeric
+
+
+def _pattern_ids(mask):
+    """Integer id of the missingness pattern of every row."""
+    if mask.shape[1] <= 62:
+        return mask.astype(np.int64) @ (np.int64(1) << np.arange(mask.shape[1], dtype=np.int64))
+    return pd.util.hash_pandas_object(pd.DataFrame(mask), index=False).to_numpy()
+
+
+def _batches(rows, size=BATCH_ROWS):
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+
+def _sample(rows, rng, size=INDEX_SAMPLE_ROWS):
+    return np.sort(rng.choice(rows, size, replace=False)) if len(rows) > size else rows
+
+
+def _candidate_index(points, rng):
+    """KD-tree over the leading principal components of `points` (NaN-free), and the projection."""
+    if points.shape[1] <= PROJECTION_DIMS:
+        projection = np.eye(points.shape[1])
+    else:
+        sample = points[_sample(np.arange(len(points)), rng, PROJECTION_SAMPLE_ROWS)]
+        projection = np.linalg.svd(sample - sample.mean(axis=0), full_matrices=False)[2][:PROJECTION_DIMS].T
+    return sklearn_neighbors.KDTree(points @ projection), projection
+
+
+def _candidate_distances(index, points, query, candidates):
+    """
+    Candidates of every query row and their mean squared distance over the values both observe.
+
+    Returns:
+        tuple: (candidates, distances), (rows x candidates) positions in `points` and
+            distances, inf where the rows share no observed value
+    """
+    tree, projection = index
+    gaps = np.isnan(query)
+    coordinates = np.where(gaps, 0.0, query) @ projection
+    if gaps.any():
+        # Gaps start at the mean and are refilled from the principal components once
+        coordinates = np.where(gaps, coordinates @ projection.T, query) @ projection
+    found = tree.query(coordinates, k=candidates, return_distance=False)
+    diff = points[found] - query[:, None, :]
+    both = ~np.isnan(diff)
+    shared = both.sum(axis=2)
+    distance = np.where(both, diff * diff, 0.0).sum(axis=2) / np.maximum(shared, 1)
+    distance[shared == 0] = np.inf
+    return found, distance
+
+
+def _impute_pattern(values, scaled, mask, rows, targets, n_neighbors, rng, pool):
+    """KNN for rows sharing one missingness pattern, on the dimensions it observes."""
+    observed = np.flatnonzero(~mask[rows[0]])
+    wanted = [j for j in targets if mask[rows[0], j]]
+    required = np.union1d(observed, wanted)
+    reference = np.flatnonzero(~mask[:, required].any(axis=1))
+    if len(observed) == 0 or len(reference) == 0:
+        return {}
+    reference = _sample(reference, rng)
+    points = scaled[np.ix_(reference, observed)]
+    index = _candidate_index(points, rng)
+    k = min(n_neighbors, len(reference))
+    candidates = min(k * CANDIDATES, len(reference))
+    neighbor_values = values[np.ix_(reference, wanted)]
+
+    def impute_batch(batch):
+        found, distance = _candidate_distances(index, points, scaled[np.ix_(batch, observed)], candidates)
+        neighbors = np.take_along_axis(found, np.argsort(distance, axis=1, kind="stable")[:, :k], axis=1)
+        return neighbor_values[neighbors].mean(axis=1)
+
+    imputed = np.concatenate(list(pool.map(impute_batch, _batches(rows, CANDIDATE_BATCH_ROWS))))
+    return {j: (rows, imputed[:, position]) for position, j in enumerate(wanted)}
+
+
+def _impute_rare(values, scaled, mask, rows, targets, n_neighbors, rng, pool):
+    """
+    KNN for rows with rare patterns, through one index shared by all of them.
+
+    The index holds every column with gaps at the mean (0 once standardized), and each
+    imputed column averages the nearest candidates that observe it. Values without
+    such a candidate stay NaN.
+    """
+    reference = _sample(np.arange(len(values)), rng)
+    points = scaled[reference]
+    index = _candidate_index(np.nan_to_num(points, nan=0.0), rng)
+    candidates = min(n_neighbors * CANDIDATES, len(reference))
+    k = min(n_neighbors, candidates)
+
+    def impute_batch(batch):
+        found, distance = _candidate_distances(index, points, scaled[batch], candidates)
+        imputed = {}
+        for j in targets:
+            column_distance = np.where(mask[reference[found], j], np.inf, distance)
+            nearest = np.argsort(column_distance, axis=1, kind="stable")[:, :k]
+            usable = np.isfinite(np.take_along_axis(column_distance, nearest, axis=1))
+            neighbor_values = values[reference[np.take_along_axis(found, nearest, axis=1)], j]
+            with np.errstate(invalid="ignore"):
+                imputed[j] = np.where(usable, neighbor_values, 0.0).sum(axis=1) / usable.sum(axis=1)
+        return imputed
+
+    results = list(pool.map(impute_batch, _batches(rows, CANDIDATE_BATCH_ROWS)))
+    return {j: (rows, np.concatenate([result[j] for result in results])) for j in targets}
+
+
+@performance.timed()
+def knn_impute(df, columns, n_neighbors=DEFAULT_NEIGHBORS, seed=0):
+    """
+    Fill missing values of `columns` with the mean of the k nearest complete neighbours.
+
+    Args:
+        df: Data to impute
+        columns: Numeric columns to fill; all numeric columns are used as features
+        n_neighbors: Number of neighbours averaged
+        seed: Seed of the index subsamples
+
+    Returns:
+        DataFrame: Shallow copy of `df` with the filled columns replaced
+    """
+    features = _feature_columns(df, columns)
+    values = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    mask = np.isnan(values)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    scaled = (values - mean) / std
+    targets = [features.index(col) for col in columns]
+    filled = {j: values[:, j].copy() for j in targets}
+
+    rng = np.random.default_rng(seed)
+    incomplete = np.flatnonzero(mask[:, targets].any(axis=1))
+    _, inverse, counts = np.unique(_pattern_ids(mask[incomplete]), return_inverse=True, return_counts=True)
+    frequent = [p for p in np.argsort(-counts, kind="stable")[:MAX_PATTERN_INDEXES] if counts[p] >= MIN_PATTERN_ROWS]
+    rare = incomplete[~np.isin(inverse, frequent)]
+
+    # Tree queries release the GIL
+    with ThreadPoolExecutor(max_workers=resource_manager.get_manager().threads) as pool:
+        for pattern in frequent:
+            for j, (rows, imputed) in _impute_pattern(values, scaled, mask, incomplete[inverse == pattern],
+                                                      targets, n_neighbors, rng, pool).items():
+                filled[j][rows] = imputed
+        if len(rare):
+            for j, (rows, imputed) in _impute_rare(values, scaled, mask, rare, targets, n_neighbors, rng, pool).items():
+                wanted = mask[rows, j]
+                filled[j][rows[wanted]] = imputed[wanted]
+
+    result_df = df.copy(deep=False)
+    for j, column_values in filled.items():
+        # Rows without any usable neighbour fall back to the column mean
+        result_df[features[j]] = np.where(np.isnan(column_values), mean[j], column_values)
+    return result_df
+
+
+def _ridge(X, y, alpha=RIDGE_ALPHA):
+    X = np.column_stack([X, np.ones(len(X))])
+    penalty = alpha * len(X) * np.eye(X.shape[1])
+    penalty[-1, -1] = 0.0  # intercept is not penalized
+    return np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+
+@performance.timed()
+def iterative_impute(df, columns, max_rounds=ITERATIVE_MAX_ROUNDS, tolerance=ITERATIVE_TOLERANCE, seed=0):
+    """
+    Fill missing values of `columns` by round-robin ridge regression on the other numeric columns.
+
+    Returns:
+        DataFrame: Shallow copy of `df` with the filled columns replaced
+    """
+    features = _feature_columns(df, columns)
+    values = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    mask = np.isnan(values)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    # Standardized copy; other columns with gaps start from their mean and are refined too
+    X = np.where(mask, 0.0, (values - mean) / std)
+    order = [features.index(col) for col in columns if mask[:, features.index(col)].any()]
+    order += [j for j in range(len(features)) if mask[:, j].any() and j not in order]
+
+    rng = np.random.default_rng(seed)
+    for _ in range(max_rounds):
+        largest_change = 0.0
+        for j in order:
+            others = [i for i in range(len(features)) if i != j]
+            if not others:
+                break
+            observed = np.flatnonzero(~mask[:, j])
+            missing = np.flatnonzero(mask[:, j])
+            if len(observed) == 0:
+                continue
+            if len(observed) > ITERATIVE_SAMPLE_ROWS:
+                observed = rng.choice(observed, ITERATIVE_SAMPLE_ROWS, replace=False)
+            coefficients = _ridge(X[np.ix_(observed, others)], X[observed, j])
+            for batch in _batches(missing):
+                predicted = X[np.ix_(batch, others)] @ coefficients[:-1] + coefficients[-1]
+                largest_change = max(largest_change, float(np.abs(predicted - X[batch, j]).max()))
+                X[batch, j] = predicted
+        if largest_change < tolerance:
+            break
+
+    result_df = df.copy(deep=False)
+    for col in columns:
+        j = features.index(col)
+        result_df[col] = np.where(mask[:, j], X[:, j] * std[j] + mean[j], values[:, j])
+    return result_df
+
+
+def impute(df, columns, method, **options):
+    if method == "knn":
+        return knn_impute(df, columns, **options)
+    if method == "iterative":
+        return iterative_impute(df, columns, **options)
+    raise ValueError(f"Unknown imputation method '{method}'")
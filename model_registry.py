@@ -0,0 +1,235 @@
+''' Local registry of fitted synthesizers: fit once, sample many times.
+
+Every registered model is a numbered version under REGISTRY_DIR/<name>/v<N>/ with two
+files: model.pkl, the pickled synthesizer and cardinality reducer in the format of
+sharded_sampling.save_model() (so the sharded sampling CLI can read it directly), and
+model.json, a manifest with the SDV metadata, a fingerprint of the training data,
+the hyperparameters, the fit duration and the quality metrics. Listing the registry
+reads only the manifests; loading a model unpickles it once per process.
+
+Pickles execute code when loaded, only point HITL_EDA_MODEL_DIR at trusted models.
+'''
+
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import dataset_cache
+import model_selection
+import performance
+import sharded_sampling
+
+REGISTRY_DIR = os.environ.get("HITL_EDA_MODEL_DIR", "models")
+MODEL_FILE = "model.pkl"
+MANIFEST_FILE = "model.json"
+REGISTRY_COLUMNS = ["name", "version", "model", "created", "rows", "fit_seconds", "quality_score", "fingerprint"]
+
+
+def dataset_fingerprint(df):
+    """Content hash of a DataFrame (values, column names and dtypes), independent of how it was loaded."""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    layout = json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode()
+    return dataset_cache.fingerprint_bytes(layout + hashes.tobytes())
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_fingerprint(_df, version):
+    return dataset_fingerprint(_df)
+
+
+def cached_fingerprint(df, version=None):
+    """Fingerprint once per dataset version (always hashes when no version is given)."""
+    if version is None:
+        return dataset_fingerprint(df)
+    return _cached_fingerprint(df, version)
+
+
+def quality_summary(metrics):
+    """Reduce the output of calculate_metrics() to the numbers kept in a manifest."""
+    numerical = metrics.get('numerical_metrics', {})
+    categorical = metrics.get('categorical_metrics', {})
+    summary = {'quality_score': model_selection.quality_score(metrics)}
+    if numerical:
+        summary['mean_ks_statistic'] = float(np.mean([m['ks_statistic'] for m in numerical.values()]))
+    if categorical:
+        summary['mean_category_coverage'] = float(np.mean([m['category_coverage'] for m in categorical.values()]))
+    if 'correlation_preservation' in metrics:
+        summary['mean_correlation_difference'] = float(metrics['correlation_preservation']['mean_correlation_difference'])
+    if 'pairwise_fidelity' in metrics:
+        summary['mean_pair_tvd'] = metrics['pairwise_fidelity']['mean_tvd']
+    if 'privacy' in metrics:
+        summary['exact_match_share'] = metrics['privacy']['exact_match_share']
+        summary['median_dcr'] = metrics['privacy']['dcr']['median']
+    if 'mean_gap' in metrics.get('ml_utility', {}):
+        summary['ml_utility_gap'] = metrics['ml_utility']['mean_gap']
+    return summary
+
+
+def _slug(name):
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name)).strip("._")
+    if not slug:
+        raise ValueError("model name must contain letters or digits")
+    return slug
+
+
+def _version_dir(name, version, directory=REGISTRY_DIR):
+    return os.path.join(directory, _slug(name), f"v{int(version)}")
+
+
+def versions(name, directory=REGISTRY_DIR):
+    """Registered version numbers of a model, oldest first."""
+    model_dir = os.path.join(directory, _slug(name))
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(int(entry[1:]) for entry in os.listdir(model_dir)
+                  if re.fullmatch(r"v\d+", entry) and os.path.exists(os.path.join(model_dir, entry, MANIFEST_FILE)))
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+@performance.timed()
+def register(synthesizer, name, metadata, df, reducer=None, params=None, fit_seconds=None, quality=None,
+             directory=REGISTRY_DIR):
+    """
+    Save a fitted synthesizer as the next version of `name`.
+
+    Args:
+        synthesizer: Fitted SDV single table synthesizer
+        name: Model name, versions are numbered per name
+        metadata: SingleTableMetadata dict the synthesizer was trained with
+        df: Original (unreduced) training data, fingerprinted and described in the manifest
+        reducer: Optional fitted CardinalityReducer, restored together with the model
+        params: Hyperparameters, defaults to synthesizer.get_parameters()
+        fit_seconds: Duration of synthesizer.fit()
+        quality: Quality metrics, see quality_summary()
+
+    Returns:
+        dict: The manifest written next to the model
+    """
+    if params is None:
+        params = synthesizer.get_parameters() if hasattr(synthesizer, "get_parameters") else {}
+    version = (versions(name, directory) or [0])[-1] + 1
+    target = _version_dir(name, version, directory)
+    os.makedirs(target)  # fails if a concurrent save took this version
+
+    manifest = _jsonable({
+        'name': str(name),
+        'version': version,
+        'model': type(synthesizer).__name__,
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'rows': len(df),
+        'columns': list(df.columns),
+        'fingerprint': dataset_fingerprint(df),
+        'metadata': metadata,
+        'params': params,
+        'reducer': reducer.config if reducer is not None else None,
+        'fit_seconds': fit_seconds,
+        'quality': quality or {},
+    })
+    partial = os.path.join(target, MODEL_FILE + ".partial")
+    sharded_sampling.save_model(partial, synthesizer, reducer)
+    os.replace(partial, os.path.join(target, MODEL_FILE))
+    # The manifest goes last: a version without one is not listed
+    with open(os.path.join(target, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(name, version, directory=REGISTRY_DIR):
+    with open(os.path.join(_version_dir(name, version, directory), MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def list_models(directory=REGISTRY_DIR):
+    """
+    List every registered version, newest first within a name.
+
+    Returns:
+        DataFrame: One row per version with the REGISTRY_COLUMNS
+    """
+    rows = []
+    if os.path.isdir(directory):
+        for entry in sorted(os.listdir(directory)):
+            for version in reversed(versions(entry, directory)):
+                manifest = load_manifest(entry, version, directory)
+                rows.append({
+                    'name': manifest['name'],
+                    'version': manifest['version'],
+                    'model': manifest['model'],
+                    'created': manifest['created'],
+                    'rows': manifest['rows'],
+                    'fit_seconds': manifest.get('fit_seconds'),
+                    'quality_score': manifest.get('quality', {}).get('quality_score'),
+                    'fingerprint': manifest['fingerprint'],
+                })
+    return pd.DataFrame(rows, columns=REGISTRY_COLUMNS)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _read_cached(path, mtime_ns):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _session_model(path, mtime_ns):
+    # Sampling mutates a synthesizer's random state, so every session unpickles its own
+    # copy from the shared bytes; a session keeps only the model it used last
+    key = (path, mtime_ns)
+    models = st.session_state.setdefault('registry_models', {})
+    if key not in models:
+        models.clear()
+        models[key] = sharded_sampling.model_from_bytes(_read_cached(path, mtime_ns))
+    return models[key]
+
+
+@performance.timed()
+def load(name, version=None, directory=REGISTRY_DIR):
+    """
+    Load a registered model for sampling; the latest version when none is given.
+
+    The model file is read once per server process; each session gets its own
+    unpickled synthesizer, which callers sample under sharded_sampling.seeded().
+
+    Returns:
+        tuple: (synthesizer, reducer or None, manifest dict)
+    """
+    if version is None:
+        known = versions(name, directory)
+        if not known:
+            raise FileNotFoundError(f"no registered model named '{name}'")
+        version = known[-1]
+    path = os.path.join(_version_dir(name, version, directory), MODEL_FILE)
+    synthesizer, reducer = _session_model(os.path.abspath(path), os.stat(path).st_mtime_ns)
+    return synthesizer, reducer, load_manifest(name, version, directory)
+
+
+def display_register(synthesizer, label, metadata, df, reducer=None, params=None, fit_seconds=None, quality=None):
+    """Render the form that saves the fitted model of this page to the registry."""
+    with st.expander("💾 Save to Model Registry", expanded=False):
+        name = st.text_input("Model Name", value=_slug(label), key="synthetic_registry_name")
+        if st.button("Save Model", key="synthetic_registry_save_button"):
+            try:
+                start = time.perf_counter()
+                manifest = register(synthesizer, name, metadata, df, reducer, params, fit_seconds, quality)
+            except Exception as e:
+                st.error(f"❌ Error saving the model: {str(e)}")
+                return
+            st.success(f"✅ Saved {manifest['name']} v{manifest['version']} in {time.perf_counter() - start:.1f} s")
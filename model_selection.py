@@ -0,0 +1,210 @@
+''' Parallel training and ranking of several synthesizers on the same dataset.
+
+Every candidate (a synthesizer class plus hyperparameters) is fitted in its own
+process on a training split, samples as many rows as the held-out split has, and is
+scored against that held-out split. Processes are started with "spawn" so the
+Streamlit server is never forked, the training split is shipped to each worker once,
+and the CPU budget is divided between the workers so PyTorch based models do not
+oversubscribe the machine.
+'''
+
+import functools
+import multiprocessing
+import multiprocessing.context
+import multiprocessing.spawn
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import performance
+
+# Candidate name -> (sdv.single_table class name, keyword arguments)
+def candidate_grid(epochs=30):
+    return {
+        "Gaussian Copula (beta)": ("GaussianCopulaSynthesizer", {"default_distribution": "beta"}),
+        "Gaussian Copula (norm)": ("GaussianCopulaSynthesizer", {"default_distribution": "norm"}),
+        "Gaussian Copula (KDE)": ("GaussianCopulaSynthesizer", {"default_distribution": "gaussian_kde"}),
+        f"CTGAN ({epochs} epochs)": ("CTGANSynthesizer", {"epochs": epochs}),
+        f"CTGAN ({epochs * 2} epochs)": ("CTGANSynthesizer", {"epochs": epochs * 2}),
+        f"TVAE ({epochs} epochs)": ("TVAESynthesizer", {"epochs": epochs}),
+        f"CopulaGAN ({epochs} epochs)": ("CopulaGANSynthesizer", {"epochs": epochs}),
+    }
+
+DEFAULT_CANDIDATES = 3  # first entries of candidate_grid() preselected in the UI
+LEADERBOARD_COLUMNS = ["model", "quality_score", "fit_seconds", "sample_rows_per_second", "status"]
+
+# Training split of the worker process, set once by _init_worker
+_worker_train = None
+
+
+def _init_worker(train_df, threads):
+    global _worker_train
+    _worker_train = train_df
+    # Must happen before torch is imported, which the spawned interpreter has not done yet
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _fit_candidate(name, class_name, params, metadata_dict, num_rows):
+    import sdv.single_table
+    from sdv.metadata import SingleTableMetadata
+
+    metadata = SingleTableMetadata.load_from_dict(metadata_dict)
+    synthesizer = getattr(sdv.single_table, class_name)(metadata, **params)
+
+    start = time.perf_counter()
+    synthesizer.fit(_worker_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sample = synthesizer.sample(num_rows=num_rows)
+    sample_seconds = time.perf_counter() - start
+
+    return {
+        "model": name,
+        "synthesizer": synthesizer,
+        "sample": sample,
+        "fit_seconds": fit_seconds,
+        "sample_rows_per_second": num_rows / sample_seconds if sample_seconds > 0 else np.nan,
+    }
+
+
+# Streamlit registers the running script as __main__; spawned workers would import it
+# again and run the whole app before picking up their first task. Processes of
+# worker_context() are launched without the main module in their preparation data.
+# The flag is thread-local and set only while one of those processes starts, so other
+# sessions' threads and other spawn users are unaffected.
+_launching = threading.local()
+
+
+@functools.wraps(multiprocessing.spawn.get_preparation_data)
+def _preparation_data(name, _original=getattr(multiprocessing.spawn.get_preparation_data, "__wrapped__",
+                                              multiprocessing.spawn.get_preparation_data)):
+    data = _original(name)
+    if getattr(_launching, "worker", False):
+        data.pop("init_main_from_path", None)
+        data.pop("init_main_from_name", None)
+    return data
+
+
+multiprocessing.spawn.get_preparation_data = _preparation_data
+
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        _launching.worker = True
+        try:
+            return multiprocessing.context.SpawnProcess._Popen(process_obj)
+        finally:
+            _launching.worker = False
+
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    Process = _WorkerProcess
+
+
+def worker_context():
+    """Spawn context for process pools started from the app; workers do not re-run the Streamlit script."""
+    return _WorkerContext()
+
+
+def quality_score(metrics):
+    """
+    Collapse the output of calculate_metrics() into one 0-100 score for ranking.
+
+    Uses 1 - KS statistic for numerical columns, category coverage and distribution
+    difference for categorical columns and the mean correlation difference, so that
+    models can be told apart even when all KS tests pass or all fail.
+    """
+    components = []
+    numerical = metrics.get('numerical_metrics', {})
+    if numerical:
+        components.append(np.mean([1 - m['ks_statistic'] for m in numerical.values()]))
+    categorical = metrics.get('categorical_metrics', {})
+    if categorical:
+        components.append(np.mean([(m['category_coverage'] + 1 - m['distribution_difference'] / 2) / 2
+                                   for m in categorical.values()]))
+    if 'correlation_preservation' in metrics:
+        components.append(max(0.0, 1 - metrics['correlation_preservation']['mean_correlation_difference']))
+    return float(np.mean(components) * 100) if components else np.nan
+
+
+def holdout_mask(rows, holdout_fraction=0.2, seed=0):
+    """Boolean mask of the rows held out of training, drawn from the seed and the number of rows only."""
+    mask = np.zeros(rows, dtype=bool)
+    mask[np.random.RandomState(seed).choice(rows, int(round(holdout_fraction * rows)), replace=False)] = True
+    return mask
+
+
+def split_holdout(df, holdout_fraction=0.2, seed=0):
+    mask = holdout_mask(len(df), holdout_fraction, seed)
+    return df[~mask].reset_index(drop=True), df[mask].reset_index(drop=True)
+
+
+@performance.timed()
+def compare_models(df, candidates, metadata_dict, scorer, cpu_budget=None, holdout_fraction=0.2, seed=0, on_progress=None):
+    """
+    Fit candidates in parallel and rank them on a held-out split.
+
+    Args:
+        df: Dataset to synthesize
+        candidates: dict of name -> (sdv.single_table class name, kwargs), see candidate_grid()
+        metadata_dict: SingleTableMetadata.to_dict() of the dataset
+        scorer: Callable (holdout_df, synthetic_df) -> score, higher is better
+        cpu_budget: Number of CPU cores the comparison may use, defaults to all
+        holdout_fraction: Share of rows held out for scoring
+        seed: Seed of the train/holdout split
+        on_progress: Optional callable (done, total, model name) called as candidates finish
+
+    Returns:
+        tuple: (leaderboard DataFrame sorted best first, dict of model name -> fitted synthesizer)
+    """
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    workers = min(len(candidates), cpu_budget)
+    threads = max(1, cpu_budget // workers)
+    train, holdout = split_holdout(df, holdout_fraction, seed)
+
+    rows, fitted = [], {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=worker_context(),
+        initializer=_init_worker,
+        initargs=(train, threads)
+    ) as pool:
+        futures = {
+            pool.submit(_fit_candidate, name, class_name, params, metadata_dict, len(holdout)): name
+            for name, (class_name, params) in candidates.items()
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                result = future.result()
+                score = scorer(holdout, result["sample"])
+                fitted[name] = result["synthesizer"]
+                rows.append({
+                    "model": name,
+                    "quality_score": score,
+                    "fit_seconds": result["fit_seconds"],
+                    "sample_rows_per_second": result["sample_rows_per_second"],
+                    "status": "ok",
+                })
+            except Exception as e:
+                rows.append({"model": name, "quality_score": np.nan, "fit_seconds": np.nan,
+                             "sample_rows_per_second": np.nan, "status": f"failed: {e}"})
+            if on_progress is not None:
+                on_progress(done, len(futures), name)
+
+    leaderboard = (pd.DataFrame(rows, columns=LEADERBOARD_COLUMNS)
+                   .sort_values("quality_score", ascending=False, na_position="last")
+                   .reset_index(drop=True))
+    return leaderboard, fitted
@@ -0,0 +1,293 @@
+''' Timing and memory instrumentation for the hot paths of a rerun.
+
+Functions are wrapped with the timed() decorator and code blocks with the track()
+context manager. Nothing is recorded unless a PerfRecorder is active for the current
+thread, so instrumented code pays a single attribute lookup when the Performance
+panel is switched off.
+'''
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+import streamlit as st
+
+_state = threading.local()
+
+# tracemalloc is process-wide, so it runs while at least one session is recording
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+# Number of recent script runs kept per session for the Performance panel
+HISTORY_SIZE = 5
+
+
+class PerfRecorder:
+    """
+    Collects one span per instrumented call of a script run.
+
+    Each span stores wall time, CPU time, peak traced memory above the memory in use
+    when the span started, and the rows/columns of the data it processed. The peak
+    counter of tracemalloc is shared by every session and never reset here: a span
+    that raised it is charged the new peak, any other span the highest memory in use
+    at its own or its children's boundaries, a lower bound of its transient peak.
+    """
+
+    def __init__(self, run=0, trace_memory=True):
+        self.run = run
+        self.spans = []
+        self.trace_memory = trace_memory
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.finished = False
+        self.stopped = False
+        self._stack = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        global _tracing_users
+        if self.trace_memory:
+            with _tracing_lock:
+                _tracing_users += 1
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+        _state.recorder = self
+        return self
+
+    def stop(self):
+        global _tracing_users
+        if getattr(_state, "recorder", None) is self:
+            _state.recorder = None
+        if self.stopped:
+            return
+        self.stopped = True
+        if self.trace_memory:
+            with _tracing_lock:
+                _tracing_users -= 1
+                if _tracing_users == 0 and tracemalloc.is_tracing():
+                    tracemalloc.stop()
+
+    def _enter(self, name):
+        frame = {
+            "name": name,
+            "depth": len(self._stack),
+            "start": time.perf_counter(),
+            "cpu_start": time.process_time(),
+            "child_peak": 0,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]["child_peak"] = max(self._stack[-1]["child_peak"], current)
+            frame["memory_start"] = current
+            frame["peak_start"] = peak
+        self._stack.append(frame)
+        return frame
+
+    def _exit(self, frame, rows=None, columns=None):
+        end = time.perf_counter()
+        cpu_end = time.process_time()
+        self._stack.pop()
+        peak_kb = None
+        if "memory_start" in frame and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak if peak > frame["peak_start"] else current, frame["child_peak"])
+            peak_kb = max(peak - frame["memory_start"], 0) / 1024
+            if self._stack:
+                self._stack[-1]["child_peak"] = max(self._stack[-1]["child_peak"], peak)
+
+        with self._lock:
+            self.spans.append({
+                "name": frame["name"],
+                "depth": frame["depth"],
+                "start_ms": (frame["start"] - self.origin) * 1000,
+                "wall_ms": (end - frame["start"]) * 1000,
+                "cpu_ms": (cpu_end - frame["cpu_start"]) * 1000,
+                "peak_kb": peak_kb,
+                "rows": rows,
+                "columns": columns,
+                "thread": threading.get_ident(),
+            })
+
+    def to_frame(self):
+        columns = ["name", "depth", "start_ms", "wall_ms", "cpu_ms", "peak_kb", "rows", "columns"]
+        return pd.DataFrame(self.spans, columns=columns + ["thread"])[columns]
+
+    @property
+    def label(self):
+        status = "" if self.finished else " (current)" if self is active_recorder() else " (interrupted by rerun)"
+        return f"Run #{self.run} at {time.strftime('%H:%M:%S', time.localtime(self.started_at))}{status}"
+
+
+def export_json(recorders):
+    """Serialize the spans of several runs as JSON."""
+    runs = [{"run": recorder.run, "started_at": recorder.started_at, "finished": recorder.finished,
+             "spans": recorder.spans} for recorder in recorders]
+    return json.dumps({"pid": os.getpid(), "runs": runs}, indent=2, default=str)
+
+
+def export_chrome_trace(recorders):
+    """Serialize the spans of several runs in the Chrome trace event format (chrome://tracing, Perfetto)."""
+    if not recorders:
+        return json.dumps({"traceEvents": []})
+
+    first_start = min(recorder.started_at for recorder in recorders)
+    events = []
+    for recorder in recorders:
+        offset_us = (recorder.started_at - first_start) * 1e6
+        for span in recorder.spans:
+            events.append({
+                "name": span["name"],
+                "cat": f"run {recorder.run}",
+                "ph": "X",
+                "ts": offset_us + span["start_ms"] * 1000,
+                "dur": span["wall_ms"] * 1000,
+                "pid": os.getpid(),
+                "tid": span["thread"],
+                "args": {key: span[key] for key in ("cpu_ms", "peak_kb", "rows", "columns")},
+            })
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+def begin_run(enabled):
+    """
+    Start recording the current script run when the Performance panel is enabled.
+
+    A recorder left active by a run that was cut short by st.rerun() is stopped first
+    and stays in the session history, so the timings of the button click that caused
+    the rerun remain visible.
+
+    Returns:
+        PerfRecorder or None
+    """
+    history = st.session_state.setdefault('perf_history', [])
+    for stale in history:
+        stale.stop()
+    if not enabled:
+        return None
+
+    st.session_state.perf_run_count = st.session_state.get('perf_run_count', 0) + 1
+    recorder = PerfRecorder(run=st.session_state.perf_run_count)
+    history.append(recorder)
+    del history[:-HISTORY_SIZE]
+    return recorder.start()
+
+
+def end_run(recorder):
+    if recorder is not None:
+        recorder.finished = True
+        recorder.stop()
+
+
+# Function to return the recorder active on this thread, if any
+def active_recorder():
+    return getattr(_state, "recorder", None)
+
+
+def _shape_of(value):
+    shape = getattr(value, "shape", None)
+    if shape is None:
+        return None, None
+    return shape[0], shape[1] if len(shape) > 1 else None
+
+
+class track:
+    """
+    Context manager recording a span named `name` on the active recorder.
+
+    Pass `data` (anything with a .shape) to record the rows and columns processed.
+    """
+
+    def __init__(self, name, data=None):
+        self.name = name
+        self.data = data
+        self.recorder = None
+        self.frame = None
+
+    def __enter__(self):
+        self.recorder = active_recorder()
+        if self.recorder is not None:
+            self.frame = self.recorder._enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.recorder is not None:
+            self.recorder._exit(self.frame, *_shape_of(self.data))
+        return False
+
+
+def timed(name=None):
+    """
+    Decorator recording every call of the wrapped function as a span.
+
+    Rows and columns are taken from the first argument with a .shape (usually the
+    input DataFrame), falling back to the return value.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = active_recorder()
+            if recorder is None:
+                return func(*args, **kwargs)
+
+            frame = recorder._enter(span_name)
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                data = next((value for value in list(args) + list(kwargs.values()) if hasattr(value, "shape")), result)
+                recorder._exit(frame, *_shape_of(data))
+        return wrapper
+    return decorator
+
+
+def display_performance_panel():
+    """
+    Render the recorded spans of the recent runs with JSON and Chrome-trace exports.
+    """
+    st.markdown('**⏱️ Performance**')
+    history = [recorder for recorder in st.session_state.get('perf_history', []) if recorder.spans]
+    if not history:
+        st.caption("No instrumented calls recorded yet.")
+        return
+
+    recorder = st.selectbox(
+        "Run",
+        list(reversed(history)),
+        format_func=lambda recorder: recorder.label,
+        key="perf_run_select"
+    )
+
+    spans = recorder.to_frame().sort_values("start_ms")
+    spans["name"] = ["  " * depth + name for depth, name in zip(spans["depth"], spans["name"])]
+    total_ms = spans.loc[spans["depth"] == 0, "wall_ms"].sum()
+    st.caption(f"{len(spans)} spans, {total_ms:.0f} ms in top-level calls")
+    st.dataframe(
+        spans.drop(columns=["depth"]).round(2),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    st.download_button(
+        label="📥 Timings (JSON)",
+        data=functools.partial(export_json, history),
+        file_name="hitl_eda_timings.json",
+        mime="application/json",
+        key="perf_json_download",
+        on_click="ignore"
+    )
+    st.download_button(
+        label="📥 Chrome Trace",
+        data=functools.partial(export_chrome_trace, history),
+        file_name="hitl_eda_trace.json",
+        mime="application/json",
+        key="perf_trace_download",
+        on_click="ignore"
+    )
@@ -0,0 +1,157 @@
+''' Disclosure metrics of a synthetic table against the real one.
+
+- DCR (distance to closest record): distance of every synthetic row to its nearest
+  real row. A share of synthetic rows closer to a real row than real rows are to
+  each other suggests memorized records.
+- NNDR (nearest-neighbour distance ratio): closest / second closest real distance;
+  values near 0 mean a synthetic row sits on one real record rather than between
+  several.
+- Exact matches: synthetic rows identical to a real row.
+
+Rows are encoded once with the real data's statistics: numeric columns standardized
+(missing values at the mean), categorical columns one-hot over their
+ONE_HOT_MAX_LEVELS most frequent real labels, each indicator scaled by 1/sqrt(2) so
+a differing label adds 1 to the squared distance like one standard deviation. The
+real rows go into a KD-tree (ball tree above KD_TREE_MAX_DIMS dimensions) and the
+synthetic rows are queried in batches of BATCH_ROWS in a thread pool, so a 1M x 1M
+comparison costs O(m log n) instead of O(n m). Exact matches are 64-bit row hashes
+looked up in the hash set of the real rows.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import categorical_encoding
+import lazy_imports
+import performance
+import resource_manager
+
+sklearn_neighbors = lazy_imports.lazy_module("sklearn.neighbors")
+
+ONE_HOT_MAX_LEVELS = 20
+KD_TREE_MAX_DIMS = 15
+BATCH_ROWS = 50_000
+BASELINE_ROWS = 10_000  # real rows whose distance to the other real rows is the reference
+QUANTILES = {'min': 0.0, 'p5': 0.05, 'median': 0.5, 'mean': None}
+
+
+def encode_features(real_df, *other_dfs):
+    """
+    Encode tables into float matrices with a transform fitted on the real table.
+
+    Args:
+        real_df: Table the scaling and vocabularies are learned from
+        other_dfs: Tables encoded the same way, e.g. the synthetic one
+
+    Returns:
+        list: Matrix of `real_df`, then of each of `other_dfs`, float64 with one
+            column per feature (the columns all tables share)
+    """
+    frames = (real_df,) + other_dfs
+    columns = [col for col in real_df.columns if all(col in df.columns for df in other_dfs)]
+    numeric = [col for col in columns if pd.api.types.is_numeric_dtype(real_df[col]) and not pd.api.types.is_bool_dtype(real_df[col])]
+    categorical = [col for col in columns if col not in numeric]
+
+    real_values = real_df[numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+    mean = np.nanmean(real_values, axis=0) if len(real_values) else np.zeros(len(numeric))
+    std = np.nanstd(real_values, axis=0) if len(real_values) else np.ones(len(numeric))
+    std[~(std > 0)] = 1.0
+    parts = [[np.nan_to_num((df[numeric].to_numpy(dtype=np.float64, na_value=np.nan) - mean) / std)] for df in frames]
+
+    # Vocabularies limited to the most frequent real labels; the others encode as all zeros
+    encoder = categorical_encoding.CategoricalEncoder(
+        {col: real_df[col].value_counts().index[:ONE_HOT_MAX_LEVELS].tolist() for col in categorical})
+    for col in categorical:
+        for frame_parts, df in zip(parts, frames):
+            frame_parts.append(encoder.indicators(df, col, sparse=False).to_numpy(dtype=np.float64) / np.sqrt(2))
+    return [np.hstack(frame_parts) for frame_parts in parts]
+
+
+def _neighbor_distances(tree, queries, k, workers):
+    batches = [queries[start:start + BATCH_ROWS] for start in range(0, len(queries), BATCH_ROWS)]
+    # Tree queries release the GIL
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(lambda batch: tree.query(batch, k=k)[0], batches))
+    return np.vstack(results) if results else np.empty((0, k))
+
+
+def _summary(values):
+    if len(values) == 0:
+        return {name: float('nan') for name in QUANTILES}
+    return {name: float(np.mean(values) if q is None else np.quantile(values, q)) for name, q in QUANTILES.items()}
+
+
+def row_hashes(df, columns):
+    """64-bit hash of every row over `columns`, computed in parallel chunks."""
+    chunks = [df.iloc[start:start + BATCH_ROWS] for start in range(0, len(df), BATCH_ROWS)]
+    with ThreadPoolExecutor(max_workers=resource_manager.get_manager().threads) as pool:
+        hashes = list(pool.map(lambda chunk: pd.util.hash_pandas_object(chunk[columns], index=False).to_numpy(), chunks))
+    return np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+
+
+def _aligned(synthetic_df, real_df, columns):
+    """Synthetic columns cast to the real dtypes, so equal values hash equally."""
+    aligned = synthetic_df[columns].copy(deep=False)
+    for col in columns:
+        if aligned[col].dtype != real_df[col].dtype:
+            try:
+                aligned[col] = aligned[col].astype(real_df[col].dtype)
+            except (TypeError, ValueError):
+                pass
+    return aligned
+
+
+@performance.timed()
+def exact_matches(real_df, synthetic_df):
+    """Number of synthetic rows identical to a real row (over the shared columns)."""
+    columns = [col for col in real_df.columns if col in synthetic_df.columns]
+    if not columns or synthetic_df.empty:
+        return 0
+    real_hashes = row_hashes(real_df, columns)
+    synthetic_hashes = row_hashes(_aligned(synthetic_df, real_df, columns), columns)
+    return int(pd.Series(synthetic_hashes).isin(real_hashes).sum())
+
+
+@performance.timed()
+def privacy_metrics(real_df, synthetic_df, seed=0):
+    """
+    Compute DCR, NNDR and exact-match leakage of `synthetic_df` against `real_df`.
+
+    Returns:
+        dict: 'dcr' and 'baseline_dcr' (real rows to the other real rows) summaries,
+            'nndr' summary, 'closer_than_baseline_share' (synthetic rows closer to a
+            real row than 95% of real rows are to their neighbour), 'exact_matches',
+            'exact_match_share' and the row counts
+    """
+    real_matrix, synthetic_matrix = encode_features(real_df, synthetic_df)
+    if real_matrix.shape[1] == 0 or len(real_matrix) == 0:
+        raise ValueError("the tables share no column or the real table is empty")
+    workers = resource_manager.get_manager().threads
+    tree_class = sklearn_neighbors.KDTree if real_matrix.shape[1] <= KD_TREE_MAX_DIMS else sklearn_neighbors.BallTree
+    with performance.track("privacy.index"):
+        tree = tree_class(real_matrix)
+
+    k = min(2, len(real_matrix))
+    distances = _neighbor_distances(tree, synthetic_matrix, k, workers)
+    dcr = distances[:, 0]
+    # 0 when both neighbours are at distance 0 (a copy of duplicated real rows)
+    nndr = np.divide(dcr, distances[:, -1], out=np.zeros(len(dcr)), where=distances[:, -1] > 0)
+
+    # Reference: distance of real rows to the closest other real row (the first neighbour is the row itself)
+    sample = np.random.default_rng(seed).choice(len(real_matrix), min(BASELINE_ROWS, len(real_matrix)), replace=False)
+    baseline = _neighbor_distances(tree, real_matrix[sample], min(2, len(real_matrix)), workers)[:, -1]
+    threshold = np.quantile(baseline, 0.05) if len(baseline) else 0.0
+
+    matches = exact_matches(real_df, synthetic_df)
+    return {
+        'dcr': _summary(dcr),
+        'baseline_dcr': _summary(baseline),
+        'nndr': _summary(nndr),
+        'closer_than_baseline_share': float((dcr < threshold).mean()) if len(dcr) else 0.0,
+        'exact_matches': matches,
+        'exact_match_share': matches / len(synthetic_df) if len(synthetic_df) else 0.0,
+        'real_rows': len(real_df),
+        'synthetic_rows': len(synthetic_df),
+    }
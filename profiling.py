@@ -0,0 +1,270 @@
+''' Opt-in sampling profiler for a single script run or synthesis job.
+
+A background thread samples the stack of the Streamlit script thread at a fixed
+interval through sys._current_frames(), so the profiled code itself is not traced
+call by call. Captures are written to local disk as collapsed stacks (flamegraph.pl,
+inferno) and speedscope JSON. Nothing runs unless a capture has been armed from the
+sidebar.
+'''
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+import streamlit as st
+
+PROFILE_DIR = os.environ.get("HITL_EDA_PROFILE_DIR", "profiles")
+DEFAULT_INTERVAL = 0.005  # seconds between samples (200 Hz)
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Wrapper frames left out of the per-line attribution
+_INSTRUMENTATION_FILES = {"profiling.py", "performance.py"}
+
+# Capture targets offered in the sidebar
+PROFILE_TARGETS = ["Off", "Next rerun", "Next synthesis job"]
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread until stopped.
+
+    Args:
+        thread_id: Identifier of the thread to sample, defaults to the calling thread
+        interval: Seconds between two samples
+    """
+
+    def __init__(self, thread_id=None, interval=DEFAULT_INTERVAL, name="profile"):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.name = name
+        self.samples = Counter()  # stack tuple (root first) -> sample count
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="hitl-eda-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return self
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            self.samples[tuple(reversed(stack))] += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def to_collapsed(self):
+        """Render the samples in the collapsed stack format: `frame;frame;frame count` per line."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join(f"{name} ({_short_path(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self):
+        """Render the samples as a speedscope 'sampled' profile."""
+        frame_index = {}
+        frames = []
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indices = []
+            for name, filename, line in stack:
+                key = (name, filename, line)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": f"{name} ({_short_path(filename)}:{line})", "file": filename, "line": line})
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "hitl-eda",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        })
+
+    def hot_lines(self, limit=15):
+        """
+        Attribute samples to lines of this project's modules.
+
+        Returns:
+            pd.DataFrame: file, function, line, inclusive samples (the line is anywhere
+                on the stack) and self samples (the line is the innermost project frame)
+        """
+        inclusive, own = Counter(), Counter()
+        for stack, count in self.samples.items():
+            project_frames = [(name, filename, line) for name, filename, line in stack
+                              if filename.startswith(PROJECT_DIR) and os.path.basename(filename) not in _INSTRUMENTATION_FILES]
+            for frame in set(project_frames):
+                inclusive[frame] += count
+            if project_frames:
+                own[project_frames[-1]] += count
+
+        rows = [{"file": os.path.basename(filename), "function": name, "line": line,
+                 "inclusive_samples": total, "self_samples": own.get((name, filename, line), 0)}
+                for (name, filename, line), total in inclusive.most_common(limit)]
+        return pd.DataFrame(rows, columns=["file", "function", "line", "inclusive_samples", "self_samples"])
+
+    def save(self, directory=PROFILE_DIR):
+        """
+        Write the collapsed stacks and speedscope JSON to `directory`.
+
+        Returns:
+            dict: Paths of the written artifacts and a summary of the capture
+        """
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{id(self):x}")
+        with open(stem + ".collapsed.txt", "w") as f:
+            f.write(self.to_collapsed())
+        with open(stem + ".speedscope.json", "w") as f:
+            f.write(self.to_speedscope())
+        return {
+            "name": self.name,
+            "collapsed": stem + ".collapsed.txt",
+            "speedscope": stem + ".speedscope.json",
+            "samples": sum(self.samples.values()),
+            "duration": self.duration,
+            "hot_lines": self.hot_lines(),
+        }
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _short_path(filename):
+    if filename.startswith(PROJECT_DIR):
+        return os.path.relpath(filename, PROJECT_DIR)
+    return os.path.basename(filename)
+
+
+def _arm_capture():
+    st.session_state.profile_armed = st.session_state.profile_target
+    st.session_state.profile_just_armed = True  # the rerun caused by arming is not the one to capture
+
+
+def begin_run():
+    """
+    Start profiling this script run if a 'Next rerun' capture is armed.
+
+    A capture left running by a run that st.rerun() cut short is stopped and saved
+    first, which is usually the run that handled the slow button click.
+    """
+    stale = st.session_state.pop('profiler_active', None)
+    if stale is not None:
+        _store_capture(stale.stop().save())
+
+    if st.session_state.pop('profile_just_armed', False):
+        return
+    if st.session_state.get('profile_armed') == "Next rerun":
+        st.session_state.profile_armed = "Off"
+        st.session_state.profiler_active = SamplingProfiler(name="rerun").start()
+
+
+def end_run():
+    profiler = st.session_state.pop('profiler_active', None)
+    if profiler is not None:
+        _store_capture(profiler.stop().save())
+
+
+class profile_synthesis:
+    """
+    Context manager profiling a synthesis job when a 'Next synthesis job' capture is armed.
+
+    Costs one session_state lookup when no capture is armed.
+    """
+
+    def __enter__(self):
+        self.profiler = None
+        if st.session_state.get('profile_armed') == "Next synthesis job" and 'profiler_active' not in st.session_state:
+            st.session_state.profile_armed = "Off"
+            self.profiler = SamplingProfiler(name="synthesis").start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is not None:
+            _store_capture(self.profiler.stop().save())
+        return False
+
+
+def _store_capture(capture):
+    captures = st.session_state.setdefault('profile_captures', [])
+    captures.append(capture)
+    del captures[:-5]
+
+
+def display_profiler_controls():
+    """
+    Render the capture toggle and links to the latest profiles.
+    """
+    st.markdown('**🔬 Sampling Profiler**')
+    # A capture disarms itself once taken; reflect that in the widget before it renders
+    if st.session_state.get('profile_armed', "Off") == "Off":
+        st.session_state.profile_target = "Off"
+    st.selectbox(
+        "Capture",
+        PROFILE_TARGETS,
+        key="profile_target",
+        on_change=_arm_capture,
+        help="Arm a one-off capture of the next script rerun or the next synthesis job"
+    )
+
+    captures = st.session_state.get('profile_captures', [])
+    if not captures:
+        return
+
+    capture = captures[-1]
+    st.caption(f"Last capture: {capture['name']}, {capture['samples']} samples over {capture['duration']:.2f} s")
+    if not capture['hot_lines'].empty:
+        st.dataframe(capture['hot_lines'], use_container_width=True, hide_index=True)
+    for kind, mime in (("speedscope", "application/json"), ("collapsed", "text/plain")):
+        path = capture[kind]
+        if os.path.exists(path):
+            st.download_button(
+                label=f"📥 {os.path.basename(path)}",
+                data=functools.partial(_read_bytes, path),
+                file_name=os.path.basename(path),
+                mime=mime,
+                key=f"profile_{kind}_download",
+                on_click="ignore"
+            )
+    st.caption(f"Saved under `{os.path.abspath(os.path.dirname(capture['speedscope']))}` · open the JSON at https://www.speedscope.app")
@@ -0,0 +1,386 @@
+''' Multi-table synthesis that keeps primary/foreign keys and child cardinalities.
+
+A schema is a set of named tables, a primary key per table and relationships
+(parent table, parent key, child table, child key); every child table has one parent
+and the relationships form a forest. Each table gets a single-table synthesizer of
+its non-key columns, and every relationship keeps the real distribution of the
+number of children per parent, zeros included.
+
+Generation is split into `partitions` independent partitions of the root rows. A
+partition samples its root rows, draws the number of children of each of them,
+samples that many child rows and links them to their parent, and so on down the
+tree, with local keys. Partitions share nothing and are reseeded from (seed,
+partition), so they run in a process pool and generation time shrinks with every
+added core; the result depends on the seed and number of partitions only. Keys are
+made global at the end by offsetting each partition's local keys, which keeps every
+foreign key pointing to an existing parent.
+'''
+
+import io
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import data_export
+import lazy_imports
+import performance
+import resource_manager
+import sharded_sampling
+import synthesis_metadata
+
+sdv_single_table = lazy_imports.lazy_module("sdv.single_table")
+sdv_metadata = lazy_imports.lazy_module("sdv.metadata")
+
+MODELS = {"Gaussian Copula": "GaussianCopulaSynthesizer", "CTGAN": "CTGANSynthesizer"}
+DEFAULT_PARTITIONS = 16
+RELATIONSHIP_COLUMNS = ["parent", "parent_key", "child", "child_key"]
+
+
+def load_table(uploaded_file):
+    """Read an uploaded CSV or Parquet file."""
+    content = io.BytesIO(uploaded_file.getvalue())
+    if uploaded_file.name.lower().endswith(".parquet"):
+        return pd.read_parquet(content)
+    return pd.read_csv(content)
+
+
+def detect_primary_key(df):
+    """First column that is unique and never missing, preferring names ending in 'id'."""
+    unique = [col for col in df.columns
+              if not pd.api.types.is_float_dtype(df[col]) and df[col].notna().all() and df[col].is_unique]
+    named = [col for col in unique if str(col).lower().endswith("id")]
+    return (named or unique or [None])[0]
+
+
+def detect_relationships(tables, primary_keys):
+    """
+    Find foreign keys: a column of one table named like the primary key of another
+    (`id` or `<parent>_id`) whose values all exist in that key.
+
+    Returns:
+        DataFrame: One row per relationship, with RELATIONSHIP_COLUMNS
+    """
+    found = []
+    for child, child_df in tables.items():
+        for parent, parent_key in primary_keys.items():
+            if parent == child or parent_key is None or any(row[2] == child for row in found):
+                continue
+            names = {str(parent_key).lower(), f"{parent}_{parent_key}".lower(), f"{parent}_id".lower()}
+            for col in child_df.columns:
+                if col == primary_keys.get(child) or str(col).lower() not in names:
+                    continue
+                values = child_df[col].dropna()
+                if len(values) and values.isin(tables[parent][parent_key]).all():
+                    found.append((parent, parent_key, child, col))
+                    break
+    return pd.DataFrame(found, columns=RELATIONSHIP_COLUMNS)
+
+
+def generation_order(tables, primary_keys, relationships):
+    """
+    Validate a schema and return its tables parents first.
+
+    Raises:
+        ValueError: If a relationship names an unknown table or column, a parent key
+            is not the parent's primary key, a child has several parents or the
+            relationships form a cycle
+    """
+    parents = {}
+    for relationship in relationships:
+        parent, parent_key, child, child_key = (relationship[col] for col in RELATIONSHIP_COLUMNS)
+        if parent not in tables or child not in tables:
+            raise ValueError(f"unknown table in {parent} → {child}")
+        if parent_key != primary_keys.get(parent):
+            raise ValueError(f"{parent}.{parent_key} is not the primary key of {parent}")
+        if child_key not in tables[child].columns:
+            raise ValueError(f"{child} has no column {child_key}")
+        if child in parents:
+            raise ValueError(f"{child} references several parents; only one foreign key per table is supported")
+        parents[child] = relationship
+
+    order = []
+    while len(order) < len(tables):
+        ready = [name for name in tables if name not in order
+                 and (name not in parents or parents[name]['parent'] in order)]
+        if not ready:
+            raise ValueError("the relationships form a cycle")
+        order.extend(ready)
+    return order, parents
+
+
+def children_per_parent(parent_df, parent_key, child_df, child_key):
+    """Number of child rows of every parent row, zeros included."""
+    counts = child_df[child_key].value_counts()
+    return counts.reindex(parent_df[parent_key], fill_value=0).to_numpy(dtype=np.int64)
+
+
+@performance.timed()
+def fit_relational(tables, primary_keys, relationships, model="Gaussian Copula", epochs=30):
+    """
+    Fit one synthesizer per table and the child cardinalities of every relationship.
+
+    Returns:
+        dict: 'order', 'parents' (child -> relationship), 'tables' (name -> synthesizer,
+            columns, primary key, whether the keys are integers) and 'counts'
+            (child -> children per real parent)
+    """
+    order, parents = generation_order(tables, primary_keys, relationships)
+    fitted = {}
+    for name in order:
+        df = tables[name]
+        keys = [col for col in (primary_keys.get(name), parents.get(name, {}).get('child_key')) if col is not None]
+        values = df.drop(columns=keys)
+        synthesizer = None
+        if len(values.columns):
+            metadata = synthesis_metadata.detect_metadata(values)['metadata']
+            params = {'epochs': epochs} if model == "CTGAN" else {}
+            synthesizer = getattr(sdv_single_table, MODELS[model])(sdv_metadata.SingleTableMetadata.load_from_dict(metadata), **params)
+            with performance.track("relational.fit", values):
+                synthesizer.fit(values)
+        fitted[name] = {
+            'synthesizer': synthesizer,
+            'columns': list(df.columns),
+            'primary_key': primary_keys.get(name),
+            'integer_keys': {col: pd.api.types.is_integer_dtype(df[col]) for col in keys},
+        }
+    counts = {child: children_per_parent(tables[rel['parent']], rel['parent_key'], tables[child], rel['child_key'])
+              for child, rel in parents.items()}
+    return {'order': order, 'parents': parents, 'tables': fitted, 'counts': counts,
+            'rows': {name: len(df) for name, df in tables.items()}}
+
+
+def _sample_values(table, num_rows, seed):
+    if table['synthesizer'] is None or num_rows == 0:
+        return pd.DataFrame(index=range(num_rows))
+    with sharded_sampling.seeded(table['synthesizer'], seed) as synthesizer:
+        return synthesizer.sample(num_rows=num_rows).reset_index(drop=True)
+
+
+def generate_partition(model, root_rows, seed, partition):
+    """
+    Generate one partition: its root rows and all their descendants, with local keys.
+
+    Args:
+        root_rows: dict of root table -> number of rows of this partition
+
+    Returns:
+        dict: table -> DataFrame; primary keys are 0..n-1 and foreign keys point to
+            the local primary keys of the parent's frame
+    """
+    partition_seed = sharded_sampling.block_seed(seed, partition)
+    rng = np.random.default_rng(partition_seed)
+    frames = {}
+    for position, name in enumerate(model['order']):
+        relationship = model['parents'].get(name)
+        if relationship is None:
+            num_rows, parent_keys = root_rows[name], None
+        else:
+            counts = rng.choice(model['counts'][name], size=len(frames[relationship['parent']]))
+            num_rows = int(counts.sum())
+            parent_keys = np.repeat(np.arange(len(frames[relationship['parent']])), counts)
+        table = model['tables'][name]
+        rows = _sample_values(table, num_rows, sharded_sampling.block_seed(partition_seed, position))
+        if table['primary_key'] is not None:
+            rows[table['primary_key']] = np.arange(num_rows)
+        if relationship is not None:
+            rows[relationship['child_key']] = parent_keys
+        frames[name] = rows
+    return frames
+
+
+def _generate_partition_from_file(model_path, root_rows, seed, partition):
+    with open(model_path, "rb") as f:
+        return generate_partition(pickle.load(f), root_rows, seed, partition)
+
+
+def _global_key(values, integer, table):
+    return values if integer else np.char.add(f"{table}_", values.astype(str)).astype(object)
+
+
+@performance.timed()
+def generate_relational(model, scale=1.0, seed=0, partitions=DEFAULT_PARTITIONS, processes=1):
+    """
+    Generate every table of a fitted schema.
+
+    Args:
+        model: Result of fit_relational()
+        scale: Root rows to generate, as a multiple of the real root rows
+        seed: Seed of the run; with the same number of partitions, the output does not
+            depend on the number of processes
+        partitions: Independent partitions the root rows are split into
+        processes: Worker processes; 1 generates in this process
+
+    Returns:
+        dict: table -> DataFrame with the real column order and globally unique keys
+    """
+    roots = [name for name in model['order'] if name not in model['parents']]
+    totals = {name: int(round(model['rows'][name] * scale)) for name in roots}
+    shares = [{name: total * (p + 1) // partitions - total * p // partitions for name, total in totals.items()}
+              for p in range(partitions)]
+
+    if processes > 1 and partitions > 1:
+        from model_selection import worker_context
+
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, "relational.pkl")
+            with open(model_path, "wb") as f:
+                pickle.dump(model, f)
+            with ProcessPoolExecutor(max_workers=min(processes, partitions), mp_context=worker_context(),
+                                     initializer=resource_manager.apply_thread_limits, initargs=(1,)) as pool:
+                futures = [pool.submit(_generate_partition_from_file, model_path, shares[p], seed, p) for p in range(partitions)]
+                results = [future.result() for future in futures]
+    else:
+        results = [generate_partition(model, shares[p], seed, p) for p in range(partitions)]
+
+    # Offsets turning the local keys of each partition into global ones
+    offsets = {name: np.concatenate([[0], np.cumsum([len(result[name]) for result in results])[:-1]]) for name in model['order']}
+    synthetic = {}
+    for name in model['order']:
+        table = model['tables'][name]
+        relationship = model['parents'].get(name)
+        frames = []
+        for p, result in enumerate(results):
+            frame = result[name]
+            if table['primary_key'] is not None:
+                frame[table['primary_key']] = frame[table['primary_key']] + offsets[name][p]
+            if relationship is not None:
+                frame[relationship['child_key']] = frame[relationship['child_key']] + offsets[relationship['parent']][p]
+            frames.append(frame)
+        combined = pd.concat(frames, ignore_index=True)
+        if table['primary_key'] is not None:
+            key = table['primary_key']
+            combined[key] = _global_key(combined[key].to_numpy(dtype=np.int64), table['integer_keys'][key], name)
+        if relationship is not None:
+            # Formatted like the parent's primary key, so the values match
+            parent = model['tables'][relationship['parent']]
+            combined[relationship['child_key']] = _global_key(combined[relationship['child_key']].to_numpy(dtype=np.int64),
+                                                              parent['integer_keys'][parent['primary_key']], relationship['parent'])
+        synthetic[name] = combined.reindex(columns=table['columns'])
+    return synthetic
+
+
+def relational_report(tables, synthetic, parents):
+    """
+    Referential integrity and children-per-parent statistics, real vs synthetic.
+
+    Returns:
+        DataFrame: One row per relationship and data source
+    """
+    rows = []
+    for child, rel in parents.items():
+        for source, frames in (("real", tables), ("synthetic", synthetic)):
+            parent_df, child_df = frames[rel['parent']], frames[child]
+            counts = children_per_parent(parent_df, rel['parent_key'], child_df, rel['child_key'])
+            foreign = child_df[rel['child_key']].dropna()
+            rows.append({
+                'relationship': f"{rel['parent']} → {child}",
+                'data': source,
+                'parents': len(parent_df),
+                'children': len(child_df),
+                'orphans': int((~foreign.isin(parent_df[rel['parent_key']])).sum()),
+                'mean_children': float(counts.mean()) if len(counts) else 0.0,
+                'median_children': float(np.median(counts)) if len(counts) else 0.0,
+                'p95_children': float(np.percentile(counts, 95)) if len(counts) else 0.0,
+                'max_children': int(counts.max()) if len(counts) else 0,
+                'childless_share': float((counts == 0).mean()) if len(counts) else 0.0,
+            })
+    return pd.DataFrame(rows)
+
+
+def display_relational_synthesis(sdg_df, version=None):
+    """
+    Render the multi-table mode: the loaded dataset plus uploaded related tables.
+
+    Returns:
+        tuple: (synthetic version of the loaded dataset, success, error_message)
+    """
+    main_name = st.text_input("Name of the Loaded Table", value="main", key="relational_main_name")
+    uploads = st.file_uploader("Related Tables (CSV or Parquet)", type=["csv", "parquet"], accept_multiple_files=True,
+                               key="relational_upload", help="Each file is one table, named after the file")
+    tables = {main_name: sdg_df}
+    try:
+        for uploaded in uploads or []:
+            tables[os.path.splitext(uploaded.name)[0]] = load_table(uploaded)
+    except Exception as e:
+        error_msg = f"Could not read {uploaded.name}: {str(e)}"
+        st.error(f"❌ {error_msg}")
+        return None, False, error_msg
+    if len(tables) < 2:
+        st.info("Upload the child (or parent) tables of the loaded dataset to declare their keys.")
+        return None, False, "Please upload the related tables."
+
+    st.markdown("**Primary Keys**")
+    primary_keys = {}
+    for col, (name, df) in zip(st.columns(len(tables)), tables.items()):
+        with col:
+            options = [None] + list(df.columns)
+            detected = detect_primary_key(df)
+            primary_keys[name] = st.selectbox(name, options, index=options.index(detected),
+                                              format_func=lambda option: "None" if option is None else str(option),
+                                              key=f"relational_primary_key_{name}")
+
+    st.markdown("**Foreign Keys**")
+    relationships = st.data_editor(
+        detect_relationships(tables, primary_keys),
+        column_config={
+            'parent': st.column_config.SelectboxColumn("parent", options=list(tables), required=True),
+            'child': st.column_config.SelectboxColumn("child", options=list(tables), required=True),
+        },
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key=f"relational_keys_editor_{version}_{'_'.join(tables)}"
+    ).dropna()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        model_option = st.selectbox("Model per Table", list(MODELS), key="relational_model_select")
+    with col2:
+        scale = st.number_input("Scale", min_value=0.01, value=1.0, step=0.5, key="relational_scale_input",
+                                help="Rows of the root tables, as a multiple of the real ones")
+    with col3:
+        partitions = int(st.number_input("Partitions", min_value=1, max_value=1024, value=DEFAULT_PARTITIONS,
+                                         key="relational_partitions_input",
+                                         help="Independent parent partitions generated in parallel; with the seed, fixes the output"))
+    with col4:
+        seed = int(st.number_input("Random Seed", min_value=0, value=0, step=1, key="relational_seed_input"))
+    epochs = st.slider("Training Epochs", min_value=1, max_value=100, value=30, step=5,
+                       key="relational_epochs_slider") if model_option == "CTGAN" else 30
+
+    if not st.button("Generate Related Tables", key="generate_relational_button"):
+        return None, False, "Please click 'Generate Related Tables' to start the process."
+
+    records = relationships[RELATIONSHIP_COLUMNS].to_dict("records")
+    settings = (version, tuple((name, df.shape) for name, df in tables.items()), tuple(primary_keys.items()),
+                tuple(tuple(record.values()) for record in records), model_option, epochs)
+    fitted = st.session_state.get('relational_fitted')
+    try:
+        with resource_manager.get_manager().job("relational") as ticket:
+            if fitted is None or fitted['settings'] != settings:
+                with st.spinner(f"Training {len(tables)} table models..."):
+                    model = fit_relational(tables, primary_keys, records, model_option, epochs)
+                fitted = st.session_state.relational_fitted = {'settings': settings, 'model': model}
+            with st.spinner(f"Generating {partitions} partitions on {ticket['threads']} processes..."):
+                synthetic = generate_relational(fitted['model'], scale, seed, partitions, processes=ticket['threads'])
+    except Exception as e:
+        error_msg = f"Error generating related tables: {str(e)}"
+        st.error(f"❌ {error_msg}")
+        return None, False, error_msg
+
+    resource_manager.report_wait(ticket)
+    st.subheader("🔗 Keys and Cardinalities")
+    st.dataframe(relational_report(tables, synthetic, fitted['model']['parents']).round(3),
+                 use_container_width=True, hide_index=True)
+    for name, df in synthetic.items():
+        if name == main_name:
+            continue
+        with st.expander(f"📄 {name}: {len(df):,} rows", expanded=False):
+            st.dataframe(df.head(), use_container_width=True)
+            data_export.download_dataframe_button(df, file_stem=f"synthetic_{name}", label=f"📥 Download {name}",
+                                                  key=f"relational_download_{name}")
+    return synthetic[main_name], True, None
@@ -0,0 +1,151 @@
+''' Server-wide limits on concurrent heavy jobs and the threads each one may use.
+
+Torch, the BLAS behind NumPy and OpenMP in scikit-learn each size their thread pools
+to the whole machine, so two sessions fitting CTGAN at once on a 16 core box run 32+
+busy threads and both slow to a crawl. All sessions of a server share one
+ResourceManager: a job (a synthesizer fit, a model comparison, a sharded export)
+first takes one of `max_jobs` slots, waiting in line if they are all busy, and runs
+with at most `threads` threads. Time spent waiting is recorded so the sidebar shows
+queueing instead of the whole server getting slower.
+
+Thread pools are process-wide, so the cap is applied to the process and is the same
+for every job; max_jobs x threads should not exceed the number of cores.
+'''
+
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+import lazy_imports
+import performance
+
+# threadpoolctl scans the loaded native libraries, so it is imported when limits are first applied
+threadpoolctl = lazy_imports.lazy_module("threadpoolctl")
+
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_MAX_JOBS = int(os.environ.get("HITL_EDA_MAX_JOBS", max(1, CPU_COUNT // 4)))
+DEFAULT_JOB_THREADS = int(os.environ.get("HITL_EDA_JOB_THREADS", max(1, CPU_COUNT // DEFAULT_MAX_JOBS)))
+WAIT_HISTORY = 200  # recent queue waits kept for the statistics
+
+
+def apply_thread_limits(threads):
+    """Cap the BLAS/OpenMP pools and torch to `threads` threads in this process."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)  # inherited by worker processes started later
+    threadpoolctl.threadpool_limits(limits=threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+class ResourceManager:
+    """
+    Counting semaphore of job slots whose size can be changed while jobs run.
+
+    Args:
+        max_jobs: Number of jobs allowed to run at the same time
+        threads: Threads available to each job
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, threads=DEFAULT_JOB_THREADS):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._completed = 0
+        self._waits = collections.deque(maxlen=WAIT_HISTORY)
+        self.configure(max_jobs, threads)
+
+    def configure(self, max_jobs, threads):
+        """Resize the slots and the per-job thread cap; waiting jobs are woken if slots were added."""
+        with self._condition:
+            self.max_jobs = max(1, int(max_jobs))
+            self.threads = max(1, int(threads))
+            self._condition.notify_all()
+        apply_thread_limits(self.threads)
+
+    @contextlib.contextmanager
+    def job(self, name="job"):
+        """
+        Run a block as a job: wait for a free slot, then run it under the thread cap.
+
+        Yields:
+            dict: 'name', 'wait_seconds' (time spent in the queue) and 'threads'
+        """
+        start = time.perf_counter()
+        with performance.track(f"queue_wait.{name}"):
+            with self._condition:
+                self._waiting += 1
+                try:
+                    while self._active >= self.max_jobs:
+                        self._condition.wait()
+                finally:
+                    self._waiting -= 1
+                self._active += 1
+                self._waits.append(time.perf_counter() - start)
+        ticket = {'name': name, 'wait_seconds': time.perf_counter() - start, 'threads': self.threads}
+        try:
+            apply_thread_limits(self.threads)
+            yield ticket
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._completed += 1
+                self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            waits = list(self._waits)
+            return {
+                'max_jobs': self.max_jobs,
+                'threads': self.threads,
+                'active': self._active,
+                'waiting': self._waiting,
+                'completed': self._completed,
+                'recent_jobs': len(waits),
+                'mean_wait_seconds': float(np.mean(waits)) if waits else 0.0,
+                'p95_wait_seconds': float(np.percentile(waits, 95)) if waits else 0.0,
+            }
+
+
+# Function to get the ResourceManager shared by all sessions of the server
+@st.cache_resource
+def get_manager():
+    return ResourceManager()
+
+
+def _apply_controls():
+    get_manager().configure(st.session_state.resource_max_jobs, st.session_state.resource_job_threads)
+
+
+def display_resource_controls():
+    """Sidebar controls of the shared job slots, with their current load."""
+    manager = get_manager()
+    # Show the server-wide values, which another session may have changed
+    st.session_state.resource_max_jobs = manager.max_jobs
+    st.session_state.resource_job_threads = manager.threads
+    col1, col2 = st.columns(2)
+    with col1:
+        max_jobs = st.number_input("Concurrent Jobs", min_value=1, max_value=max(CPU_COUNT, manager.max_jobs), key="resource_max_jobs",
+                                   on_change=_apply_controls, help="Fits, model comparisons and exports running at once, server-wide")
+    with col2:
+        threads = st.number_input("Threads / Job", min_value=1, max_value=max(CPU_COUNT, manager.threads), key="resource_job_threads",
+                                  on_change=_apply_controls, help="Cap of torch, BLAS and OpenMP threads of each job")
+    if max_jobs * threads > CPU_COUNT:
+        st.caption(f"⚠️ {max_jobs} × {threads} threads exceed the {CPU_COUNT} cores of this machine.")
+
+    stats = manager.stats()
+    st.markdown(f"🧵 Jobs: **{stats['active']}** / {stats['max_jobs']} running, **{stats['waiting']}** queued")
+    st.markdown(f"⏳ Queue wait: **{stats['mean_wait_seconds']:.1f} s** mean, {stats['p95_wait_seconds']:.1f} s p95 "
+                f"over the last {stats['recent_jobs']} jobs")
+
+
+def report_wait(ticket, threshold=0.5):
+    """Tell the user a job waited for a slot, when the wait was noticeable."""
+    if ticket['wait_seconds'] >= threshold:
+        st.caption(f"⏳ Waited {ticket['wait_seconds']:.1f} s for a free job slot (other sessions were training).")
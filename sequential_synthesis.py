@@ -0,0 +1,304 @@
+''' Time-series synthesis of event logs: windowed training, streamed generation.
+
+Single-table synthesizers treat rows as independent, which loses the order of the
+events of an entity (a customer, a device). This mode fits SDV's PARSynthesizer
+with an entity key as sequence key and a time column as sequence index.
+
+Training: the history of every entity is cut into windows of `window` consecutive
+events and each window is a training sequence of its own, so PAR sees short, equally
+long sequences instead of one sequence of a million events, and at most
+`max_segments` windows (a random sample) go into one fit.
+
+Generation: the windows of an entity are sampled and chained, the times of each
+window shifted to continue after the previous one by the typical step between
+events, until `horizon` events. Entities are generated in seeded batches, and every
+batch is appended to a Parquet file and dropped before the next, so memory is
+bounded by one batch whatever the number of entities and the horizon.
+'''
+
+import copy
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+import lazy_imports
+import performance
+import resource_manager
+import sharded_sampling
+
+sdv_sequential = lazy_imports.lazy_module("sdv.sequential")
+sdv_metadata = lazy_imports.lazy_module("sdv.metadata")
+
+DEFAULT_WINDOW = 50
+MAX_TRAIN_SEGMENTS = 5_000
+DEFAULT_BATCH_ENTITIES = 200
+PREVIEW_ROWS = 1_000
+EXPORT_DIR = sharded_sampling.EXPORT_DIR
+KEY_HINTS = ("id", "key", "entity", "user", "customer", "device", "account", "session")
+
+
+def detect_sequence_columns(df, metadata_dict):
+    """
+    Guess the entity key and time column of an event log.
+
+    The time column is the first datetime column. The entity key is a column that
+    repeats (every value on two rows on average at least), preferring id sdtypes
+    and names like `user_id`, then longer sequences.
+
+    Returns:
+        tuple: (entity column or None, time column or None)
+    """
+    columns = metadata_dict['columns']
+    times = [col for col in df.columns
+             if pd.api.types.is_datetime64_any_dtype(df[col]) or columns.get(col, {}).get('sdtype') == 'datetime']
+    time_col = times[0] if times else None
+
+    candidates = []
+    for col in df.columns:
+        if col == time_col or pd.api.types.is_float_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            continue
+        distinct = df[col].nunique()
+        if distinct < 2 or distinct > len(df) / 2:
+            continue
+        named = any(hint in str(col).lower() for hint in KEY_HINTS)
+        candidates.append((columns.get(col, {}).get('sdtype') == 'id', named, len(df) / distinct, col))
+    entity = max(candidates, key=lambda candidate: candidate[:3])[3] if candidates else None
+    return entity, time_col
+
+
+def sequential_metadata(metadata_dict, entity, time_col=None):
+    """SDV metadata dict of the windowed training data: entity as sequence key, time as sequence index."""
+    metadata = copy.deepcopy(metadata_dict)
+    if metadata.get('primary_key') == entity:
+        metadata.pop('primary_key')
+    metadata['columns'][entity] = {'sdtype': 'id'}
+    metadata['sequence_key'] = entity
+    if time_col is not None:
+        if metadata['columns'][time_col]['sdtype'] not in ('datetime', 'numerical'):
+            metadata['columns'][time_col] = {'sdtype': 'datetime'}
+        metadata['sequence_index'] = time_col
+    return metadata
+
+
+def _sorted_events(df, entity, time_col=None):
+    return df.sort_values([entity, time_col] if time_col is not None else [entity], kind="stable")
+
+
+@performance.timed()
+def windowed_segments(df, entity, time_col=None, window=DEFAULT_WINDOW, max_segments=MAX_TRAIN_SEGMENTS, seed=0):
+    """
+    Cut the history of every entity into windows of `window` consecutive events.
+
+    Returns:
+        DataFrame: Events sorted by entity and time, the entity column replaced by an
+            integer id per window, at most `max_segments` windows
+    """
+    events = _sorted_events(df, entity, time_col)
+    window_index = events.groupby(entity, sort=False).cumcount().to_numpy() // window
+    segments = pd.factorize(pd.MultiIndex.from_arrays([events[entity], window_index]))[0]
+    if segments.max(initial=-1) + 1 > max_segments:
+        chosen = np.random.default_rng(seed).choice(segments.max() + 1, max_segments, replace=False)
+        keep = np.isin(segments, chosen)
+        events, segments = events[keep], segments[keep]
+    events = events.copy(deep=False)
+    events[entity] = segments
+    return events.reset_index(drop=True)
+
+
+def time_step(df, entity, time_col):
+    """Median gap between consecutive events of an entity, used to chain generated windows."""
+    is_datetime = pd.api.types.is_datetime64_any_dtype(df[time_col])
+    events = _sorted_events(df[[entity, time_col]].dropna(), entity, time_col)
+    gaps = events.groupby(entity, sort=False)[time_col].diff().dropna()
+    gaps = gaps[gaps > (pd.Timedelta(0) if is_datetime else 0)]
+    if len(gaps):
+        return gaps.median()
+    return pd.Timedelta(seconds=1) if is_datetime else 1
+
+
+@performance.timed()
+def fit_sequential(df, metadata_dict, entity, time_col=None, window=DEFAULT_WINDOW, epochs=30,
+                   max_segments=MAX_TRAIN_SEGMENTS, seed=0):
+    """
+    Fit PARSynthesizer on the windowed history of every entity.
+
+    Returns:
+        dict: 'synthesizer' and what generation needs to rebuild long sequences:
+            'entity', 'time', 'window', 'step', 'integer_ids', 'segments'
+    """
+    segments = windowed_segments(df, entity, time_col, window, max_segments, seed)
+    metadata = sdv_metadata.SingleTableMetadata.load_from_dict(sequential_metadata(metadata_dict, entity, time_col))
+    synthesizer = sdv_sequential.PARSynthesizer(metadata, epochs=epochs, verbose=False)
+    with sharded_sampling.seeded(synthesizer, seed), performance.track("sequential.fit", segments):
+        synthesizer.fit(segments)
+    return {
+        'synthesizer': synthesizer,
+        'entity': entity,
+        'time': time_col,
+        'window': window,
+        'step': time_step(df, entity, time_col) if time_col is not None else None,
+        'integer_ids': pd.api.types.is_integer_dtype(df[entity]),
+        'segments': int(segments[entity].nunique()),
+    }
+
+
+def _chain_windows(rows, model, first_entity, windows_per_entity, horizon):
+    """Turn sampled windows into the sequences of entities first_entity, first_entity + 1, ..."""
+    entity, time_col, window = model['entity'], model['time'], model['window']
+    segment = pd.factorize(rows[entity])[0]
+    position = rows.groupby(segment, sort=False).cumcount().to_numpy() + (segment % windows_per_entity) * window
+    owner = first_entity + segment // windows_per_entity
+
+    if time_col is not None:
+        times = rows[time_col]
+        bounds = times.groupby(segment).agg(['min', 'max'])
+        part_owner = pd.Series(bounds.index // windows_per_entity, index=bounds.index)
+        # Each window starts one step after the end of the previous window of its entity
+        span = (bounds['max'] - bounds['min']) + model['step']
+        start = bounds['min'].groupby(part_owner).transform('first') + (span.groupby(part_owner).cumsum() - span)
+        rows[time_col] = (start - bounds['min']).to_numpy()[segment] + times.to_numpy()
+
+    rows[entity] = owner if model['integer_ids'] else np.char.add("synthetic_", owner.astype(str)).astype(object)
+    rows = rows.assign(_position=position)
+    rows = rows[rows['_position'] < horizon].sort_values([entity, '_position'], kind="stable")
+    return rows.drop(columns='_position').reset_index(drop=True)
+
+
+def iter_sequences(model, num_entities, horizon, seed=0, batch_entities=DEFAULT_BATCH_ENTITIES):
+    """
+    Generate `num_entities` sequences of `horizon` events, one batch of entities at a time.
+
+    Batch b is sampled after reseeding with (seed, b), so a run is reproducible.
+
+    Yields:
+        DataFrame: Events of the next `batch_entities` entities
+    """
+    synthesizer, window = model['synthesizer'], model['window']
+    windows_per_entity = math.ceil(horizon / window)
+    for batch, first in enumerate(range(0, num_entities, batch_entities)):
+        entities = min(batch_entities, num_entities - first)
+        # Released before the yield, so a slow consumer does not hold up other sessions
+        with sharded_sampling.seeded(synthesizer, sharded_sampling.block_seed(seed, batch)), performance.track("sequential.sample"):
+            rows = synthesizer.sample(num_sequences=entities * windows_per_entity, sequence_length=min(window, horizon))
+        yield _chain_windows(rows, model, first, windows_per_entity, horizon)
+
+
+@performance.timed()
+def write_sequences(model, num_entities, horizon, path, seed=0, batch_entities=DEFAULT_BATCH_ENTITIES, progress=None):
+    """
+    Stream generated sequences into one Parquet file, flushing every batch.
+
+    The file appears under `path` only once complete.
+
+    Args:
+        progress: Optional callable(entities done, num_entities)
+
+    Returns:
+        dict: 'path', 'rows', 'entities' and 'preview' (first PREVIEW_ROWS rows)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".partial"
+    writer, written, preview = None, 0, None
+    try:
+        for batch, rows in enumerate(iter_sequences(model, num_entities, horizon, seed, batch_entities)):
+            table = pa.Table.from_pandas(rows, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(partial, table.schema)
+                preview = rows.head(PREVIEW_ROWS)
+            writer.write_table(table.cast(writer.schema))
+            written += len(rows)
+            if progress is not None:
+                progress(min((batch + 1) * batch_entities, num_entities), num_entities)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(partial, path)
+    return {'path': path, 'rows': written, 'entities': num_entities, 'preview': preview}
+
+
+def display_sequential_synthesis(sdg_df, metadata_dict, version=None):
+    """
+    Render the time-series synthesis mode.
+
+    The fitted model is kept in st.session_state.sequential_fitted and reused while the
+    dataset version and training settings are unchanged.
+
+    Returns:
+        tuple: (preview of the generated events, success, error_message)
+    """
+    detected_entity, detected_time = detect_sequence_columns(sdg_df, metadata_dict)
+    columns = list(sdg_df.columns)
+    col1, col2 = st.columns(2)
+    with col1:
+        entity = st.selectbox("Entity Key", columns, index=columns.index(detected_entity) if detected_entity is not None else 0,
+                              key="sequential_entity_select", help="Column identifying the entity whose events form one sequence")
+    with col2:
+        time_options = [None] + [col for col in columns if col != entity]
+        time_col = st.selectbox("Time Column", time_options,
+                                index=time_options.index(detected_time) if detected_time in time_options else 0,
+                                format_func=lambda col: "(row order)" if col is None else str(col),
+                                key="sequential_time_select", help="Orders the events of an entity")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        window = int(st.number_input("Window (events)", min_value=2, value=DEFAULT_WINDOW, step=10, key="sequential_window_input",
+                                     help="Histories are cut into training sequences of this many events"))
+    with col2:
+        epochs = st.slider("Training Epochs", min_value=1, max_value=100, value=30, step=5, key="sequential_epochs_slider")
+    with col3:
+        max_segments = int(st.number_input("Max Training Windows", min_value=10, value=MAX_TRAIN_SEGMENTS, step=500,
+                                           key="sequential_segments_input"))
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        num_entities = int(st.number_input("Entities", min_value=1, value=100, step=100, key="sequential_entities_input"))
+    with col2:
+        horizon = int(st.number_input("Events per Entity", min_value=1, value=window, step=window, key="sequential_horizon_input"))
+    with col3:
+        batch_entities = int(st.number_input("Entities per Batch", min_value=1, value=DEFAULT_BATCH_ENTITIES, step=50,
+                                             key="sequential_batch_input", help="Rows of one batch are written to disk before the next is sampled"))
+    with col4:
+        seed = int(st.number_input("Random Seed", min_value=0, value=0, step=1, key="sequential_seed_input"))
+
+    if not st.button("Generate Sequences", key="generate_sequences_button"):
+        return None, False, "Please click 'Generate Sequences' to start the process."
+
+    settings = (version, entity, time_col, window, epochs, max_segments)
+    fitted = st.session_state.get('sequential_fitted')
+    try:
+        with resource_manager.get_manager().job("sequential") as ticket:
+            if fitted is None or fitted['settings'] != settings:
+                with st.spinner("Training sequential model on windowed histories..."):
+                    model = fit_sequential(sdg_df, metadata_dict, entity, time_col, window, epochs, max_segments, seed)
+                fitted = st.session_state.sequential_fitted = {'settings': settings, 'model': model}
+
+            path = os.path.join(EXPORT_DIR, f"sequences_seed{seed}_{time.strftime('%Y%m%d_%H%M%S')}.parquet")
+            bar = st.progress(0.0, text="Generating sequences...")
+            start = time.perf_counter()
+            result = write_sequences(fitted['model'], num_entities, horizon, path, seed, batch_entities,
+                                     progress=lambda done, total: bar.progress(done / total, text=f"{done:,} / {total:,} entities"))
+            elapsed = time.perf_counter() - start
+    except Exception as e:
+        error_msg = f"Error generating sequences: {str(e)}"
+        st.error(f"❌ {error_msg}")
+        return None, False, error_msg
+
+    resource_manager.report_wait(ticket)
+    st.success(f"✅ {result['rows']:,} events of {result['entities']:,} entities written to `{os.path.abspath(path)}` "
+               f"in {elapsed:.1f} s ({result['rows'] / max(elapsed, 1e-9):,.0f} rows/s)")
+    st.caption(f"Trained on {fitted['model']['segments']:,} windows of {window} events. The preview and download below hold the "
+               f"first {min(PREVIEW_ROWS, result['rows']):,} rows, the full output is the Parquet file.")
+    return result['preview'], True, None
@@ -0,0 +1,232 @@
+''' Reproducible, shardable sampling of large synthetic datasets.
+
+The requested rows are cut into fixed-size blocks. Before a block is sampled, every
+random number generator the synthesizer uses (NumPy, Python, PyTorch and the
+model's own) is reseeded from (seed, block index), so a block comes out identical no
+matter which process draws it. The global generators are shared by every Streamlit
+session thread, so seeding and the sampling that follows happen under one process-wide
+lock (seeded()); otherwise two runs would reseed each other halfway. A shard is a contiguous range of blocks, which makes
+the concatenation of the shards' Parquet part files, in shard order, identical to a
+single-process run with the same seed, block size and row count.
+
+Shards can run in a local process pool (write_shards) or on separate machines from
+the command line, all loading the same saved model:
+
+    python sharded_sampling.py model.pkl --rows 100000000 --seed 42 --shard 3 --num-shards 16 --out parts/
+'''
+
+import argparse
+import contextlib
+import os
+import pickle
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+import performance
+import resource_manager
+
+DEFAULT_BLOCK_ROWS = 50_000
+EXPORT_DIR = os.environ.get("HITL_EDA_SHARD_DIR", "synthetic_parts")
+
+_seed_lock = threading.RLock()
+
+
+def block_seed(seed, block):
+    """Seed of one block, derived from the run seed and the block index."""
+    return int(np.random.SeedSequence([seed, block]).generate_state(1)[0])
+
+
+def seed_synthesizer(synthesizer, seed):
+    """Reseed the global generators and the synthesizer's own random state (use seeded() around sampling)."""
+    random.seed(seed)
+    np.random.seed(seed)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.manual_seed(seed)
+    if hasattr(synthesizer, "_set_random_state"):
+        synthesizer._set_random_state(seed)
+    elif hasattr(getattr(synthesizer, "_model", None), "set_random_state"):
+        synthesizer._model.set_random_state(seed)
+
+
+@contextlib.contextmanager
+def seeded(synthesizer, seed):
+    """
+    Reseed the synthesizer and hold the process-wide seeding lock until the block exits.
+
+    Everything that draws from the reseeded generators (sample(), fit()) belongs inside
+    the block; runs of other sessions wait instead of reseeding in between.
+    """
+    with _seed_lock:
+        seed_synthesizer(synthesizer, seed)
+        yield synthesizer
+
+
+def block_ranges(total_rows, block_rows=DEFAULT_BLOCK_ROWS):
+    """Return (block index, number of rows) for every block of a run."""
+    return [(block, min(block_rows, total_rows - start))
+            for block, start in enumerate(range(0, total_rows, block_rows))]
+
+
+def shard_blocks(total_rows, shard, num_shards, block_rows=DEFAULT_BLOCK_ROWS):
+    """Return the contiguous range of blocks assigned to `shard` out of `num_shards`."""
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"shard must be between 0 and {num_shards - 1}")
+    blocks = block_ranges(total_rows, block_rows)
+    first = len(blocks) * shard // num_shards
+    last = len(blocks) * (shard + 1) // num_shards
+    return blocks[first:last]
+
+
+def sample_block(synthesizer, num_rows, seed, block, reducer=None):
+    """Sample one block deterministically, restoring reduced columns if a reducer is given."""
+    rows_seed = block_seed(seed, block)
+    with seeded(synthesizer, rows_seed):
+        rows = synthesizer.sample(num_rows=num_rows)
+    if reducer is not None:
+        rows = reducer.inverse_transform(rows, seed=rows_seed)
+    return rows
+
+
+@performance.timed()
+def sample_seeded(synthesizer, num_rows, seed, reducer=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Sample `num_rows` rows in one process, block by block.
+
+    Returns the same rows as the concatenated part files of any sharded run with the
+    same seed and block size.
+    """
+    blocks = [sample_block(synthesizer, rows, seed, block, reducer)
+              for block, rows in block_ranges(num_rows, block_rows)]
+    return pd.concat(blocks, ignore_index=True) if blocks else synthesizer.sample(num_rows=0)
+
+
+def part_path(out_dir, shard):
+    return os.path.join(out_dir, f"part-{shard:05d}.parquet")
+
+
+def write_shard(synthesizer, total_rows, seed, shard, num_shards, out_dir, reducer=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Sample the blocks of one shard and stream them into its Parquet part file.
+
+    Returns:
+        dict: shard, path and number of rows written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = part_path(out_dir, shard)
+    writer, written = None, 0
+    try:
+        for block, rows in shard_blocks(total_rows, shard, num_shards, block_rows):
+            table = pa.Table.from_pandas(sample_block(synthesizer, rows, seed, block, reducer), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            written += rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return {'shard': shard, 'path': path if written else None, 'rows': written}
+
+
+def save_model(path, synthesizer, reducer=None):
+    """Save a fitted synthesizer (and its cardinality reducer) for shard workers."""
+    with open(path, "wb") as f:
+        pickle.dump({'synthesizer': synthesizer, 'reducer': reducer}, f)
+    return path
+
+
+def load_model(path):
+    with open(path, "rb") as f:
+        return model_from_bytes(f.read())
+
+
+def model_from_bytes(content):
+    """(synthesizer, reducer) from the bytes of a file written by save_model()."""
+    model = pickle.loads(content)
+    return model['synthesizer'], model['reducer']
+
+
+def _write_shard_from_file(model_path, total_rows, seed, shard, num_shards, out_dir, block_rows):
+    synthesizer, reducer = load_model(model_path)
+    return write_shard(synthesizer, total_rows, seed, shard, num_shards, out_dir, reducer, block_rows)
+
+
+@performance.timed()
+def write_shards(model_path, total_rows, seed, num_shards, out_dir, processes=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Write all shards of a run with a local process pool of single-threaded workers.
+
+    Returns:
+        list: One dict per shard (shard, path, rows), in shard order
+    """
+    from model_selection import worker_context
+
+    processes = max(1, min(processes or os.cpu_count() or 1, num_shards))
+    with ProcessPoolExecutor(max_workers=processes, mp_context=worker_context(),
+                             initializer=resource_manager.apply_thread_limits, initargs=(1,)) as pool:
+        futures = [pool.submit(_write_shard_from_file, model_path, total_rows, seed, shard, num_shards, out_dir, block_rows)
+                   for shard in range(num_shards)]
+        return [future.result() for future in futures]
+
+
+def display_sharded_export(synthesizer, reducer, seed, label="model"):
+    """
+    Render the sharded Parquet export of a fitted synthesizer.
+
+    Every run writes to a new directory under EXPORT_DIR together with the model file,
+    so the command line can add more shards of the same run on other machines.
+    """
+    with st.expander("📦 Sharded Parquet Export", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            total_rows = st.number_input("Total Rows", min_value=1, value=1_000_000, step=100_000, key="synthetic_shard_rows")
+        with col2:
+            num_shards = st.number_input("Shards", min_value=1, max_value=1024, value=os.cpu_count() or 1, key="synthetic_shard_count")
+        st.caption(f"Seed {seed}: the concatenated part files equal a single-process run with this seed, whatever the number of shards.")
+
+        if st.button("Write Part Files", key="synthetic_shard_button"):
+            out_dir = os.path.join(EXPORT_DIR, f"{label}_seed{seed}_{time.strftime('%Y%m%d_%H%M%S')}".replace(" ", "_"))
+            os.makedirs(out_dir, exist_ok=True)
+            model_path = save_model(os.path.join(out_dir, "model.pkl"), synthesizer, reducer)
+            with st.spinner(f"Writing {total_rows:,} rows in {num_shards} shards..."):
+                try:
+                    with resource_manager.get_manager().job("sharded_export") as ticket:
+                        start = time.perf_counter()
+                        results = write_shards(model_path, int(total_rows), seed, int(num_shards), out_dir, processes=ticket['threads'])
+                        elapsed = time.perf_counter() - start
+                except Exception as e:
+                    st.error(f"❌ Error writing part files: {str(e)}")
+                    return
+            resource_manager.report_wait(ticket)
+            st.success(f"✅ {total_rows:,} rows written to `{os.path.abspath(out_dir)}` in {elapsed:.1f} s ({total_rows / elapsed:,.0f} rows/s)")
+            st.dataframe(pd.DataFrame(results), use_container_width=True, hide_index=True)
+            st.code(f"python sharded_sampling.py {model_path} --rows {int(total_rows)} --seed {seed} "
+                    f"--shard <i> --num-shards {int(num_shards)} --out {out_dir}", language="bash")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write one shard of a seeded synthetic dataset as a Parquet part file")
+    parser.add_argument("model", help="Model file written by save_model()")
+    parser.add_argument("--rows", type=int, required=True, help="Rows of the whole run (all shards)")
+    parser.add_argument("--seed", type=int, required=True)
+    parser.add_argument("--shard", type=int, required=True, help="Index of this shard, from 0")
+    parser.add_argument("--num-shards", type=int, required=True)
+    parser.add_argument("--out", required=True, help="Directory of the part files")
+    parser.add_argument("--block-rows", type=int, default=DEFAULT_BLOCK_ROWS)
+    args = parser.parse_args(argv)
+
+    result = _write_shard_from_file(args.model, args.rows, args.seed, args.shard, args.num_shards, args.out, args.block_rows)
+    print(f"shard {result['shard']}: {result['rows']} rows -> {result['path']}")
+
+
+if __name__ == "__main__":
+    main()
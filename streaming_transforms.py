@@ -0,0 +1,409 @@
+''' Scalers and imputers fitted chunk by chunk, with a state that can be saved and reused.
+
+Each transformer accumulates mergeable per-column statistics in partial_fit():
+
+- count, mean and variance with Welford's update (Chan's formula to merge chunks)
+- running min and max
+- median from a bottom-k sample: every value draws a random key and the `k` values
+  with the smallest keys are kept, a uniform sample of everything seen so far (exact
+  while a column has at most `k` values)
+- mode from Misra-Gries heavy-hitter counters (exact while a column has at most
+  `k` distinct values)
+
+so a file larger than memory is fitted in one pass over its chunks and transformed
+in a second (fit_file / transform_file). to_dict() / transform_from_dict() turn a
+fitted transformer into JSON and back, so the same parameters apply to a later
+upload or to synthetic output without refitting.
+'''
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import performance
+
+SAMPLE_SIZE = 100_000  # bottom-k sample per column for the median
+HEAVY_HITTERS = 1_000  # Misra-Gries counters per column for the mode
+DEFAULT_CHUNK_ROWS = 250_000
+# The only directory the file panel reads from and writes to
+TRANSFORM_DIR = os.environ.get("HITL_EDA_TRANSFORM_DIR", "transform_files")
+FILE_TYPES = (".csv", ".parquet")
+
+
+class ColumnStats:
+    """Streaming statistics of one column; `sample` and `heavy_hitters` switch the sketches on."""
+
+    def __init__(self, sample=False, heavy_hitters=False, seed=0):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sample_keys = np.empty(0) if sample else None
+        self.sample_values = np.empty(0) if sample else None
+        self.counters = pd.Series(dtype="int64") if heavy_hitters else None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add the non-missing values of one chunk."""
+        values = pd.Series(values).dropna()
+        if self.counters is not None:
+            self._update_counters(values.value_counts())
+        if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values) or values.empty:
+            return
+        values = values.to_numpy(dtype=float)
+        n, mean = len(values), float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        delta = mean - self.mean
+        total = self.count + n
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if self.sample_keys is not None:
+            keys = np.concatenate([self.sample_keys, self._rng.random(n)])
+            kept = np.argpartition(keys, SAMPLE_SIZE)[:SAMPLE_SIZE] if len(keys) > SAMPLE_SIZE else slice(None)
+            self.sample_keys = keys[kept]
+            self.sample_values = np.concatenate([self.sample_values, values])[kept]
+
+    def _update_counters(self, counts):
+        counters = self.counters.add(counts, fill_value=0) if len(self.counters) else counts
+        if len(counters) > HEAVY_HITTERS:
+            # Misra-Gries: keep the k largest counters minus the (k+1)-th largest count. Counters
+            # may reach zero, so a column of unique values still has mode candidates
+            ranked = counters.nlargest(HEAVY_HITTERS + 1)
+            counters = ranked.iloc[:HEAVY_HITTERS] - ranked.iloc[HEAVY_HITTERS]
+        self.counters = counters.astype("int64")
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def median(self):
+        return float(np.median(self.sample_values)) if self.sample_values is not None and len(self.sample_values) else np.nan
+
+    @property
+    def mode(self):
+        if self.counters is None or self.counters.empty:
+            return np.nan
+        # Smallest of the most frequent values, like Series.mode().iloc[0]
+        candidates = self.counters.index[self.counters == self.counters.max()].tolist()
+        try:
+            return min(candidates)
+        except TypeError:
+            return candidates[0]
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class StreamingTransform:
+    """
+    Base of the column transformers: partial_fit() over chunks, then transform().
+
+    Subclasses set `kind`, the sketches they need and `_params()` / `_apply()`.
+    """
+
+    kind = None
+    needs_sample = False
+    needs_heavy_hitters = False
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.stats_ = {col: ColumnStats(self.needs_sample, self.needs_heavy_hitters) for col in self.columns}
+        self.params_ = None
+
+    def partial_fit(self, chunk):
+        for col in self.columns:
+            self.partial_fit_column(chunk, col)
+        return self
+
+    def partial_fit_column(self, chunk, col):
+        """Update the statistics of one column; columns are independent and can be fitted concurrently."""
+        self.stats_[col].update(chunk[col])
+        self.params_ = None
+
+    def fit(self, df):
+        return self.partial_fit(df)
+
+    @property
+    def params(self):
+        """Fitted per-column parameters, frozen by to_dict()."""
+        if self.params_ is None:
+            self.params_ = {col: self._params(self.stats_[col]) for col in self.columns}
+        return self.params_
+
+    def transform(self, chunk):
+        result_df = chunk.copy(deep=False)
+        for col in self.columns:
+            result_df[col] = self.transform_column(chunk, col)
+        return result_df
+
+    def transform_column(self, chunk, col):
+        return self._apply(chunk[col], self.params[col])
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def to_dict(self):
+        return {'kind': self.kind, 'columns': self.columns, 'options': self._options(), 'params': self.params}
+
+    def _options(self):
+        return {}
+
+
+class StreamingStandardScaler(StreamingTransform):
+    """(x - mean) / std with the population std, like sklearn's StandardScaler; constant columns keep std 1."""
+
+    kind = "standard_scaler"
+
+    def _params(self, stats):
+        std = float(np.sqrt(stats.variance)) if stats.count else 1.0
+        return {'mean': stats.mean, 'std': std if std > 0 else 1.0}
+
+    def _apply(self, values, params):
+        return (values.astype(float) - params['mean']) / params['std']
+
+
+class StreamingMinMaxScaler(StreamingTransform):
+    """Scale to `feature_range` using the running min and max."""
+
+    kind = "min_max_scaler"
+
+    def __init__(self, columns, feature_range=(0, 1)):
+        super().__init__(columns)
+        self.feature_range = tuple(feature_range)
+
+    def _options(self):
+        return {'feature_range': list(self.feature_range)}
+
+    def _params(self, stats):
+        low, high = (stats.min, stats.max) if stats.count else (0.0, 1.0)
+        return {'min': low, 'max': high}
+
+    def _apply(self, values, params):
+        span = (params['max'] - params['min']) or 1.0
+        low, high = self.feature_range
+        return (values.astype(float) - params['min']) / span * (high - low) + low
+
+
+class StreamingImputer(StreamingTransform):
+    """Fill missing values with the streaming mean, approximate median or approximate mode."""
+
+    kind = "imputer"
+
+    def __init__(self, columns, method="mean"):
+        if method not in ("mean", "median", "mode"):
+            raise ValueError(f"Unknown fill method '{method}'")
+        self.method = method
+        self.needs_sample = method == "median"
+        self.needs_heavy_hitters = method == "mode"
+        super().__init__(columns)
+
+    def _options(self):
+        return {'method': self.method}
+
+    def _params(self, stats):
+        if self.method == "mean":
+            value = stats.mean if stats.count else np.nan
+        else:
+            value = getattr(stats, self.method)
+        return {'value': _json_value(value)}
+
+    def _apply(self, values, params):
+        return values if params['value'] is None else values.fillna(params['value'])
+
+
+TRANSFORMS = {cls.kind: cls for cls in (StreamingStandardScaler, StreamingMinMaxScaler, StreamingImputer)}
+
+
+def transform_from_dict(state):
+    """Rebuild a fitted transformer from to_dict(); it transforms without any statistics."""
+    transform = TRANSFORMS[state['kind']](state['columns'], **state.get('options', {}))
+    transform.params_ = state['params']
+    return transform
+
+
+def pipeline_to_json(transforms):
+    return json.dumps({'steps': [transform.to_dict() for transform in transforms]}, indent=2)
+
+
+def pipeline_from_json(content):
+    return [transform_from_dict(step) for step in json.loads(content)['steps']]
+
+
+def apply_pipeline(df, transforms):
+    for transform in transforms:
+        df = transform.transform(df)
+    return df
+
+
+def iter_file_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield DataFrame chunks of a CSV or Parquet file without reading it whole."""
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+@performance.timed()
+def fit_file(transform, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Fit a transformer in one pass over the chunks of a file."""
+    for chunk in iter_file_chunks(path, chunk_rows):
+        transform.partial_fit(chunk)
+    return transform
+
+
+@performance.timed()
+def transform_file(transforms, path, out_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Apply fitted transformers to a file chunk by chunk and write the result.
+
+    The output is Parquet if `out_path` ends with .parquet and CSV otherwise; memory
+    use is bounded by one chunk.
+
+    Returns:
+        int: Number of rows written
+    """
+    writer, rows = None, 0
+    partial = out_path + ".partial"
+    try:
+        for chunk in iter_file_chunks(path, chunk_rows):
+            chunk = apply_pipeline(chunk, transforms)
+            if out_path.lower().endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(partial, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            else:
+                chunk.to_csv(partial, mode="a" if rows else "w", header=not rows, index=False)
+            rows += len(chunk)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(partial, out_path)
+    return rows
+
+
+def resolve_in_directory(name, directory=TRANSFORM_DIR):
+    """
+    Resolve a file name inside `directory`.
+
+    Raises:
+        ValueError: If the name is empty, not a .csv/.parquet file or resolves outside `directory`
+            (absolute paths, '..', symlinks)
+    """
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if not name or os.path.dirname(path) != root or not path.lower().endswith(FILE_TYPES):
+        raise ValueError(f"'{name}' is not a .csv or .parquet file name in {root}")
+    return path
+
+
+def directory_files(directory=TRANSFORM_DIR):
+    """CSV and Parquet files directly inside `directory`, sorted by name."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(entry for entry in os.listdir(directory)
+                  if entry.lower().endswith(FILE_TYPES) and os.path.isfile(os.path.join(directory, entry)))
+
+
+def display_pipeline_controls(df):
+    """
+    Render the saved-parameters panel of the preprocessing page.
+
+    Lists the scalers and imputers fitted in this session, saves them as JSON, loads a
+    saved pipeline and applies it without refitting: the steps the working data does not
+    have yet to the working data, or every step chunk by chunk to a file in TRANSFORM_DIR.
+
+    Returns:
+        DataFrame or None: The transformed working data when 'Apply' was clicked
+    """
+    import streamlit as st
+
+    with st.expander("📐 Fitted Scaling & Fill Parameters", expanded=False):
+        saved = st.file_uploader("Load saved parameters", type=["json"], key="fitted_transforms_upload")
+        try:
+            transforms = (pipeline_from_json(saved.getvalue()) if saved is not None
+                          else [transform_from_dict(step) for step in st.session_state.get('fitted_transforms', [])])
+        except Exception as e:
+            st.error(f"❌ Could not read the parameters: {str(e)}")
+            return None
+        if not transforms:
+            st.caption("Scalers and fills applied above are listed here and can be saved for later uploads.")
+            return None
+
+        # Steps already in the working data: the session's own fills and scalers as they are
+        # fitted, a loaded file once applied; cleared when the working data is reset
+        if saved is not None:
+            source = hashlib.sha1(saved.getvalue()).hexdigest()
+            applied = set(range(len(transforms))) if st.session_state.get('applied_transforms_file') == source else set()
+        else:
+            applied = set(st.session_state.get('applied_transforms', ()))
+        pending = [transform for i, transform in enumerate(transforms) if i not in applied]
+
+        st.dataframe(pd.DataFrame([
+            {'step': i + 1, 'transform': transform.kind, 'columns': ", ".join(map(str, transform.columns)),
+             'options': json.dumps(transform._options()), 'applied': i in applied}
+            for i, transform in enumerate(transforms)
+        ]), use_container_width=True, hide_index=True)
+        st.download_button("📥 Save Parameters (JSON)", data=pipeline_to_json(transforms), file_name="preprocessing_parameters.json",
+                           mime="application/json", key="fitted_transforms_download", on_click="ignore")
+
+        missing = sorted({str(col) for transform in transforms for col in transform.columns if col not in df.columns})
+        if missing:
+            st.warning(f"⚠️ Columns missing from the working dataset: {', '.join(missing)}")
+        elif not pending:
+            st.caption("Every step is already applied to the working dataset; reset it or upload new data to replay them.")
+        elif st.button(f"Apply {len(pending)} Pending Step(s) to Working Dataset", key="fitted_transforms_apply",
+                       help="Replays the steps not yet applied with their saved parameters, e.g. after resetting the dataset or on a new upload"):
+            if saved is not None:
+                st.session_state.applied_transforms_file = source
+            else:
+                st.session_state.applied_transforms = set(range(len(transforms)))
+            return apply_pipeline(df, pending)
+
+        st.markdown(f"**Transform a file in `{TRANSFORM_DIR}`** (chunk by chunk, for files larger than memory)")
+        files = directory_files()
+        if not files:
+            st.caption(f"Place CSV or Parquet files in {os.path.abspath(TRANSFORM_DIR)} (HITL_EDA_TRANSFORM_DIR) to transform them here.")
+            return None
+        col1, col2 = st.columns(2)
+        with col1:
+            source = st.selectbox("CSV/Parquet file", files, key="fitted_transforms_source")
+        with col2:
+            target = st.text_input("Output file name (.csv or .parquet)", key="fitted_transforms_target").strip()
+        if st.button("Transform File", key="fitted_transforms_file_button", disabled=not target):
+            try:
+                source_path, target_path = resolve_in_directory(source), resolve_in_directory(target)
+                if target_path == source_path:
+                    raise ValueError("the output file must differ from the input file")
+                with st.spinner(f"Transforming {source}..."):
+                    rows = transform_file(transforms, source_path, target_path)
+                st.success(f"✅ {rows:,} rows written to {target_path}")
+            except Exception as e:
+                st.error(f"❌ Error transforming the file: {str(e)}")
+    return None
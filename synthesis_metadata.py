@@ -0,0 +1,179 @@
+''' Cached, sample-based SDV metadata detection with an editable schema.
+
+detect_from_dataframe() walks every value of every column, which used to happen on
+each generation. Detection now runs once per dataset version on a row sample, the
+full table is only used for the cheap distinct counts and the primary key check,
+and the result is kept as a plain dict so it can be edited in the UI, saved as JSON
+and loaded again for the next extract with the same layout.
+'''
+
+import copy
+import json
+
+import pandas as pd
+import streamlit as st
+from sdv.metadata import SingleTableMetadata
+
+import performance
+
+DETECTION_SAMPLE_ROWS = 10_000
+SDTYPES = ["numerical", "categorical", "boolean", "datetime", "id", "unknown"]
+
+# Categorical columns above either limit are flagged; CTGAN one-hot encodes every category
+HIGH_CARDINALITY_RATIO = 0.5
+HIGH_CARDINALITY_VALUES = 500
+
+
+@performance.timed()
+def detect_metadata(df, sample_rows=DETECTION_SAMPLE_ROWS, seed=0):
+    """
+    Detect SDV metadata from a sample of `df` and correct the guesses a sample gets wrong.
+
+    Args:
+        df: Dataset to describe
+        sample_rows: Number of rows the sdtypes are inferred from
+        seed: Seed of the row sample
+
+    Returns:
+        dict: 'metadata' (SingleTableMetadata.to_dict()), 'distinct' (column -> number of
+            distinct values in the full table), 'notes' (column -> why an sdtype was changed
+            or should be reviewed) and 'rows'
+    """
+    sample = df.sample(n=sample_rows, random_state=seed) if len(df) > sample_rows else df
+    detected = SingleTableMetadata()
+    detected.detect_from_dataframe(sample)
+    metadata = detected.to_dict()
+
+    distinct = df.nunique().to_dict()
+    notes = {}
+    primary_key = metadata.get('primary_key')
+    if primary_key is not None and not df[primary_key].is_unique:
+        # Unique within the sample only
+        metadata.pop('primary_key')
+        metadata['columns'][primary_key] = {'sdtype': 'categorical'}
+        notes[primary_key] = "repeats in the full table, not used as primary key"
+
+    for col, column_metadata in metadata['columns'].items():
+        if column_metadata['sdtype'] != 'categorical':
+            continue
+        if distinct[col] == len(df) and df[col].notna().all():
+            metadata['columns'][col] = {'sdtype': 'id'}
+            notes[col] = f"categorical → id, every one of the {distinct[col]} values is unique"
+        elif distinct[col] > HIGH_CARDINALITY_VALUES or distinct[col] > HIGH_CARDINALITY_RATIO * len(df):
+            notes[col] = f"high cardinality ({distinct[col]} values), consider id or unknown"
+
+    return {'metadata': metadata, 'distinct': distinct, 'notes': notes, 'rows': len(df)}
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_detection(_df, version):
+    return detect_metadata(_df)
+
+
+def cached_detection(df, version=None):
+    """Detect the metadata once per dataset version (always detects when no version is given)."""
+    if version is None:
+        return detect_metadata(df)
+    return copy.deepcopy(_cached_detection(df, version))
+
+
+def set_sdtypes(metadata, sdtypes):
+    """
+    Return a copy of `metadata` with the sdtype of the columns in `sdtypes` replaced.
+
+    Sdtype specific settings (computer representation, datetime format, ...) of a
+    changed column are dropped, and the primary key is cleared if it is no longer an id.
+    """
+    metadata = copy.deepcopy(metadata)
+    for col, sdtype in sdtypes.items():
+        if metadata['columns'][col]['sdtype'] != sdtype:
+            metadata['columns'][col] = {'sdtype': sdtype}
+    primary_key = metadata.get('primary_key')
+    if primary_key is not None and metadata['columns'][primary_key]['sdtype'] != 'id':
+        metadata.pop('primary_key')
+    return metadata
+
+
+def load_metadata_json(content, columns):
+    """
+    Parse a saved schema and check it describes exactly `columns`.
+
+    Raises:
+        ValueError: If the schema is not valid SDV metadata or its columns differ
+    """
+    metadata = json.loads(content)
+    SingleTableMetadata.load_from_dict(metadata).validate()
+    saved = set(metadata.get('columns', {}))
+    if saved != set(columns):
+        missing = sorted(set(columns) - saved)
+        extra = sorted(saved - set(columns))
+        raise ValueError(f"schema does not match the dataset (missing: {missing}, unknown: {extra})")
+    return metadata
+
+
+def edit_metadata(df, version=None):
+    """
+    Render the detected schema as an editable table and return the metadata to train with.
+
+    Returns:
+        dict: SingleTableMetadata dict, load it with SingleTableMetadata.load_from_dict()
+    """
+    with st.spinner("Detecting column types..."):
+        detection = cached_detection(df, version)
+    metadata = detection['metadata']
+    notes = detection['notes']
+
+    with st.expander("🧾 Schema (SDV metadata)", expanded=bool(notes)):
+        saved_schema = st.file_uploader("Load a saved schema", type=["json"], key="synthetic_metadata_upload")
+        if saved_schema is not None:
+            try:
+                metadata = load_metadata_json(saved_schema.getvalue(), df.columns)
+                notes = {}
+                st.success("✅ Saved schema loaded")
+            except Exception as e:
+                st.error(f"❌ Could not use the saved schema: {str(e)}")
+
+        schema = pd.DataFrame({
+            'column': list(metadata['columns']),
+            'sdtype': [column_metadata['sdtype'] for column_metadata in metadata['columns'].values()],
+            'distinct values': [detection['distinct'].get(col) for col in metadata['columns']],
+            'note': [notes.get(col, "") for col in metadata['columns']],
+        })
+        edited = st.data_editor(
+            schema,
+            column_config={
+                'sdtype': st.column_config.SelectboxColumn("sdtype", options=SDTYPES, required=True),
+            },
+            disabled=['column', 'distinct values', 'note'],
+            hide_index=True,
+            use_container_width=True,
+            # A new dataset version or schema file starts from fresh detection results
+            key=f"synthetic_metadata_editor_{version}_{saved_schema.file_id if saved_schema else ''}"
+        )
+        metadata = set_sdtypes(metadata, dict(zip(edited['column'], edited['sdtype'])))
+
+        id_columns = [col for col, column_metadata in metadata['columns'].items() if column_metadata['sdtype'] == 'id']
+        primary_key = st.selectbox(
+            "Primary Key",
+            [None] + id_columns,
+            index=([None] + id_columns).index(metadata.get('primary_key')) if metadata.get('primary_key') in id_columns else 0,
+            format_func=lambda col: "None" if col is None else col,
+            key=f"synthetic_primary_key_{version}"
+        )
+        if primary_key is None:
+            metadata.pop('primary_key', None)
+        else:
+            metadata['primary_key'] = primary_key
+
+        st.download_button(
+            label="📥 Save Schema (JSON)",
+            data=json.dumps(metadata, indent=2),
+            file_name="synthetic_metadata.json",
+            mime="application/json",
+            key="synthetic_metadata_download",
+            on_click="ignore"
+        )
+        if detection['rows'] > DETECTION_SAMPLE_ROWS:
+            st.caption(f"Types detected from {DETECTION_SAMPLE_ROWS:,} of {detection['rows']:,} rows.")
+
+    return metadata
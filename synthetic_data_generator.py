@@ -1,7 +1,24 @@
 import streamlit as st
 import pandas as pd
 import io
-import base64
+import itertools
+import time
+import data_export
+import associations
+import cardinality_reducer
+import conditional_sampling
+import model_registry
+import ml_utility
+import model_selection
+import pairwise_fidelity
+import relational_synthesis
+import sequential_synthesis
+import sharded_sampling
+import synthesis_metadata
+import performance
+import privacy_metrics
+import profiling
+import resource_manager
 from sdv.single_table import GaussianCopulaSynthesizer, CTGANSynthesizer
 from sdv.metadata import SingleTableMetadata
 import matplotlib.pyplot as plt
@@ -11,9 +28,14 @@ import numpy as np
 import json
 from datetime import datetime
 
-def calculate_metrics(original_df, synthetic_df):
+@performance.timed()
+def calculate_metrics(original_df, synthetic_df, privacy=True, utility=None, version=None):
     """
     Calculate various metrics to compare original and synthetic datasets.
+
+    privacy=False skips the disclosure metrics, e.g. when only ranking models;
+    utility holds the TSTR settings of ml_utility.with_holdout(), if any;
+    version is the dataset version the association matrix of original_df is cached under.
     """
     metrics = {}
     
@@ -60,27 +82,42 @@ def calculate_metrics(original_df, synthetic_df):
         orig_counts = original_df[col].value_counts(normalize=True)
         synth_counts = synthetic_df[col].value_counts(normalize=True)
         
-        # Calculate category distribution difference
-        common_categories = set(orig_counts.index) & set(synth_counts.index)
-        if common_categories:
-            diff = sum(abs(orig_counts.get(cat, 0) - synth_counts.get(cat, 0)) for cat in common_categories)
+        # Calculate category distribution difference (index set operations, no Python loop over levels)
+        common_categories = orig_counts.index.intersection(synth_counts.index)
+        if len(common_categories):
+            diff = (orig_counts[common_categories] - synth_counts[common_categories]).abs().sum()
             metrics['categorical_metrics'][col] = {
                 'distribution_difference': diff,
-                'category_coverage': len(common_categories) / len(set(orig_counts.index) | set(synth_counts.index))
+                'category_coverage': len(common_categories) / len(orig_counts.index.union(synth_counts.index))
             }
     
-    # Correlation structure preservation
-    if len(numerical_cols) > 1:
-        orig_corr = original_df[numerical_cols].corr()
-        synth_corr = synthetic_df[numerical_cols].corr()
-        corr_diff = np.mean(np.abs(orig_corr - synth_corr))
+    # Correlation structure preservation, over the mixed-type association matrix of all shared columns
+    shared = [col for col in original_df.columns if col in synthetic_df.columns]
+    if len(shared) > 1:
+        orig_corr = associations.cached_association_matrix(original_df, version)
+        synth_corr = associations.association_matrix(synthetic_df[shared])
+        corr_diff = associations.matrix_difference(orig_corr, synth_corr)
         metrics['correlation_preservation'] = {
             'mean_correlation_difference': corr_diff,
-            'correlation_preserved': corr_diff < 0.1
+            'correlation_preserved': corr_diff < 0.1,
+            'original_matrix': orig_corr.loc[shared, shared],
+            'synthetic_matrix': synth_corr
         }
+
+    # Two-way fidelity: joint distribution of (a bounded sample of) all column pairs
+    if len(shared) > 1 and len(original_df) and len(synthetic_df):
+        metrics['pairwise_fidelity'] = pairwise_fidelity.pairwise_fidelity(original_df, synthetic_df)
+
+    # Disclosure risk: distance to the closest real record and exact copies
+    if privacy and len(original_df) and len(synthetic_df) and len(original_df.columns.intersection(synthetic_df.columns)):
+        metrics['privacy'] = privacy_metrics.privacy_metrics(original_df, synthetic_df)
+
+    # Train synthetic, test real
+    ml_utility.add_to_metrics(metrics, original_df, synthetic_df, utility)
     
     return metrics
 
+@performance.timed()
 def generate_report(metrics, original_df, synthetic_df):
     """
     Generate a comprehensive report comparing original and synthetic datasets.
@@ -119,6 +156,27 @@ def generate_report(metrics, original_df, synthetic_df):
         report.append(f"- Mean Correlation Difference: {metrics['correlation_preservation']['mean_correlation_difference']:.4f}")
         report.append(f"- Correlation Structure Preserved: {'Yes' if metrics['correlation_preservation']['correlation_preserved'] else 'No'}\n")
     
+    # Pairwise Fidelity
+    if 'pairwise_fidelity' in metrics:
+        report.extend(pairwise_fidelity.report_lines(metrics['pairwise_fidelity']))
+
+    # Privacy
+    if 'privacy' in metrics:
+        privacy = metrics['privacy']
+        report.append("## Privacy")
+        report.append(f"- Exact Copies of Real Rows: {privacy['exact_matches']} ({privacy['exact_match_share']*100:.2f}%)")
+        report.append(f"- Distance to Closest Record (median / 5th percentile / min): "
+                      f"{privacy['dcr']['median']:.4f} / {privacy['dcr']['p5']:.4f} / {privacy['dcr']['min']:.4f}")
+        report.append(f"- Real-to-Real Baseline Distance (median / 5th percentile): "
+                      f"{privacy['baseline_dcr']['median']:.4f} / {privacy['baseline_dcr']['p5']:.4f}")
+        report.append(f"- Rows Closer to a Real Record than the Baseline 5th Percentile: {privacy['closer_than_baseline_share']*100:.2f}%")
+        report.append(f"- Nearest-Neighbour Distance Ratio (median / 5th percentile): "
+                      f"{privacy['nndr']['median']:.4f} / {privacy['nndr']['p5']:.4f}\n")
+
+    # ML Utility
+    if 'ml_utility' in metrics:
+        report.extend(ml_utility.report_lines(metrics['ml_utility']))
+
     # Overall Assessment
     report.append("## Overall Assessment")
     numerical_similarity = np.mean([m['distribution_similarity'] == 'Similar' for m in metrics['numerical_metrics'].values()]) * 100
@@ -130,19 +188,353 @@ def generate_report(metrics, original_df, synthetic_df):
     if 'correlation_preservation' in metrics:
         correlation_score = (1 - metrics['correlation_preservation']['mean_correlation_difference']) * 100
         report.append(f"- Correlation Structure Score: {correlation_score:.2f}%")
+
+    if 'pairwise_fidelity' in metrics:
+        report.append(f"- Pairwise Fidelity Score: {(1 - metrics['pairwise_fidelity']['mean_tvd']) * 100:.2f}%")
     
     overall_score = (numerical_similarity + categorical_similarity) / 2
     report.append(f"\nOverall Synthetic Data Quality Score: {overall_score:.2f}%")
     
     return "\n".join(report)
 
-def generate_synthetic_data(uploaded_file, df=None):
+def display_synthesis_results(sdg_df, synthetic_data, report, metrics=None):
+    """
+    Render the preview, statistics, charts, quality report and downloads of a synthesis run.
+
+    The association heatmaps reuse the matrices of metrics['correlation_preservation'].
+    """
+    st.success("✅ Synthetic data generated successfully!")
+
+    # Show synthetic data preview
+    st.subheader("🔍 Synthetic Data Preview")
+    st.dataframe(synthetic_data.head())
+
+    # Tabs for analysis
+    st.subheader("📊 Data Analysis")
+    tab1, tab2, tab3 = st.tabs(["Statistical Summary", "Visualizations", "Quality Report"])
+
+    with tab1:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("Original Data Statistics")
+            st.dataframe(sdg_df.describe())
+        with col2:
+            st.write("Synthetic Data Statistics")
+            st.dataframe(synthetic_data.describe())
+
+    with tab2:
+        numeric_cols = sdg_df.select_dtypes(include=['number']).columns.tolist()
+        if numeric_cols:
+            selected_col = st.selectbox(
+                "Select column for distribution comparison", 
+                numeric_cols,
+                key="synthetic_distribution_select"
+            )
+
+            with performance.track("render_figure"):
+                fig, ax = plt.subplots(1, 2, figsize=(12, 4))
+                sns.histplot(sdg_df[selected_col], ax=ax[0], kde=True)
+                ax[0].set_title(f"Original: {selected_col}")
+
+                sns.histplot(synthetic_data[selected_col], ax=ax[1], kde=True)
+                ax[1].set_title(f"Synthetic: {selected_col}")
+
+                st.pyplot(fig)
+
+        else:
+            st.warning("No numerical columns available for visualization.")
+
+        # Pearson for numeric pairs, Cramér's V and correlation ratio for pairs with a categorical column
+        preservation = (metrics or {}).get('correlation_preservation')
+        if preservation is not None:
+            st.subheader("Association Structure Comparison")
+            with performance.track("render_figure"):
+                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
+                sns.heatmap(preservation['original_matrix'], ax=ax1, cmap='coolwarm', vmin=-1, vmax=1)
+                ax1.set_title("Original Data Associations")
+                sns.heatmap(preservation['synthetic_matrix'], ax=ax2, cmap='coolwarm', vmin=-1, vmax=1)
+                ax2.set_title("Synthetic Data Associations")
+                st.pyplot(fig)
+
+    with tab3:
+        st.markdown(report)
+
+        # Download report
+        st.download_button(
+            label="📥 Download Quality Report",
+            data=report,
+            file_name="synthetic_data_report.md",
+            mime="text/markdown",
+            key="synthetic_report_download",
+            on_click="ignore"
+        )
+
+    # Download synthetic data (serialized only when clicked)
+    data_export.download_dataframe_button(
+        synthetic_data,
+        file_stem="synthetic_data",
+        label="📥 Download Synthetic Data",
+        key="synthetic_data_download"
+    )
+
+def prepare_training_data(sdg_df, metadata_dict, reducer=None):
+    """
+    Apply the high-cardinality reduction between the DataFrame and synthesizer.fit().
+
+    Returns:
+        tuple: (training DataFrame, SDV metadata dict describing it)
+    """
+    if reducer is None:
+        return sdg_df, metadata_dict
+    return reducer.transform(sdg_df), reducer.transform_metadata(metadata_dict)
+
+def restore_sampled_data(synthetic_data, reducer=None, seed=None):
+    """Map reduced columns of sampled rows back to the original labels."""
+    if reducer is None:
+        return synthetic_data
+    return reducer.inverse_transform(synthetic_data, seed=seed)
+
+def sample_rows(synthesizer, num_samples, reducer=None, fixed=None, constraints=None, seed=0):
+    """
+    Sample from a fitted synthesizer, honoring fixed values and constraints.
+
+    The same seed reproduces the same rows; unconditional rows also match the
+    sharded Parquet export of the same seed.
+
+    Returns:
+        tuple: (synthetic_data, sampling statistics or None for unconditional sampling)
+    """
+    if not fixed and not constraints:
+        with performance.track("synthesizer.sample"):
+            return sharded_sampling.sample_seeded(synthesizer, num_samples, seed, reducer), None
+
+    batches = itertools.count()
+    reduced_columns = reducer.columns_ if reducer is not None else {}
+    with sharded_sampling.seeded(synthesizer, seed):
+        return conditional_sampling.sample_conditional(
+            synthesizer,
+            num_samples,
+            fixed=fixed,
+            constraints=constraints,
+            postprocess=lambda batch: restore_sampled_data(batch, reducer, sharded_sampling.block_seed(seed, next(batches))),
+            conditionable=[col for col in fixed if col not in reduced_columns]
+        )
+
+def display_model_tools(fitted, sdg_df, seed):
+    """
+    Render the sharded Parquet export and the registry form of a fitted model.
+
+    Args:
+        fitted: dict with the synthesizer, reducer, label, training metadata, fit
+            duration and quality summary of the model
+    """
+    sharded_sampling.display_sharded_export(fitted['synthesizer'], fitted['reducer'], seed, fitted['label'])
+    model_registry.display_register(
+        fitted['synthesizer'], fitted['label'], fitted['metadata'], sdg_df, fitted['reducer'],
+        fit_seconds=fitted['fit_seconds'], quality=fitted['quality']
+    )
+
+def generate_from_registry(sdg_df, version=None):
+    """
+    Sample from a model of the registry, without training.
+
+    Returns:
+        tuple: (synthetic_data, success, error_message)
+    """
+    models = model_registry.list_models()
+    if models.empty:
+        message = f"No registered model yet. Train one and save it with 'Save to Model Registry' (stored in `{model_registry.REGISTRY_DIR}`)."
+        st.info(message)
+        return None, False, message
+
+    st.dataframe(models.drop(columns=['fingerprint']).round(3), use_container_width=True, hide_index=True)
+    choice = st.selectbox(
+        "Registered Model",
+        list(models[['name', 'version']].itertuples(index=False, name=None)),
+        format_func=lambda entry: f"{entry[0]} v{entry[1]}",
+        key="synthetic_registry_select"
+    )
+    try:
+        with st.spinner(f"Loading {choice[0]} v{choice[1]}..."):
+            synthesizer, reducer, manifest = model_registry.load(*choice)
+    except Exception as e:
+        error_msg = f"Error loading the model: {str(e)}"
+        st.error(f"❌ {error_msg}")
+        return None, False, error_msg
+
+    if set(manifest['columns']) != set(sdg_df.columns):
+        error_msg = "The model was trained on different columns than the current dataset."
+        st.error(f"❌ {error_msg}")
+        return None, False, error_msg
+    if manifest['fingerprint'] != model_registry.cached_fingerprint(sdg_df, version):
+        st.info(f"ℹ️ {choice[0]} v{choice[1]} was trained on another extract with the same columns; the quality report compares against the current one.")
+
+    fixed, constraints = conditional_sampling.conditions_editor(sdg_df)
+    col1, col2 = st.columns(2)
+    with col1:
+        num_samples = st.slider(
+            "Number of Synthetic Data Rows",
+            min_value=10,
+            max_value=500,
+            value=min(200, len(sdg_df)),
+            step=10,
+            key="synthetic_samples_slider"
+        )
+    with col2:
+        seed = int(st.number_input("Random Seed", min_value=0, value=0, step=1, key="synthetic_seed_input"))
+    st.caption("ML utility (train synthetic, test real) is measured for models trained here: a registered model "
+               "may have seen any row of this dataset, so no unseen real rows are left to test on.")
+
+    sharded_sampling.display_sharded_export(synthesizer, reducer, seed, choice[0])
+
+    if st.button(f"Generate with {choice[0]} v{choice[1]}", key="generate_registry_button"):
+        with st.spinner("Generating synthetic dataset..."):
+            try:
+                synthetic_data, sampling_stats = sample_rows(synthesizer, num_samples, reducer, fixed, constraints, seed)
+                if synthetic_data.empty:
+                    raise ValueError("no generated row satisfied the conditions")
+                synthetic_data = synthetic_data[list(sdg_df.columns)]
+                metrics = calculate_metrics(sdg_df, synthetic_data, version=version)
+                report = generate_report(metrics, sdg_df, synthetic_data)
+            except Exception as e:
+                error_msg = f"Error generating synthetic data: {str(e)}"
+                st.error(f"❌ {error_msg}")
+                return None, False, error_msg
+
+        if sampling_stats is not None:
+            conditional_sampling.display_sampling_stats(sampling_stats)
+        display_synthesis_results(sdg_df, synthetic_data, report, metrics)
+        return synthetic_data, True, None
+
+    return None, False, f"Please click 'Generate with {choice[0]} v{choice[1]}' to start the process."
+
+def compare_and_generate(sdg_df, num_samples, epochs, metadata_dict, version=None, reducer=None, fixed=None, constraints=None, seed=0, utility=None):
+    """
+    Train several candidate synthesizers in parallel, rank them on a held-out split
+    and generate the synthetic dataset with the best one.
+
+    The leaderboard and the fitted best model are kept in the session, so sampling
+    again does not retrain anything until the dataset, its schema or the
+    high-cardinality settings change. Candidates are trained and ranked on the
+    reduced columns; only the generated rows are mapped back to real labels.
+
+    Returns:
+        tuple: (synthetic_data, success, error_message)
+    """
+    grid = model_selection.candidate_grid(epochs)
+    selected = st.multiselect(
+        "Candidate Models",
+        list(grid),
+        default=list(grid)[:model_selection.DEFAULT_CANDIDATES],
+        key="synthetic_candidates_select"
+    )
+    # A comparison is one job of the resource manager, its cores are the job's threads
+    job_threads = resource_manager.get_manager().threads
+    cpu_budget = 1
+    if job_threads > 1:
+        cpu_budget = st.slider(
+            "CPU Budget (cores)",
+            min_value=1,
+            max_value=job_threads,
+            value=job_threads,
+            key="synthetic_cpu_budget_slider",
+            help="Cores shared by the candidates trained in parallel, up to the threads per job set in the sidebar"
+        )
+
+    comparison = st.session_state.get('synthesis_comparison')
+    reducer_config = reducer.config if reducer is not None else None
+    if comparison is not None and (comparison['version'] != version or comparison['metadata'] != metadata_dict
+                                   or comparison['reducer_config'] != reducer_config):
+        comparison = None
+
+    if st.button("Compare Models", key="compare_models_button", disabled=not selected):
+        with st.spinner(f"Training {len(selected)} candidate models on up to {cpu_budget} cores..."):
+            try:
+                progress_bar = st.progress(0.0)
+                with profiling.profile_synthesis(), resource_manager.get_manager().job("compare_models") as ticket:
+                    train_df, train_metadata = prepare_training_data(sdg_df, metadata_dict, reducer)
+                    leaderboard, fitted = model_selection.compare_models(
+                        train_df,
+                        {name: grid[name] for name in selected},
+                        train_metadata,
+                        scorer=lambda holdout, sample: model_selection.quality_score(calculate_metrics(holdout, sample, privacy=False)),
+                        cpu_budget=min(cpu_budget, ticket['threads']),
+                        on_progress=lambda done, total, name: progress_bar.progress(done / total, text=f"{name} finished ({done}/{total})")
+                    )
+            except Exception as e:
+                error_msg = f"Error comparing models: {str(e)}"
+                st.error(f"❌ {error_msg}")
+                return None, False, error_msg
+
+        resource_manager.report_wait(ticket)
+        trained = leaderboard.loc[leaderboard['status'] == "ok", 'model']
+        best_model = trained.iloc[0] if len(trained) else None
+        comparison = {
+            'version': version,
+            'metadata': metadata_dict,
+            'reducer_config': reducer_config,
+            'reducer': reducer,
+            'train_metadata': train_metadata,
+            'leaderboard': leaderboard,
+            'best_model': best_model,
+            'synthesizer': fitted.get(best_model),
+            # Rows compare_models() held out; the candidates were fitted without them
+            'holdout': model_selection.holdout_mask(len(sdg_df)),
+        }
+        st.session_state.synthesis_comparison = comparison
+
+    if comparison is None:
+        return None, False, "Please click 'Compare Models' to start the process."
+
+    st.subheader("🏆 Model Leaderboard")
+    st.caption("Quality is scored on a held-out 20% of the rows the candidates were not trained on.")
+    st.dataframe(comparison['leaderboard'].round(3), use_container_width=True, hide_index=True)
+
+    if comparison['best_model'] is None:
+        error_msg = "None of the candidate models could be trained."
+        st.error(f"❌ {error_msg}")
+        return None, False, error_msg
+
+    st.info(f"Best model: **{comparison['best_model']}**")
+    best = comparison['leaderboard'].iloc[0]
+    display_model_tools({
+        'synthesizer': comparison['synthesizer'],
+        'reducer': comparison['reducer'],
+        'label': comparison['best_model'],
+        'metadata': comparison['train_metadata'],
+        'fit_seconds': best['fit_seconds'],
+        'quality': {'quality_score': best['quality_score']},
+    }, sdg_df, seed)
+    if st.button(f"Generate with {comparison['best_model']}", key="generate_best_button"):
+        with st.spinner("Generating synthetic dataset..."):
+            try:
+                synthetic_data, sampling_stats = sample_rows(comparison['synthesizer'], num_samples, comparison['reducer'], fixed, constraints, seed)
+                if synthetic_data.empty:
+                    raise ValueError("no generated row satisfied the conditions")
+                metrics = calculate_metrics(sdg_df, synthetic_data, utility=ml_utility.with_holdout(utility, comparison['holdout']),
+                                            version=version)
+                report = generate_report(metrics, sdg_df, synthetic_data)
+            except Exception as e:
+                error_msg = f"Error generating synthetic data: {str(e)}"
+                st.error(f"❌ {error_msg}")
+                return None, False, error_msg
+
+        if sampling_stats is not None:
+            conditional_sampling.display_sampling_stats(sampling_stats)
+        display_synthesis_results(sdg_df, synthetic_data, report, metrics)
+        return synthetic_data, True, None
+
+    return None, False, f"Please click 'Generate with {comparison['best_model']}' to start the process."
+
+def generate_synthetic_data(uploaded_file, df=None, version=None):
     """
     Generate synthetic data from an uploaded CSV file or existing DataFrame.
     
     Args:
         uploaded_file: The uploaded file object from Streamlit
         df: Optional existing DataFrame if file is already loaded
+        version: Optional key of the dataset version, a model comparison is kept
+            across reruns only while it matches
         
     Returns:
         tuple: (synthetic_data, success, error_message)
@@ -150,7 +542,7 @@ def generate_synthetic_data(uploaded_file, df=None):
     try:
         # Load DataFrame appropriately
         if df is not None:
-            sdg_df = df.copy()
+            sdg_df = df.copy(deep=False)  # Copy-on-Write view, the mapped columns are not duplicated
         else:
             content = uploaded_file.read()
             if not content:
@@ -164,12 +556,35 @@ def generate_synthetic_data(uploaded_file, df=None):
         st.subheader("📄 Original Data Preview")
         st.dataframe(sdg_df.head())
 
-        # Choose model from available options
-        model_option = st.selectbox(
-            "Select Model for Data Generation",
-            ("Gaussian Copula", "CTGAN"),
-            key="synthetic_model_select"
+        mode = st.radio(
+            "Mode",
+            ("Single model", "Compare models", "Registered model", "Time series", "Multi-table"),
+            horizontal=True,
+            key="synthetic_mode_select",
+            help="Compare models trains several synthesizers in parallel and keeps the best one; "
+                 "Registered model samples from a saved model without training; "
+                 "Time series keeps the order of the events of each entity; "
+                 "Multi-table generates the dataset with related tables, keeping their keys"
         )
+        if mode == "Registered model":
+            return generate_from_registry(sdg_df, version)
+        if mode == "Multi-table":
+            return relational_synthesis.display_relational_synthesis(sdg_df, version)
+
+        # Detected once per dataset version, reviewed and corrected by the user
+        metadata_dict = synthesis_metadata.edit_metadata(sdg_df, version)
+        if mode == "Time series":
+            return sequential_synthesis.display_sequential_synthesis(sdg_df, metadata_dict, version)
+        reducer = cardinality_reducer.reducer_settings(sdg_df, metadata_dict)
+        fixed, constraints = conditional_sampling.conditions_editor(sdg_df)
+
+        if mode == "Single model":
+            # Choose model from available options
+            model_option = st.selectbox(
+                "Select Model for Data Generation",
+                ("Gaussian Copula", "CTGAN"),
+                key="synthetic_model_select"
+            )
 
         col1, col2 = st.columns(2)
 
@@ -193,90 +608,76 @@ def generate_synthetic_data(uploaded_file, df=None):
                 key="synthetic_epochs_slider"
             )
 
+        seed = int(st.number_input(
+            "Random Seed",
+            min_value=0,
+            value=0,
+            step=1,
+            key="synthetic_seed_input",
+            help="The same seed reproduces the same synthetic rows from the same trained model"
+        ))
+        utility = ml_utility.utility_settings(sdg_df)
+
+        if mode == "Compare models":
+            return compare_and_generate(sdg_df, num_samples, epochs, metadata_dict, version, reducer, fixed, constraints, seed, utility)
+
+        fitted = st.session_state.get('synthesis_fitted')
+        export_shown = fitted is not None and fitted['version'] == version and fitted['label'] == model_option
+        if export_shown:
+            display_model_tools(fitted, sdg_df, seed)
+
         if st.button("Generate Synthetic Data", key="generate_synthetic_button"):
             with st.spinner("Training model and generating synthetic dataset..."):
                 try:
-                    # Initialize metadata
-                    metadata = SingleTableMetadata()
-                    metadata.detect_from_dataframe(sdg_df)
-
-                    # Initialize selected model
-                    if model_option == "Gaussian Copula":
-                        synthesizer = GaussianCopulaSynthesizer(metadata)
-                    else:  # Use CTGAN if selected
-                        synthesizer = CTGANSynthesizer(metadata)
-
-                    # Fit model and generate synthetic data
-                    synthesizer.fit(sdg_df)
-                    synthetic_data = synthesizer.sample(num_rows=num_samples)
-
-                    st.success("✅ Synthetic data generated successfully!")
-
-                    # Calculate metrics and generate report
-                    metrics = calculate_metrics(sdg_df, synthetic_data)
-                    report = generate_report(metrics, sdg_df, synthetic_data)
-
-                    # Show synthetic data preview
-                    st.subheader("🔍 Synthetic Data Preview")
-                    st.dataframe(synthetic_data.head())
-
-                    # Tabs for analysis
-                    st.subheader("📊 Data Analysis")
-                    tab1, tab2, tab3 = st.tabs(["Statistical Summary", "Visualizations", "Quality Report"])
-
-                    with tab1:
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write("Original Data Statistics")
-                            st.dataframe(sdg_df.describe())
-                        with col2:
-                            st.write("Synthetic Data Statistics")
-                            st.dataframe(synthetic_data.describe())
-
-                    with tab2:
-                        numeric_cols = sdg_df.select_dtypes(include=['number']).columns.tolist()
-                        if numeric_cols:
-                            selected_col = st.selectbox(
-                                "Select column for distribution comparison", 
-                                numeric_cols,
-                                key="synthetic_distribution_select"
-                            )
-
-                            fig, ax = plt.subplots(1, 2, figsize=(12, 4))
-                            sns.histplot(sdg_df[selected_col], ax=ax[0], kde=True)
-                            ax[0].set_title(f"Original: {selected_col}")
-
-                            sns.histplot(synthetic_data[selected_col], ax=ax[1], kde=True)
-                            ax[1].set_title(f"Synthetic: {selected_col}")
-
-                            st.pyplot(fig)
-
-                            # Add correlation heatmap if multiple numerical columns
-                            if len(numeric_cols) > 1:
-                                st.subheader("Correlation Structure Comparison")
-                                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
-                                sns.heatmap(sdg_df[numeric_cols].corr(), ax=ax1, cmap='coolwarm')
-                                ax1.set_title("Original Data Correlation")
-                                sns.heatmap(synthetic_data[numeric_cols].corr(), ax=ax2, cmap='coolwarm')
-                                ax2.set_title("Synthetic Data Correlation")
-                                st.pyplot(fig)
-                        else:
-                            st.warning("No numerical columns available for visualization.")
-
-                    with tab3:
-                        st.markdown(report)
-                        
-                        # Download report
-                        report_bytes = report.encode()
-                        b64 = base64.b64encode(report_bytes).decode()
-                        href = f'<a href="data:text/markdown;base64,{b64}" download="synthetic_data_report.md" class="btn">📥 Download Quality Report</a>'
-                        st.markdown(href, unsafe_allow_html=True)
-
-                    # Download synthetic data
-                    csv = synthetic_data.to_csv(index=False)
-                    b64 = base64.b64encode(csv.encode()).decode()
-                    href = f'<a href="data:file/csv;base64,{b64}" download="synthetic_data.csv" class="btn">📥 Download Synthetic Data (CSV)</a>'
-                    st.markdown(href, unsafe_allow_html=True)
+                    # Profiled only when a 'Next synthesis job' capture is armed
+                    with profiling.profile_synthesis():
+                        # The ML utility hold-out is kept out of training, so TSTR tests on unseen rows
+                        holdout = model_selection.holdout_mask(len(sdg_df)) if utility is not None else None
+                        fit_df = sdg_df if holdout is None else sdg_df[~holdout]
+                        # Reduce high-cardinality columns, then initialize metadata from the reviewed schema
+                        train_df, train_metadata = prepare_training_data(fit_df, metadata_dict, reducer)
+                        metadata = SingleTableMetadata.load_from_dict(train_metadata)
+
+                        # Initialize selected model
+                        if model_option == "Gaussian Copula":
+                            synthesizer = GaussianCopulaSynthesizer(metadata)
+                        else:  # Use CTGAN if selected
+                            synthesizer = CTGANSynthesizer(metadata)
+
+                        # Fit model and generate synthetic data
+                        # Waits for a free job slot when other sessions are training
+                        with resource_manager.get_manager().job("synthesizer.fit") as ticket:
+                            fit_start = time.perf_counter()
+                            with performance.track("synthesizer.fit", train_df):
+                                synthesizer.fit(train_df)
+                            fit_seconds = time.perf_counter() - fit_start
+                        synthetic_data, sampling_stats = sample_rows(synthesizer, num_samples, reducer, fixed, constraints, seed)
+                        if synthetic_data.empty:
+                            raise ValueError("no generated row satisfied the conditions")
+
+                        # Calculate metrics and generate report
+                        metrics = calculate_metrics(sdg_df, synthetic_data, utility=ml_utility.with_holdout(utility, holdout),
+                                                    version=version)
+                        report = generate_report(metrics, sdg_df, synthetic_data)
+
+                    # Kept for the sharded export and the registry, which work without retraining
+                    st.session_state.synthesis_fitted = {
+                        'version': version,
+                        'label': model_option,
+                        'synthesizer': synthesizer,
+                        'reducer': reducer,
+                        'metadata': train_metadata,
+                        'fit_seconds': fit_seconds,
+                        'quality': model_registry.quality_summary(metrics),
+                        'holdout': holdout,
+                    }
+
+                    resource_manager.report_wait(ticket)
+                    if sampling_stats is not None:
+                        conditional_sampling.display_sampling_stats(sampling_stats)
+                    display_synthesis_results(sdg_df, synthetic_data, report, metrics)
+                    if not export_shown:
+                        display_model_tools(st.session_state.synthesis_fitted, sdg_df, seed)
 
                     return synthetic_data, True, None
 
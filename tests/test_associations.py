@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+import associations
+
+
+def test_datetime_correlation_survives_float32():
+    # Nanosecond timestamps spanning 20 years overflow float32 products unless standardized
+    rng = np.random.default_rng(0)
+    days = rng.uniform(0, 20 * 365, 20_000)
+    df = pd.DataFrame({
+        "t": pd.Timestamp("2000-01-01") + pd.to_timedelta(days, unit="D"),
+        "y": days * 0.01 + rng.normal(0, 40, len(days)),
+    })
+
+    expected = np.corrcoef(days, df["y"])[0, 1]
+    result = associations.association_matrix(df, dtype=np.float32)
+
+    assert abs(result.loc["t", "y"] - expected) < 1e-3
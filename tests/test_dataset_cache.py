@@ -0,0 +1,21 @@
+import os
+
+import pandas as pd
+
+import columnar_store
+import dataset_cache
+
+
+def test_mixed_type_column_is_served_from_the_heap(tmp_path, monkeypatch):
+    # pandas reads a CSV column of ints and strings as an object column Arrow cannot type
+    df = pd.DataFrame({"id": range(3000), "code": pd.Series([1, 2, "262144"] * 1000, dtype=object)})
+    store = columnar_store.ColumnarStore(str(tmp_path))
+    monkeypatch.setattr(dataset_cache, "get_store", lambda: store)
+    monkeypatch.setattr(dataset_cache.function, "load_data", lambda file: df)
+
+    loaded, size = dataset_cache._load_mapped(b"content", "mixed")
+
+    assert loaded.equals(df)
+    assert size > 0
+    assert "mixed" not in store
+    assert not os.listdir(tmp_path)